@@ -0,0 +1,243 @@
+import os
+import json
+from concurrent.futures import ThreadPoolExecutor
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+from questions import upgrade_question, write_snapshot, commit_snapshot
+
+JOURNAL_SUFFIX = ".journal"
+STALE_SUFFIX = ".stale"
+DEBOUNCE_MS = 2000
+JOURNAL_LIMIT = 500
+
+
+def journal_path(test_file):
+    return test_file + JOURNAL_SUFFIX
+
+
+def _base_stamp(test_file):
+    try:
+        st = os.stat(test_file)
+    except OSError:
+        return None
+    return [st.st_size, st.st_mtime_ns]
+
+
+def apply_journal(test_file, questions):
+    # Replays edits journaled since test_file was last fully written; a torn
+    # last line is ignored. A journal for another version of the file is moved
+    # aside, so new edits never land under its header.
+    path = journal_path(test_file)
+    try:
+        f = open(path, "rb")
+    except OSError:
+        return 0
+    applied = 0
+    with f:
+        try:
+            stale = json.loads(f.readline()).get("base") != _base_stamp(test_file)
+        except (ValueError, AttributeError):
+            stale = True
+        if stale:
+            f.close()
+            try:
+                os.replace(path, path + STALE_SUFFIX)
+            except OSError:
+                pass
+            return 0
+        good = f.tell()
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                break
+            if not line.endswith(b"\n"):
+                break
+            op, index = entry["op"], entry["i"]
+            if op == "set":
+                questions[index] = upgrade_question(entry["q"])
+            elif op == "insert":
+                questions.insert(index, upgrade_question(entry["q"]))
+            elif op == "remove":
+                del questions[index]
+            applied += 1
+            good = f.tell()
+    # Cut a torn tail off, so later edits are appended after whole lines
+    if good < os.path.getsize(path):
+        try:
+            os.truncate(path, good)
+        except OSError:
+            pass
+    return applied
+
+
+def _append_journal(test_file, lines, fresh):
+    # A fresh journal replaces whatever is there, under a header for test_file as it is now
+    path = journal_path(test_file)
+    with open(path, "wb" if fresh else "ab") as f:
+        if fresh:
+            f.write(json.dumps({"base": _base_stamp(test_file)}).encode("utf-8") + b"\n")
+        f.write(b"".join(lines))
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _remove_journal(test_file):
+    try:
+        os.remove(journal_path(test_file))
+    except OSError:
+        pass
+
+
+class Autosave(QObject):
+    # Debounced background saving for a QuestionList. Edits are recorded as
+    # ops; small batches are appended to a journal next to test.json, and the
+    # journal is folded into an atomic rewrite of test.json once it grows.
+    saved = pyqtSignal(str)
+    failed = pyqtSignal(str)
+    _written = pyqtSignal(object)
+
+    def __init__(self, parent=None, delay=DEBOUNCE_MS, journal=True, journal_limit=JOURNAL_LIMIT):
+        super().__init__(parent)
+        self.journal = journal
+        self.journal_limit = journal_limit
+        self.test_file = None
+        self.questions = None
+        self.pending = []
+        self.journaled = 0
+        self.full_pending = False
+        self.inflight = None
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(delay)
+        self.timer.timeout.connect(self.flush)
+        self._written.connect(self._on_written)
+
+    def bind(self, test_file, questions, journaled=0):
+        self.wait()
+        self.timer.stop()
+        self.test_file = test_file
+        self.questions = questions
+        self.pending = []
+        self.journaled = journaled
+        self.full_pending = False
+
+    def is_dirty(self):
+        return bool(self.pending or self.full_pending or self.inflight)
+
+    def has_changes(self):
+        # Anything test.json does not hold yet, pending or journaled
+        return self.is_dirty() or self.journaled > 0
+
+    def question_changed(self, row, question):
+        if self.pending:
+            op, last_row, last_question = self.pending[-1]
+            if op == "set" and last_row == row and last_question is question:
+                self.timer.start()
+                return
+        self._record(("set", row, question))
+
+    def question_inserted(self, row, question):
+        self._record(("insert", row, question))
+
+    def question_removed(self, row):
+        self._record(("remove", row, None))
+
+    def _record(self, op):
+        if self.questions is None:
+            return
+        self.pending.append(op)
+        self.timer.start()
+
+    def _encode_ops(self):
+        # Questions are serialized at flush time, so they carry their latest content
+        lines = []
+        for op, row, question in self.pending:
+            entry = {"op": op, "i": row}
+            if question is not None:
+                entry["q"] = question
+            lines.append(json.dumps(entry).encode("utf-8") + b"\n")
+        return lines
+
+    def flush(self, full=False, wait=False):
+        self.timer.stop()
+        if self.test_file is None:
+            return
+        if self.inflight is not None:
+            if not wait:
+                # Picked up again once the running write lands
+                self.full_pending = self.full_pending or full
+                return
+            self.wait()
+        full = full or self.full_pending or not self.journal or \
+            self.journaled + len(self.pending) > self.journal_limit
+        if not full and not self.pending:
+            return
+        test_file = self.test_file
+        if full:
+            snapshot = self.questions.snapshot()
+            source = self.questions.source
+            job = ("full", test_file, snapshot)
+            task = lambda: write_snapshot(test_file, snapshot, source)
+            self.full_pending = False
+        else:
+            lines = self._encode_ops()
+            fresh = self.journaled == 0
+            job = ("journal", test_file, len(lines))
+            task = lambda: _append_journal(test_file, lines, fresh)
+        self.pending = []
+        if wait:
+            self._finish(job, *self._call(task))
+        else:
+            self.inflight = (job, self.executor.submit(self._run, job, task))
+
+    def _call(self, task):
+        try:
+            return task(), None
+        except Exception as e:
+            return None, e
+
+    def _run(self, job, task):
+        outcome = self._call(task)
+        self._written.emit(job)
+        return outcome
+
+    def _on_written(self, job):
+        # Queued from the worker; wait() may already have handled this job
+        if self.inflight is not None and self.inflight[0] is job:
+            self.wait()
+            if self.pending or self.full_pending:
+                self.timer.start()
+
+    def wait(self):
+        if self.inflight is not None:
+            job, future = self.inflight
+            self.inflight = None
+            self._finish(job, *future.result())
+
+    def _finish(self, job, result, error):
+        kind, test_file = job[:2]
+        if error is not None:
+            # The ops of a failed write are gone, so the next attempt rewrites everything
+            self.full_pending = True
+            self.failed.emit(str(error))
+            return
+        if kind == "full":
+            tmp_path, offsets = result
+            try:
+                commit_snapshot(test_file, tmp_path, offsets, self.questions, job[2])
+            except Exception as e:
+                self.full_pending = True
+                self.failed.emit(str(e))
+                return
+            _remove_journal(test_file)
+            self.journaled = 0
+            self.saved.emit(test_file)
+        else:
+            self.journaled += job[2]
+            self.saved.emit(journal_path(test_file))
+
+    def close(self):
+        self.timer.stop()
+        self.wait()
+        self.executor.shutdown(wait=True)
@@ -0,0 +1,236 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+from statistics import median
+
+# Everything runs headless; this has to be set before Qt is imported
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6.QtCore import QT_VERSION_STR
+from PyQt6.QtGui import QImage, QColor
+from PyQt6.QtWidgets import QApplication, QFileDialog
+from imagestore import store_image
+from thumbnails import generate_thumbnails
+
+SIZES = [10, 1000, 10000, 100000]
+SAMPLE_IMAGE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "example", "imgs", "apple.webp")
+QUIZ_CYCLES = 50
+SET_IMAGE_RUNS = 5
+STARTUP_RUNS = 5
+
+
+def generate_bank(folder, count, images):
+    # Synthetic test folder; with images every third question and every fourth
+    # answer point at the sample image, stored the way the creator stores it
+    imgs_folder = os.path.join(folder, "imgs")
+    os.makedirs(imgs_folder, exist_ok=True)
+    image = ""
+    if images:
+        image = store_image(imgs_folder, SAMPLE_IMAGE)
+        generate_thumbnails(imgs_folder, image)
+    with open(os.path.join(folder, "test.json"), "w", encoding="utf-8") as f:
+        f.write("[\n")
+        for i in range(count):
+            question = {
+                "question": f"Question {i}: which of these is answer {i % 4}?",
+                "question_image": image if i % 3 == 0 else "",
+                "answers": [{"id": j, "text": f"answer {i} {j}", "image": image if j == 0 and i % 4 == 0 else ""}
+                            for j in range(4)],
+                "correct": i % 4,
+            }
+            f.write(("" if i == 0 else ",\n") + json.dumps(question, indent=4))
+        f.write("\n]\n")
+
+
+def make_images(folder, count, size=(1024, 768)):
+    # Distinct images, so set_image always copies and thumbnails a new file
+    paths = []
+    for i in range(count):
+        image = QImage(size[0], size[1], QImage.Format.Format_RGB32)
+        image.fill(QColor.fromHsv(i * 37 % 360, 200, 220))
+        path = os.path.join(folder, f"photo{i}.png")
+        image.save(path, "PNG")
+        paths.append(path)
+    return paths
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def wait_for_images(app, cache, timeout=10.0):
+    end = time.perf_counter() + timeout
+    while cache.pending and time.perf_counter() < end:
+        app.processEvents()
+
+
+def bench_quiz(app, folder):
+    from main import QuizApp
+    timings = {"quiz.start_quiz_cold": [], "quiz.start_quiz": [], "quiz.show_question": [],
+               "quiz.check_answer": [], "quiz.cycle_with_images": []}
+    for run in range(4):
+        window = QuizApp()
+        window.test_path = folder
+        # The first start has to scan test.json and write its offset index
+        timings["quiz.start_quiz_cold" if run == 0 else "quiz.start_quiz"].append(timed(window.start_quiz))
+        window.test_data.close()
+        window.close()
+        window.deleteLater()
+
+    window = QuizApp()
+    window.test_path = folder
+    window.start_quiz()
+    wait_for_images(app, window.image_cache)
+    for _ in range(min(QUIZ_CYCLES, len(window.session) - 1)):
+        start = time.perf_counter()
+        timings["quiz.check_answer"].append(timed(window.check_answer, window.session.correct_choice()))
+        timings["quiz.show_question"].append(timed(window.show_question))
+        wait_for_images(app, window.image_cache)
+        timings["quiz.cycle_with_images"].append(time.perf_counter() - start)
+    window.close()
+    window.test_data.close()
+    window.deleteLater()
+    return timings
+
+
+def bench_creator(app, folder, photos):
+    import creator
+    timings = {"creator.load_test": [], "creator.update_questions_list": [], "creator.index_search": [],
+               "creator.save_test": [], "creator.set_image": []}
+    window = creator.TestCreatorApp()
+    for _ in range(3):
+        # load_test minus its folder dialog
+        timings["creator.load_test"].append(timed(window.open_folder, folder))
+        window.index_timer.stop()
+    # The list widget rebuild is now a model reset
+    for _ in range(3):
+        timings["creator.update_questions_list"].append(
+            timed(window.questions_model.set_questions, window.test_data))
+    for _ in range(3):
+        window.search_index.reset(len(window.test_data))
+        timings["creator.index_search"].append(
+            timed(window.search_index.index_pending, window.test_data, len(window.test_data)))
+    for _ in range(3):
+        timings["creator.save_test"].append(timed(window.save_test, True))
+
+    window.questions_list.setCurrentIndex(window.questions_model.index(0))
+    get_open_file_name = QFileDialog.getOpenFileName
+    try:
+        for path in photos:
+            QFileDialog.getOpenFileName = staticmethod(lambda *args, p=path: (p, ""))
+            timings["creator.set_image"].append(timed(window.set_image, "question"))
+    finally:
+        QFileDialog.getOpenFileName = get_open_file_name
+    window.autosave.flush(full=True, wait=True)
+    window.autosave.close()
+    window.test_data.close()
+    window.deleteLater()
+    app.processEvents()
+    return timings
+
+
+def bench_startup(runs):
+    # Fresh processes of both apps, timed from import to the first painted frame
+    root = os.path.dirname(os.path.abspath(__file__))
+    timings = {}
+    with tempfile.TemporaryDirectory(prefix="quiz-startup-") as tmp:
+        report = os.path.join(tmp, "startup.jsonl")
+        env = dict(os.environ, QUIZ_STARTUP_REPORT=report, QUIZ_STARTUP_EXIT="1")
+        for script in ("main.py", "creator.py"):
+            for _ in range(runs):
+                subprocess.run([sys.executable, os.path.join(root, script)], env=env, cwd=tmp, timeout=60)
+        with open(report, encoding="utf-8") as f:
+            for line in f:
+                entry = json.loads(line)
+                for label, ms in entry["marks"].items():
+                    timings.setdefault(f"{entry['app']}.startup_{label}", []).append(ms / 1000)
+    return timings
+
+
+def summarize(size, images, timings):
+    results = []
+    for metric, samples in timings.items():
+        if samples:
+            results.append({
+                "metric": metric,
+                "questions": size,
+                "images": images,
+                "runs": len(samples),
+                "min_ms": round(min(samples) * 1000, 3),
+                "median_ms": round(median(samples) * 1000, 3),
+                "max_ms": round(max(samples) * 1000, 3),
+            })
+    return results
+
+
+def revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark quiz and creator load, render and save paths")
+    parser.add_argument("--sizes", default=",".join(map(str, SIZES)), help="comma separated bank sizes")
+    parser.add_argument("--images", choices=("both", "yes", "no"), default="both", help="banks with images, without, or both")
+    parser.add_argument("-o", "--output", default="-", help="JSON results file (default: stdout)")
+    parser.add_argument("--keep", action="store_true", help="keep the generated banks")
+    parser.add_argument("--startup-runs", type=int, default=STARTUP_RUNS, help="app launches to time (0 to skip)")
+    args = parser.parse_args(argv)
+
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    workdir = tempfile.mkdtemp(prefix="quiz-bench-")
+    # Library indexes and quiz checkpoints go to a throwaway cache, not the user's
+    os.environ["XDG_CACHE_HOME"] = os.path.join(workdir, "cache")
+    results = []
+    try:
+        if args.startup_runs:
+            results.extend(summarize(0, False, bench_startup(args.startup_runs)))
+        photos = make_images(workdir, SET_IMAGE_RUNS)
+        for size in (int(s) for s in args.sizes.split(",")):
+            for images in {"both": (False, True), "yes": (True,), "no": (False,)}[args.images]:
+                folder = os.path.join(workdir, f"bank-{size}-{'img' if images else 'text'}")
+                os.makedirs(folder)
+                start = time.perf_counter()
+                generate_bank(folder, size, images)
+                print(f"{size} questions, images={images}: generated in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+                timings = bench_quiz(app, folder)
+                timings.update(bench_creator(app, folder, photos))
+                results.extend(summarize(size, images, timings))
+                if not args.keep:
+                    shutil.rmtree(folder)
+    finally:
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+        else:
+            print(f"Banks kept in {workdir}", file=sys.stderr)
+
+    report = {
+        "revision": revision(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "qt": QT_VERSION_STR,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "results": results,
+    }
+    if args.output == "-":
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,7 @@
+import os
+
+
+def cache_dir():
+    # Per-user cache for library indexes, checkpoints and learner state
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "tryit")
@@ -0,0 +1,88 @@
+import os
+import json
+import hashlib
+from cachedir import cache_dir
+
+CHECKPOINT_VERSION = 1
+
+
+def checkpoint_path(test_path):
+    digest = hashlib.blake2b(os.path.abspath(test_path).encode("utf-8"), digest_size=8).hexdigest()
+    return os.path.join(cache_dir(), f"checkpoint-{digest}.jsonl")
+
+
+def test_stamp(test_path):
+    # A test is a folder holding test.json or a pack file
+    path = test_path if os.path.isfile(test_path) else os.path.join(test_path, "test.json")
+    st = os.stat(path)
+    return [st.st_size, st.st_mtime_ns]
+
+
+def load_checkpoint(test_path):
+    # (header, answer entries) of an unfinished quiz on this test, or None. A
+    # checkpoint for another version of the test is dropped; a torn last line
+    # is ignored.
+    path = checkpoint_path(test_path)
+    try:
+        f = open(path, "rb")
+    except OSError:
+        return None
+    with f:
+        try:
+            header = json.loads(f.readline())
+            stale = header.get("v") != CHECKPOINT_VERSION or header.get("test") != test_stamp(test_path)
+        except (ValueError, OSError):
+            stale = True
+        if stale:
+            discard_checkpoint(test_path)
+            return None
+        entries = []
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                break
+            if entry.get("i") != len(entries):
+                break
+            entries.append(entry)
+    return header, entries
+
+
+def discard_checkpoint(test_path):
+    try:
+        os.remove(checkpoint_path(test_path))
+    except OSError:
+        pass
+
+
+class Checkpoint:
+    # Append-only record of one quiz run: a header with the seed and exam
+    # settings, then one short line per answered question
+
+    def __init__(self, test_path, header, entries=()):
+        # Starts a new record, or rewrites a loaded one (dropping any torn tail)
+        # before appending to it again
+        path = checkpoint_path(test_path)
+        self.test_path = test_path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.file = open(path, "wb")
+        lines = [dict(header, v=CHECKPOINT_VERSION, test=test_stamp(test_path)), *entries]
+        self.file.writelines(json.dumps(entry, separators=(",", ":")).encode("utf-8") + b"\n" for entry in lines)
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def _write(self, entry):
+        self.file.write(json.dumps(entry, separators=(",", ":")).encode("utf-8") + b"\n")
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def record(self, index, choice, correct):
+        self._write({"i": index, "c": choice, "ok": int(correct)})
+
+    def close(self):
+        if not self.file.closed:
+            self.file.close()
+
+    def finish(self):
+        self.close()
+        discard_checkpoint(self.test_path)
@@ -1,24 +1,145 @@
+# First, so the startup report includes loading Qt and everything below
+from startup import StartupTimer
 import os
-import json
 import sys
+import copy
+import threading
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
-    QLabel, QLineEdit, QPushButton, QListWidget, QRadioButton,
-    QFileDialog, QGroupBox, QListWidgetItem, QMessageBox
+    QLabel, QLineEdit, QPushButton, QListWidget, QListView, QRadioButton,
+    QFileDialog, QGroupBox, QListWidgetItem, QMessageBox, QDialog
 )
-from PyQt6.QtCore import Qt, QSize
-from PyQt6.QtGui import QPixmap, QIcon
+from bisect import bisect_left
+from itertools import chain
+from PyQt6.QtCore import Qt, QSize, QTimer, QAbstractListModel, QModelIndex, pyqtSignal
+from PyQt6.QtGui import QPixmap, QIcon, QKeySequence, QUndoStack
+from questions import QuestionList, next_answer_id, open_questions
+from autosave import Autosave, apply_journal
+from imagestore import store_image, image_refcounts, collect_garbage
+from thumbnails import generate_thumbnails, thumbnail_path
+from search import SearchIndex
+from history import UNDO_LIMIT, EditQuestion, InsertQuestion, InsertQuestions, RemoveQuestion, diff_fields, held_questions
+from theme import DEFAULT_THEME, THEMES, apply_theme
+
+class QuestionListModel(QAbstractListModel):
+    # Labels are built only for the rows the view actually paints. With a
+    # filter set, view rows map onto the sorted list of matching question rows.
+    def __init__(self, test_data, parent=None):
+        super().__init__(parent)
+        self.test_data = test_data
+        self.rows = None
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.test_data) if self.rows is None else len(self.rows)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        row = self.source_row(index.row())
+        if role == Qt.ItemDataRole.DisplayRole:
+            return f"Q{row+1}: {self.test_data.peek(row)['question'][:30]}"
+        if role == Qt.ItemDataRole.UserRole:
+            return row
+        return None
+
+    def source_row(self, view_row):
+        return view_row if self.rows is None else self.rows[view_row]
+
+    def view_row(self, row):
+        if self.rows is None:
+            return row
+        i = bisect_left(self.rows, row)
+        return i if i < len(self.rows) and self.rows[i] == row else -1
+
+    def set_questions(self, test_data):
+        self.beginResetModel()
+        self.test_data = test_data
+        self.rows = None
+        self.endResetModel()
+
+    def set_filter(self, rows):
+        self.beginResetModel()
+        self.rows = rows
+        self.endResetModel()
+
+    def insert_question(self, row, question):
+        if self.rows is not None:
+            # Filtered rows shift; the caller re-runs the filter
+            self.test_data.insert(row, question)
+            return
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.test_data.insert(row, question)
+        self.endInsertRows()
+
+    def insert_questions(self, row, questions):
+        # One model update however many questions come in
+        if self.rows is None:
+            self.beginInsertRows(QModelIndex(), row, row + len(questions) - 1)
+        self.test_data[row:row] = questions
+        if self.rows is None:
+            self.endInsertRows()
+
+    def remove_questions(self, row, count):
+        removed = self.test_data[row:row + count]
+        if self.rows is None:
+            self.beginRemoveRows(QModelIndex(), row, row + count - 1)
+        del self.test_data[row:row + count]
+        if self.rows is None:
+            self.endRemoveRows()
+        return removed
+
+    def remove_question(self, row):
+        if self.rows is not None:
+            self.test_data.pop(row)
+            return
+        self.beginRemoveRows(QModelIndex(), row, row)
+        self.test_data.pop(row)
+        self.endRemoveRows()
+
+    def question_changed(self, row):
+        view_row = self.view_row(row)
+        if view_row >= 0:
+            index = self.index(view_row)
+            self.dataChanged.emit(index, index, [Qt.ItemDataRole.DisplayRole])
+
 
 class TestCreatorApp(QMainWindow):
+    _imported = pyqtSignal(object, object, object)
+    
     def __init__(self):
         super().__init__()
-        self.setWindowTitle("Test Creator")
+        self.setWindowTitle("Test Creator[*]")
         self.setMinimumSize(800, 600)
+        theme = os.environ.get("QUIZ_THEME", DEFAULT_THEME)
+        apply_theme(QApplication.instance(), theme if theme in THEMES else DEFAULT_THEME)
         
         # Current test data
-        self.test_data = []
+        self.test_data = QuestionList()
         self.current_question = None
+        # Copy of the current question as of its last undo step; edits are diffed against it
+        self.edit_base = None
+        self.undo_stack = QUndoStack(self)
+        self.undo_stack.setUndoLimit(int(os.environ.get("TEST_CREATOR_UNDO_LIMIT", UNDO_LIMIT)))
+        # A bound method, so the connection goes with the window; the stack clears
+        # itself at teardown and a lambda would then run on a deleted wrapper
+        self.undo_stack.cleanChanged.connect(self.on_clean_changed)
         self.test_folder = None
+        self.autosave = Autosave(self)
+        self.autosave.saved.connect(self.on_saved)
+        self.autosave.failed.connect(self.on_save_failed)
+        self.search_index = SearchIndex()
+        # Builds the search index a slice at a time while the editor is idle
+        self.index_timer = QTimer(self)
+        self.index_timer.timeout.connect(self.index_step)
+        # Indexes a test opened without a .idx a step at a time, so the window
+        # keeps painting while a large file is counted
+        self.opening = None
+        self.open_timer = QTimer(self)
+        self.open_timer.timeout.connect(self.open_step)
+        self._imported.connect(self.on_imported)
+        self.importing = False
         
         # Setup UI
         self.init_ui()
@@ -36,9 +157,18 @@ class TestCreatorApp(QMainWindow):
         left_panel.setMinimumWidth(200)
         left_layout = QVBoxLayout(left_panel)
         
-        self.questions_list = QListWidget()
-        self.questions_list.itemSelectionChanged.connect(self.select_question)
+        self.questions_model = QuestionListModel(self.test_data, self)
+        self.questions_list = QListView()
+        self.questions_list.setUniformItemSizes(True)
+        self.questions_list.setModel(self.questions_model)
+        self.questions_list.selectionModel().selectionChanged.connect(self.select_question)
         left_layout.addWidget(QLabel("Questions:"))
+        
+        self.search_bar = QLineEdit()
+        self.search_bar.setPlaceholderText("Search questions and answers...")
+        self.search_bar.setClearButtonEnabled(True)
+        self.search_bar.textChanged.connect(self.apply_filter)
+        left_layout.addWidget(self.search_bar)
         left_layout.addWidget(self.questions_list)
         
         # Question buttons
@@ -65,14 +195,54 @@ class TestCreatorApp(QMainWindow):
         self.save_test_btn = QPushButton("Save Test")
         self.save_test_btn.clicked.connect(self.save_test)
         test_btn_layout.addWidget(self.save_test_btn)
+        
+        self.import_pack_btn = QPushButton("Import Pack")
+        self.import_pack_btn.clicked.connect(self.import_pack)
+        test_btn_layout.addWidget(self.import_pack_btn)
+        
+        self.export_pack_btn = QPushButton("Export Pack")
+        self.export_pack_btn.clicked.connect(self.export_pack)
+        test_btn_layout.addWidget(self.export_pack_btn)
+        
+        self.import_csv_btn = QPushButton("Import CSV")
+        self.import_csv_btn.clicked.connect(self.import_csv)
+        test_btn_layout.addWidget(self.import_csv_btn)
+        
+        self.clean_images_btn = QPushButton("Clean Up Images")
+        self.clean_images_btn.clicked.connect(self.clean_images)
+        test_btn_layout.addWidget(self.clean_images_btn)
         left_layout.addLayout(test_btn_layout)
         
         left_layout.addStretch()
         main_layout.addWidget(left_panel)
         
+        # Right panel - the question editor is built the first time there is a
+        # question to edit; until then a placeholder holds its place
+        self.main_layout = main_layout
+        self.right_panel = None
+        self.editor_placeholder = QLabel("Create a new test or load an existing one.")
+        self.editor_placeholder.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        main_layout.addWidget(self.editor_placeholder)
+        
+        # Menu
+        edit_menu = self.menuBar().addMenu("Edit")
+        undo_action = self.undo_stack.createUndoAction(self, "Undo")
+        undo_action.setShortcut(QKeySequence.StandardKey.Undo)
+        edit_menu.addAction(undo_action)
+        redo_action = self.undo_stack.createRedoAction(self, "Redo")
+        redo_action.setShortcut(QKeySequence.StandardKey.Redo)
+        edit_menu.addAction(redo_action)
+        
+        test_menu = self.menuBar().addMenu("Test")
+        validate_action = test_menu.addAction("Validate Test")
+        validate_action.triggered.connect(self.validate_test)
+        
+        # Status bar
+        self.statusBar().showMessage("Ready. Create a new test or load an existing one.")
+    
+    def init_editor(self):
         # Right panel - Question editor
         self.right_panel = QWidget()
-        self.right_panel.setEnabled(False)
         right_layout = QVBoxLayout(self.right_panel)
         
         # Question text
@@ -81,6 +251,7 @@ class TestCreatorApp(QMainWindow):
         
         self.question_text = QLineEdit()
         self.question_text.setPlaceholderText("Enter your question here...")
+        self.question_text.textEdited.connect(self.update_question_text)
         q_layout.addWidget(self.question_text)
         
         # Question image
@@ -88,7 +259,7 @@ class TestCreatorApp(QMainWindow):
         self.question_image_label = QLabel("No image selected")
         self.question_image_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
         self.question_image_label.setMinimumSize(200, 150)
-        self.question_image_label.setStyleSheet("border: 1px dashed #999;")
+        self.question_image_label.setObjectName("imagePreview")
         
         img_btn_layout = QVBoxLayout()
         self.set_question_img_btn = QPushButton("Set Image")
@@ -140,7 +311,7 @@ class TestCreatorApp(QMainWindow):
         self.answer_image_label = QLabel("No image")
         self.answer_image_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
         self.answer_image_label.setMinimumSize(100, 100)
-        self.answer_image_label.setStyleSheet("border: 1px dashed #999;")
+        self.answer_image_label.setObjectName("imagePreview")
         
         ans_img_btn_layout = QVBoxLayout()
         self.set_answer_img_btn = QPushButton("Set Image")
@@ -167,39 +338,99 @@ class TestCreatorApp(QMainWindow):
         a_layout.addWidget(self.answer_editor)
         right_layout.addWidget(answers_group)
         
-        main_layout.addWidget(self.right_panel)
-        
-        # Status bar
-        self.statusBar().showMessage("Ready. Create a new test or load an existing one.")
+        self.main_layout.replaceWidget(self.editor_placeholder, self.right_panel)
+        self.editor_placeholder.deleteLater()
+        self.editor_placeholder = None
+    
+    def enable_editor(self, enabled):
+        if self.right_panel is None:
+            if not enabled:
+                return
+            self.init_editor()
+        self.right_panel.setEnabled(enabled)
     
     def new_test(self):
-        self.test_data = []
+        self.cancel_open()
+        self.autosave.flush(wait=True)
+        self.autosave.bind(None, None)
+        self.test_data.close()
+        self.test_data = QuestionList()
         self.test_folder = None
-        self.questions_list.clear()
-        self.right_panel.setEnabled(False)
+        self.current_question = None
+        self.undo_stack.clear()
+        self.questions_model.set_questions(self.test_data)
+        self.reset_search()
+        self.enable_editor(False)
         self.statusBar().showMessage("New test created. Add your first question.")
     
     def load_test(self):
         folder = QFileDialog.getExistingDirectory(self, "Select Test Folder")
         if not folder:
             return
-            
+        self.open_folder(folder)
+    
+    def open_folder(self, folder):
         test_file = os.path.join(folder, "test.json")
         if not os.path.exists(test_file):
             QMessageBox.warning(self, "Error", "No test.json found in selected folder")
             return
             
+        self.cancel_open()
         try:
-            with open(test_file, "r") as f:
-                self.test_data = json.load(f)
+            self.autosave.flush(wait=True)
+            source = open_questions(test_file)
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Failed to load test: {str(e)}")
+            return
+        if source.complete:
+            self.finish_open(folder, source)
+        else:
+            self.opening = (folder, source)
+            self.statusBar().showMessage("Indexing questions...")
+            self.open_timer.start(0)
+    
+    def open_step(self):
+        folder, source = self.opening
+        try:
+            done = source.scan_step()
+        except Exception as e:
+            self.cancel_open()
+            QMessageBox.critical(self, "Error", f"Failed to load test: {str(e)}")
+            return
+        if done:
+            self.open_timer.stop()
+            self.opening = None
+            self.finish_open(folder, source)
+        else:
+            self.statusBar().showMessage(f"Indexing questions... {source.indexed()}")
+    
+    def cancel_open(self):
+        self.open_timer.stop()
+        if self.opening is not None:
+            self.opening[1].close()
+            self.opening = None
+    
+    def finish_open(self, folder, source):
+        test_file = os.path.join(folder, "test.json")
+        try:
+            test_data = QuestionList(source)
+            # Pick up edits autosaved to the journal but not yet folded into test.json
+            journaled = apply_journal(test_file, test_data)
+            self.test_data.close()
+            self.test_data = test_data
             self.test_folder = folder
-            self.update_questions_list()
-            self.right_panel.setEnabled(True)
+            self.current_question = None
+            self.undo_stack.clear()
+            self.autosave.bind(test_file, self.test_data, journaled)
+            self.questions_model.set_questions(self.test_data)
+            self.reset_search()
+            self.enable_editor(True)
             self.statusBar().showMessage(f"Loaded test from: {folder}")
         except Exception as e:
+            source.close()
             QMessageBox.critical(self, "Error", f"Failed to load test: {str(e)}")
     
-    def save_test(self):
+    def save_test(self, wait=False):
         if not self.test_data:
             QMessageBox.warning(self, "Error", "No test data to save")
             return
@@ -214,57 +445,253 @@ class TestCreatorApp(QMainWindow):
         if not os.path.exists(imgs_folder):
             os.makedirs(imgs_folder)
         
-        # Save test.json
+        # Save test.json in the background; the status bar reports when it lands
         test_file = os.path.join(self.test_folder, "test.json")
+        if self.autosave.test_file != test_file:
+            self.autosave.bind(test_file, self.test_data)
+        self.autosave.flush(full=True, wait=wait)
+    
+    def on_saved(self, path):
+        if path.endswith("test.json"):
+            self.undo_stack.setClean()
+            self.statusBar().showMessage(f"Test saved to: {path}")
+        else:
+            self.statusBar().showMessage("Changes autosaved")
+    
+    def on_clean_changed(self, clean):
+        self.setWindowModified(not clean)
+    
+    def on_save_failed(self, error):
+        QMessageBox.critical(self, "Error", f"Failed to save test: {error}")
+    
+    def question_edited(self, text="Edit Question"):
+        # Records what the last edit changed as one undo step
+        row = self.current_row()
+        if self.current_question is not None and row >= 0:
+            diff = diff_fields(self.edit_base, self.current_question)
+            if not diff:
+                return
+            self.edit_base = copy.deepcopy(self.current_question)
+            self.undo_stack.push(EditQuestion(self, row, diff, text))
+            self.question_changed(row, self.current_question)
+    
+    def question_changed(self, row, question):
+        self.questions_model.question_changed(row)
+        self.autosave.question_changed(row, question)
+        self.search_index.update_row(row, question)
+    
+    def show_question_row(self, row):
+        # Brings a question changed by undo/redo into view and reloads the editor
+        if self.current_row() == row:
+            self.select_question()
+        else:
+            self.set_current_question_row(row)
+    
+    def reset_search(self):
+        self.search_index.reset(len(self.test_data))
+        self.index_timer.start(0)
+        self.apply_filter()
+    
+    def index_step(self):
+        if self.search_index.index_pending(self.test_data):
+            self.index_timer.stop()
+    
+    def apply_filter(self):
+        query = self.search_bar.text()
+        if query.strip() and not self.search_index.complete():
+            # Searching before the background pass is done: finish it now
+            self.search_index.index_pending(self.test_data, len(self.test_data))
+            self.index_timer.stop()
+        rows = self.search_index.search(query) if query.strip() else None
+        if rows is None and self.questions_model.rows is None:
+            return
+        current = self.current_row()
+        self.questions_model.set_filter(rows)
+        view_row = self.questions_model.view_row(current) if current >= 0 else -1
+        if view_row >= 0:
+            self.questions_list.setCurrentIndex(self.questions_model.index(view_row))
+        if rows is not None and self.search_index.partial:
+            self.statusBar().showMessage(f"Showing {len(rows)} matching questions; keep typing to narrow the search")
+        elif rows is not None:
+            self.statusBar().showMessage(f"{len(rows)} matching questions")
+    
+    def current_row(self):
+        index = self.questions_list.currentIndex()
+        return self.questions_model.source_row(index.row()) if index.isValid() else -1
+    
+    def import_pack(self):
+        # Pack, CSV and validation code loads on first use, not at start-up
+        from testpack import unpack_pack
+        pack_path, _ = QFileDialog.getOpenFileName(self, "Select Test Pack", "", "Test packs (*.tpk)")
+        if not pack_path:
+            return
+        folder = QFileDialog.getExistingDirectory(self, "Select Folder to Unpack Into")
+        if not folder:
+            return
+        if os.path.exists(os.path.join(folder, "test.json")):
+            QMessageBox.warning(self, "Error", "Selected folder already contains a test.json")
+            return
+            
         try:
-            with open(test_file, "w") as f:
-                json.dump(self.test_data, f, indent=2)
-            self.statusBar().showMessage(f"Test saved to: {test_file}")
+            unpack_pack(pack_path, folder)
         except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to save test: {str(e)}")
+            QMessageBox.critical(self, "Error", f"Failed to unpack test: {str(e)}")
+            return
+        self.open_folder(folder)
+    
+    def import_csv(self):
+        if not self.test_folder:
+            QMessageBox.warning(self, "Error", "Please save the test first to import questions")
+            return
+        if self.importing:
+            return
+        csv_path, _ = QFileDialog.getOpenFileName(self, "Import Questions", "", "CSV files (*.csv *.tsv *.txt)")
+        if not csv_path:
+            return
+        # Rows are parsed and images copied off the GUI thread; the list is
+        # updated once, when everything is in
+        self.importing = True
+        self.import_csv_btn.setEnabled(False)
+        self.statusBar().showMessage(f"Importing {os.path.basename(csv_path)}...")
+        imgs_folder = os.path.join(self.test_folder, "imgs")
+        threading.Thread(target=self.import_job, args=(csv_path, imgs_folder), daemon=True).start()
+    
+    def import_job(self, csv_path, imgs_folder):
+        from importer import import_csv
+        errors = []
+        try:
+            questions = list(import_csv(csv_path, imgs_folder, errors=errors))
+        except (OSError, ValueError, UnicodeDecodeError) as e:
+            questions, errors = None, str(e)
+        try:
+            self._imported.emit(csv_path, questions, errors)
+        except RuntimeError:
+            pass
+    
+    def on_imported(self, csv_path, questions, errors):
+        self.importing = False
+        self.import_csv_btn.setEnabled(True)
+        if questions is None:
+            QMessageBox.critical(self, "Error", f"Failed to import {os.path.basename(csv_path)}: {errors}")
+            return
+        if questions:
+            self.undo_stack.push(InsertQuestions(self, len(self.test_data), questions,
+                                                 f"Import {os.path.basename(csv_path)}"))
+        self.statusBar().showMessage(f"Imported {len(questions)} questions, {len(errors)} rows with problems")
+        if errors:
+            QMessageBox.warning(self, "Import CSV", "\n".join(f"Line {line}: {message}" for line, message in errors[:20]) +
+                                (f"\n...and {len(errors) - 20} more" if len(errors) > 20 else ""))
+    
+    def export_pack(self):
+        from testpack import PACK_SUFFIX, pack_folder
+        self.save_test(wait=True)
+        if not self.test_data or not self.test_folder:
+            return
+            
+        pack_path, _ = QFileDialog.getSaveFileName(self, "Export Test Pack", "", "Test packs (*.tpk)")
+        if not pack_path:
+            return
+        if not pack_path.endswith(PACK_SUFFIX):
+            pack_path += PACK_SUFFIX
+            
+        try:
+            pack_folder(self.test_folder, pack_path)
+            self.statusBar().showMessage(f"Test pack written to: {pack_path}")
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Failed to export test: {str(e)}")
     
     def add_question(self):
         new_question = {
             "question": "New Question",
             "question_image": "",
-            "answers": {},
-            "answers_images": []
+            "answers": [],
+            "correct": None
         }
-        self.test_data.append(new_question)
-        self.update_questions_list()
-        self.questions_list.setCurrentRow(len(self.test_data) - 1)
-        self.right_panel.setEnabled(True)
+        self.undo_stack.push(InsertQuestion(self, len(self.test_data), new_question))
     
     def remove_question(self):
-        current_row = self.questions_list.currentRow()
+        current_row = self.current_row()
         if current_row >= 0:
-            self.test_data.pop(current_row)
-            self.update_questions_list()
-            if self.test_data:
-                self.questions_list.setCurrentRow(min(current_row, len(self.test_data) - 1))
-            else:
-                self.right_panel.setEnabled(False)
+            self.undo_stack.push(RemoveQuestion(self, current_row))
     
-    def update_questions_list(self):
-        self.questions_list.clear()
-        for i, q in enumerate(self.test_data):
-            item = QListWidgetItem(f"Q{i+1}: {q['question'][:30]}")
-            item.setData(Qt.ItemDataRole.UserRole, i)
-            self.questions_list.addItem(item)
+    def insert_row(self, row, question):
+        self.questions_model.insert_question(row, question)
+        self.autosave.question_inserted(row, question)
+        self.search_index.insert_row(row, question)
+        if self.questions_model.rows is not None:
+            self.questions_model.set_filter(self.search_index.search(self.search_bar.text()))
+        self.enable_editor(True)
+    
+    def insert_rows(self, row, questions):
+        self.questions_model.insert_questions(row, questions)
+        for i, question in enumerate(questions):
+            self.autosave.question_inserted(row + i, question)
+        self.search_index.insert_rows(row, questions)
+        if self.questions_model.rows is not None:
+            self.questions_model.set_filter(self.search_index.search(self.search_bar.text()))
+        self.enable_editor(True)
+        self.set_current_question_row(row)
+    
+    def remove_rows(self, row, count):
+        questions = self.questions_model.remove_questions(row, count)
+        for _ in range(count):
+            self.autosave.question_removed(row)
+        self.search_index.remove_rows(row, count)
+        if self.questions_model.rows is not None:
+            self.questions_model.set_filter(self.search_index.search(self.search_bar.text()))
+        if self.test_data:
+            self.set_current_question_row(min(row, len(self.test_data) - 1))
+        else:
+            self.current_question = None
+            self.enable_editor(False)
+        return questions
+    
+    def remove_row(self, row):
+        view_row = self.questions_model.view_row(row)
+        question = self.test_data[row]
+        self.questions_model.remove_question(row)
+        self.autosave.question_removed(row)
+        self.search_index.remove_row(row)
+        if self.questions_model.rows is not None:
+            self.questions_model.set_filter(self.search_index.search(self.search_bar.text()))
+            if self.questions_model.rowCount():
+                view_row = min(max(view_row, 0), self.questions_model.rowCount() - 1)
+                self.questions_list.setCurrentIndex(self.questions_model.index(view_row))
+        elif self.test_data:
+            self.set_current_question_row(min(row, len(self.test_data) - 1))
+        else:
+            self.current_question = None
+            self.enable_editor(False)
+        return question
+    
+    def set_current_question_row(self, row):
+        if self.questions_model.view_row(row) < 0:
+            # Not among the search results; drop the filter to show it
+            self.search_bar.clear()
+            self.questions_model.set_filter(None)
+        self.questions_list.setCurrentIndex(self.questions_model.index(self.questions_model.view_row(row)))
+    
+    def update_question_text(self, text):
+        row = self.current_row()
+        if self.current_question is not None and row >= 0:
+            self.current_question["question"] = text
+            self.question_edited("Edit Question Text")
     
     def select_question(self):
-        if not self.questions_list.selectedItems():
+        selected = self.questions_list.selectionModel().selectedIndexes()
+        if not selected:
             return
             
-        row = self.questions_list.currentRow()
+        row = self.questions_model.source_row(selected[0].row())
         self.current_question = self.test_data[row]
+        self.edit_base = copy.deepcopy(self.current_question)
         
         # Update question editor
         self.question_text.setText(self.current_question["question"])
         
         # Load question image if exists
         if self.current_question["question_image"] and self.test_folder:
-            img_path = os.path.join(self.test_folder, "imgs", self.current_question["question_image"])
+            img_path = thumbnail_path(os.path.join(self.test_folder, "imgs"), self.current_question["question_image"], 200, 150)
             if os.path.exists(img_path):
                 pixmap = QPixmap(img_path)
                 self.question_image_label.setPixmap(pixmap.scaled(200, 150, Qt.AspectRatioMode.KeepAspectRatio))
@@ -281,10 +708,10 @@ class TestCreatorApp(QMainWindow):
     
     def update_answers_list(self):
         self.answers_list.clear()
-        answers = list(self.current_question["answers"].items())
-        for i, (answer, correct) in enumerate(answers):
-            prefix = "✓ " if correct else "  "
-            item = QListWidgetItem(f"{prefix}A{i+1}: {answer}")
+        correct = self.current_question["correct"]
+        for i, answer in enumerate(self.current_question["answers"]):
+            prefix = "✓ " if answer["id"] == correct else "  "
+            item = QListWidgetItem(f"{prefix}A{i+1}: {answer['text']}")
             item.setData(Qt.ItemDataRole.UserRole, i)
             self.answers_list.addItem(item)
     
@@ -293,9 +720,9 @@ class TestCreatorApp(QMainWindow):
             return
             
         # Add a new answer
-        answer_text = f"Answer {len(self.current_question['answers']) + 1}"
-        self.current_question["answers"][answer_text] = 0
-        self.current_question["answers_images"].append("")
+        answers = self.current_question["answers"]
+        answers.append({"id": next_answer_id(self.current_question), "text": f"Answer {len(answers) + 1}", "image": ""})
+        self.question_edited("Add Answer")
         self.update_answers_list()
         self.answers_list.setCurrentRow(len(self.current_question["answers"]) - 1)
     
@@ -304,12 +731,13 @@ class TestCreatorApp(QMainWindow):
             return
             
         row = self.answers_list.currentRow()
-        answers_list = list(self.current_question["answers"].keys())
-        if 0 <= row < len(answers_list):
+        answers = self.current_question["answers"]
+        if 0 <= row < len(answers):
             # Remove the answer
-            answer_text = answers_list[row]
-            del self.current_question["answers"][answer_text]
-            self.current_question["answers_images"].pop(row)
+            removed = answers.pop(row)
+            if removed["id"] == self.current_question["correct"]:
+                self.current_question["correct"] = None
+            self.question_edited("Remove Answer")
             self.update_answers_list()
     
     def select_answer(self):
@@ -318,16 +746,16 @@ class TestCreatorApp(QMainWindow):
             return
             
         row = self.answers_list.currentRow()
-        answers_list = list(self.current_question["answers"].items())
-        if 0 <= row < len(answers_list):
+        answers = self.current_question["answers"]
+        if 0 <= row < len(answers):
             self.answer_editor.setEnabled(True)
-            answer_text, is_correct = answers_list[row]
-            self.answer_text.setText(answer_text)
-            self.correct_answer_radio.setChecked(is_correct == 1)
+            answer = answers[row]
+            self.answer_text.setText(answer["text"])
+            self.correct_answer_radio.setChecked(answer["id"] == self.current_question["correct"])
             
             # Load answer image if exists
-            if self.current_question["answers_images"][row] and self.test_folder:
-                img_path = os.path.join(self.test_folder, "imgs", self.current_question["answers_images"][row])
+            if answer["image"] and self.test_folder:
+                img_path = thumbnail_path(os.path.join(self.test_folder, "imgs"), answer["image"], 100, 100)
                 if os.path.exists(img_path):
                     pixmap = QPixmap(img_path)
                     self.answer_image_label.setPixmap(pixmap.scaled(100, 100, Qt.AspectRatioMode.KeepAspectRatio))
@@ -344,33 +772,26 @@ class TestCreatorApp(QMainWindow):
             return
             
         row = self.answers_list.currentRow()
-        answers_list = list(self.current_question["answers"].items())
-        if 0 <= row < len(answers_list):
-            # Get the old answer text
-            old_answer_text = answers_list[row][0]
+        answers = self.current_question["answers"]
+        if 0 <= row < len(answers):
+            answer = answers[row]
             
             # Update the answer text
             new_answer_text = self.answer_text.text().strip()
             if not new_answer_text:
                 QMessageBox.warning(self, "Error", "Answer text cannot be empty")
                 return
-                
-            # If the text changed, update the dictionary
-            if old_answer_text != new_answer_text:
-                # Move the value to the new key
-                value = self.current_question["answers"][old_answer_text]
-                del self.current_question["answers"][old_answer_text]
-                self.current_question["answers"][new_answer_text] = value
+            answer["text"] = new_answer_text
             
-            # Update correctness
-            for i, key in enumerate(self.current_question["answers"].keys()):
-                if i == row:
-                    self.current_question["answers"][key] = 1 if self.correct_answer_radio.isChecked() else 0
-                elif self.correct_answer_radio.isChecked():
-                    # Unset other correct answers
-                    self.current_question["answers"][key] = 0
+            # Correctness is the question's "correct" id, so no other answer changes
+            if self.correct_answer_radio.isChecked():
+                self.current_question["correct"] = answer["id"]
+            elif self.current_question["correct"] == answer["id"]:
+                self.current_question["correct"] = None
             
+            self.question_edited("Edit Answer")
             self.update_answers_list()
+            self.answers_list.setCurrentRow(row)
     
     def set_image(self, img_type):
         if not self.test_folder:
@@ -387,20 +808,11 @@ class TestCreatorApp(QMainWindow):
         if not file_path:
             return
             
-        # Determine destination path
+        # Copy the image under its content digest, reusing an identical stored one
         imgs_folder = os.path.join(self.test_folder, "imgs")
-        filename = os.path.basename(file_path)
-        dest_path = os.path.join(imgs_folder, filename)
-        
-        # Copy the image
         try:
-            # Create folder if needed
-            if not os.path.exists(imgs_folder):
-                os.makedirs(imgs_folder)
-                
-            # Copy the file
-            with open(file_path, "rb") as src, open(dest_path, "wb") as dst:
-                dst.write(src.read())
+            filename = store_image(imgs_folder, file_path)
+            generate_thumbnails(imgs_folder, filename)
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to copy image: {str(e)}")
             return
@@ -408,15 +820,16 @@ class TestCreatorApp(QMainWindow):
         # Update the UI and data
         if img_type == "question":
             self.current_question["question_image"] = filename
-            pixmap = QPixmap(dest_path)
+            pixmap = QPixmap(thumbnail_path(imgs_folder, filename, 200, 150))
             self.question_image_label.setPixmap(pixmap.scaled(200, 150, Qt.AspectRatioMode.KeepAspectRatio))
             self.question_image_label.setText("")
         elif img_type == "answer" and self.answers_list.selectedItems():
             row = self.answers_list.currentRow()
-            self.current_question["answers_images"][row] = filename
-            pixmap = QPixmap(dest_path)
+            self.current_question["answers"][row]["image"] = filename
+            pixmap = QPixmap(thumbnail_path(imgs_folder, filename, 100, 100))
             self.answer_image_label.setPixmap(pixmap.scaled(100, 100, Qt.AspectRatioMode.KeepAspectRatio))
             self.answer_image_label.setText("")
+        self.question_edited("Set Image")
     
     def clear_image(self, img_type):
         if img_type == "question":
@@ -425,12 +838,76 @@ class TestCreatorApp(QMainWindow):
             self.question_image_label.setPixmap(QPixmap())
         elif img_type == "answer" and self.answers_list.selectedItems():
             row = self.answers_list.currentRow()
-            self.current_question["answers_images"][row] = ""
+            self.current_question["answers"][row]["image"] = ""
             self.answer_image_label.setText("No image")
             self.answer_image_label.setPixmap(QPixmap())
+        self.question_edited("Clear Image")
+    
+    def clean_images(self):
+        if not self.test_folder:
+            return
+        imgs_folder = os.path.join(self.test_folder, "imgs")
+        if not os.path.isdir(imgs_folder):
+            return
+            
+        # Questions that undo could bring back still own their images
+        refs = image_refcounts(chain((self.test_data.peek(i) for i in range(len(self.test_data))),
+                                     held_questions(self.undo_stack)))
+        removed, freed = collect_garbage(imgs_folder, refs, dry_run=True)
+        if not removed:
+            self.statusBar().showMessage("No unused images found")
+            return
+        reply = QMessageBox.question(
+            self, "Clean Up Images",
+            f"Delete {len(removed)} unused images ({freed / 1024:.0f} KB)?"
+        )
+        if reply != QMessageBox.StandardButton.Yes:
+            return
+        removed, freed = collect_garbage(imgs_folder, refs)
+        self.statusBar().showMessage(f"Removed {len(removed)} unused images")
+    
+    def validate_test(self):
+        from validator import ERROR, validate, probe_image
+        imgs_folder = os.path.join(self.test_folder, "imgs") if self.test_folder else ""
+        issues = validate(
+            (self.test_data.peek(i) for i in range(len(self.test_data))),
+            lambda name: probe_image(os.path.join(imgs_folder, name))
+        )
+        errors = sum(1 for issue in issues if issue.severity == ERROR)
+        self.statusBar().showMessage(f"Validation: {errors} errors, {len(issues) - errors} warnings")
+        if not issues:
+            QMessageBox.information(self, "Validate Test", "No problems found.")
+            return
+            
+        # List the problems; activating one jumps to its question
+        dialog = QDialog(self)
+        dialog.setWindowTitle("Validation Results")
+        dialog.resize(500, 400)
+        layout = QVBoxLayout(dialog)
+        issues_list = QListWidget()
+        for issue in issues:
+            item = QListWidgetItem(str(issue))
+            item.setData(Qt.ItemDataRole.UserRole, issue.index)
+            issues_list.addItem(item)
+        issues_list.itemActivated.connect(self.show_issue)
+        layout.addWidget(issues_list)
+        dialog.show()
+    
+    def show_issue(self, item):
+        row = item.data(Qt.ItemDataRole.UserRole)
+        if row is not None and row < len(self.test_data):
+            self.set_current_question_row(row)
     
     def closeEvent(self, event):
-        if self.test_data:
+        self.cancel_open()
+        if self.test_folder:
+            # Autosave keeps the folder current; fold the journal into test.json on
+            # exit, leaving an untouched test exactly as it was
+            if self.autosave.has_changes():
+                self.autosave.flush(full=True, wait=True)
+            self.autosave.close()
+            event.accept()
+        elif self.test_data:
             reply = QMessageBox.question(
                 self, "Save Changes?",
                 "You have unsaved changes. Would you like to save before exiting?",
@@ -438,7 +915,7 @@ class TestCreatorApp(QMainWindow):
             )
             
             if reply == QMessageBox.StandardButton.Save:
-                self.save_test()
+                self.save_test(wait=True)
                 event.accept()
             elif reply == QMessageBox.StandardButton.Cancel:
                 event.ignore()
@@ -448,9 +925,14 @@ class TestCreatorApp(QMainWindow):
             event.accept()
 
 if __name__ == "__main__":
+    timer = StartupTimer("creator")
+    timer.mark("imports")
     app = QApplication(sys.argv)
+    timer.mark("application")
     window = TestCreatorApp()
+    timer.mark("window")
     window.show()
+    timer.watch(window)
     sys.exit(app.exec())
 
 
@@ -0,0 +1,151 @@
+import os
+import sys
+import time
+import random
+from collections import Counter
+from questions import correct_index
+
+
+class Question:
+    # Compact, read-only record of one test.json question
+    __slots__ = ("text", "image", "answers", "images", "correct")
+
+    def __init__(self, text, image, answers, images, correct):
+        self.text = text
+        self.image = image
+        self.answers = answers
+        self.images = images
+        self.correct = correct
+
+    @classmethod
+    def from_dict(cls, data):
+        # The correct answer is resolved to its position once, here, so grading
+        # is an index comparison
+        answers = data["answers"]
+        return cls(data["question"], data["question_image"], tuple(answer["text"] for answer in answers),
+                   tuple(answer["image"] for answer in answers), correct_index(data))
+
+
+def load_questions(questions):
+    return [q if isinstance(q, Question) else Question.from_dict(q) for q in questions]
+
+
+class QuizSession:
+    # One candidate's run through a test: answer shuffling, grading and score.
+    # `questions` may be dicts (a lazy QuestionSource or TestPack) or Question records.
+    # Each question's answer order depends only on the seed and its position, so a
+    # session can be restored mid-way without replaying the earlier shuffles.
+    __slots__ = ("questions", "seed", "current", "score", "order", "record", "results")
+
+    def __init__(self, questions, seed=None):
+        self.questions = questions
+        self.seed = random.randrange(1 << 32) if seed is None else seed
+        self.current = 0
+        self.score = 0
+        self.order = None
+        self.record = None
+        self.results = []
+
+    def __len__(self):
+        return len(self.questions)
+
+    def restore(self, results):
+        # Continues after the given per-question results, e.g. from a checkpoint
+        self.results = [bool(correct) for correct in results]
+        self.score = sum(self.results)
+        self.current = len(self.results)
+        self.order = None
+        self.record = None
+
+    def finished(self):
+        # A lazily indexed source is only scanned as far as the current question
+        has_index = getattr(self.questions, "has_index", None)
+        if has_index is not None:
+            return not has_index(self.current)
+        return self.current >= len(self.questions)
+
+    def question(self):
+        # The current question, with its answers shuffled into display order
+        if self.record is None:
+            if self.finished():
+                return None
+            record = self.questions[self.current]
+            if not isinstance(record, Question):
+                record = Question.from_dict(record)
+            self.order = list(range(len(record.answers)))
+            random.Random((self.seed << 32) | self.current).shuffle(self.order)
+            self.record = record
+        return self.record
+
+    def answers(self):
+        record = self.question()
+        return [(record.answers[i], record.images[i]) for i in self.order]
+
+    def correct_choice(self):
+        record = self.question()
+        return self.order.index(record.correct) if record.correct >= 0 else -1
+
+    def answer(self, choice):
+        # Grades the answer shown at display position `choice` and moves on
+        record = self.question()
+        correct = self.order[choice] == record.correct
+        if correct:
+            self.score += 1
+        self.results.append(correct)
+        self.current += 1
+        self.order = None
+        self.record = None
+        return correct
+
+    def choose(self, text):
+        # Scripted answering by answer text; unknown text counts as wrong
+        record = self.question()
+        for choice, i in enumerate(self.order):
+            if record.answers[i] == text:
+                return self.answer(choice)
+        return self.skip()
+
+    def skip(self):
+        self.question()
+        self.results.append(False)
+        self.current += 1
+        self.order = None
+        self.record = None
+        return False
+
+    def percentage(self):
+        return self.score / len(self.questions) * 100 if len(self.questions) else 0.0
+
+
+def simulate(questions, sessions, seed=0):
+    # Drives `sessions` random candidates through preloaded questions; returns
+    # the score histogram and sessions per second
+    records = load_questions(questions)
+    rng = random.Random(seed)
+    scores = Counter()
+    start = time.perf_counter()
+    for _ in range(sessions):
+        session = QuizSession(records, rng.randrange(1 << 32))
+        while not session.finished():
+            count = len(session.question().answers)
+            if count:
+                session.answer(rng.randrange(count))
+            else:
+                session.skip()
+        scores[session.score] += 1
+    elapsed = time.perf_counter() - start
+    return scores, sessions / elapsed if elapsed else float("inf")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("usage: engine.py <test folder or .tpk> [sessions]")
+        sys.exit(2)
+    from questions import open_questions
+    from testpack import TestPack, is_pack
+    path = sys.argv[1]
+    source = TestPack(path) if is_pack(path) else open_questions(os.path.join(path, "test.json"))
+    scores, rate = simulate(source, int(sys.argv[2]) if len(sys.argv) > 2 else 1000)
+    for score in sorted(scores):
+        print(f"{score:>5}: {scores[score]}")
+    print(f"{sum(scores.values())} sessions, {rate:.0f} sessions/s")
@@ -0,0 +1,291 @@
+import os
+import sys
+import time
+import base64
+import argparse
+import mimetypes
+from html import escape
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
+from questions import open_questions, correct_index
+from testpack import TestPack, is_pack
+from thumbnails import best_variant
+
+# Questions per HTML page and per PDF part; each one is a job for the pool
+CHUNK_QUESTIONS = 250
+# Boxes images are printed in; the smallest thumbnail that fits is inlined
+QUESTION_IMAGE_SIZE = (300, 300)
+ANSWER_IMAGE_SIZE = (100, 100)
+LETTERS = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+PAGE_STYLE = """
+body { font-family: sans-serif; color: #2F2F2F; margin: 2em auto; max-width: 50em; }
+.question { break-inside: avoid; page-break-inside: avoid; margin-bottom: 1.5em; }
+.question p { font-weight: bold; }
+ol.answers { list-style-type: upper-alpha; }
+.image { display: block; }
+ol.answers .image { display: inline-block; vertical-align: middle; }
+ol.answers img { vertical-align: middle; }
+.key { border-top: 1px solid #999; padding-top: 1em; }
+nav { margin: 1em 0; }
+"""
+
+
+def open_source(test_path):
+    return TestPack(test_path) if is_pack(test_path) else open_questions(os.path.join(test_path, "test.json"))
+
+
+def chunk_name(chunk, fmt):
+    return f"{'page' if fmt == 'html' else 'part'}-{chunk + 1:05d}.{fmt}"
+
+
+def answer_letter(position):
+    return LETTERS[position] if position < len(LETTERS) else str(position + 1)
+
+
+class ImageSource:
+    # Image bytes by name from a test folder's imgs/ or from a pack, always
+    # the smallest stored variant that still fills the box it is printed in
+
+    def __init__(self, test_path, source):
+        self.pack = source if isinstance(source, TestPack) else None
+        self.imgs_folder = None if self.pack else os.path.join(test_path, "imgs")
+
+    def exists(self, name):
+        if self.pack is not None:
+            return name in self.pack.image_spans
+        return os.path.isfile(os.path.join(self.imgs_folder, name))
+
+    def read(self, name, size):
+        variant = best_variant(name, size, self.exists)
+        if self.pack is not None:
+            data = self.pack.image_data(variant)
+            return variant, bytes(data) if data is not None else None
+        try:
+            with open(os.path.join(self.imgs_folder, variant), "rb") as f:
+                return variant, f.read()
+        except OSError:
+            return variant, None
+
+
+def shrink_image(data, size):
+    # Images without thumbnails are scaled down while decoding and re-encoded,
+    # so a bank of photos does not print at full resolution
+    from PyQt6.QtCore import QBuffer, QByteArray, QIODevice, QSize, Qt
+    from PyQt6.QtGui import QImageReader
+    buffer = QBuffer()
+    buffer.setData(QByteArray(data))
+    reader = QImageReader(buffer)
+    reader.setAutoTransform(True)
+    source_size = reader.size()
+    box = QSize(*size)
+    if not source_size.isValid() or (source_size.width() <= box.width() and source_size.height() <= box.height()):
+        return None
+    reader.setScaledSize(source_size.scaled(box, Qt.AspectRatioMode.KeepAspectRatio))
+    image = reader.read()
+    if image.isNull():
+        return None
+    out = QBuffer()
+    out.open(QIODevice.OpenModeFlag.WriteOnly)
+    image.save(out, "PNG")
+    return image, bytes(out.data())
+
+
+# Set up once per worker process by _init_worker
+_worker = {}
+
+
+def _init_worker(test_path, fmt, key):
+    source = open_source(test_path)
+    _worker.update(source=source, images=ImageSource(test_path, source), fmt=fmt, key=key)
+    if fmt == "pdf":
+        # Text layout and PDF output need a GUI application, though no screen
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+        from PyQt6.QtGui import QGuiApplication
+        _worker["app"] = QGuiApplication.instance() or QGuiApplication([])
+
+
+@lru_cache(maxsize=256)
+def _data_uri(name, size):
+    # A repeated image is only read and encoded once per worker
+    variant, data = _worker["images"].read(name, size)
+    if data is None:
+        return None
+    shrunk = shrink_image(data, size) if variant == name else None
+    if shrunk is not None:
+        data, mime = shrunk[1], "image/png"
+    else:
+        mime = mimetypes.guess_type(variant)[0] or "application/octet-stream"
+    return f"data:{mime};base64,{base64.b64encode(data).decode('ascii')}"
+
+
+def question_html(number, question, image_tag):
+    # image_tag(name, size) gives the markup for an image, "" to leave it out
+    parts = [f'<div class="question" id="q{number}"><p>{number}. {escape(question.get("question", ""))}</p>']
+    if question.get("question_image"):
+        parts.append(image_tag(question["question_image"], QUESTION_IMAGE_SIZE))
+    parts.append('<ol class="answers">')
+    for answer in question["answers"]:
+        picture = image_tag(answer["image"], ANSWER_IMAGE_SIZE) if answer.get("image") else ""
+        parts.append(f"<li>{escape(answer['text'])} {picture}</li>")
+    parts.append("</ol></div>\n")
+    return "".join(parts)
+
+
+def key_html(first, answers):
+    # answers: correct positions for questions first, first + 1, ...
+    items = ", ".join(f"{first + i}. {answer_letter(c) if c >= 0 else '-'}" for i, c in enumerate(answers))
+    return f'<div class="key"><p>Answer key</p><p>{items}</p></div>\n'
+
+
+def _write_html(path, chunk, chunks, start, stop):
+    source, key = _worker["source"], _worker["key"]
+    answers = []
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(f'<!doctype html>\n<html><head><meta charset="utf-8"><title>Questions {start + 1}-{stop}</title>'
+                f"<style>{PAGE_STYLE}</style></head><body>\n")
+        nav = ['<nav><a href="index.html">Contents</a>']
+        if chunk > 0:
+            nav.append(f' | <a href="{chunk_name(chunk - 1, "html")}">Previous</a>')
+        if chunk + 1 < chunks:
+            nav.append(f' | <a href="{chunk_name(chunk + 1, "html")}">Next</a>')
+        nav.append("</nav>\n")
+        f.write("".join(nav))
+        inlined = {}
+
+        def image_tag(name, size):
+            # Each image is inlined once per page, as a style rule the later
+            # uses share, so a picture on every question is not repeated
+            if (name, size) not in inlined:
+                uri = _data_uri(name, size)
+                inlined[name, size] = f"i{len(inlined)}" if uri else None
+                if uri:
+                    f.write(f'<style>.{inlined[name, size]}::before {{ content: url("{uri}"); }}</style>\n')
+            image_class = inlined[name, size]
+            return f'<span class="image {image_class}"></span>' if image_class else ""
+
+        # Written a question at a time; a page is never held whole in memory
+        for i in range(start, stop):
+            question = source[i]
+            f.write(question_html(i + 1, question, image_tag))
+            answers.append(correct_index(question))
+        if key:
+            f.write(key_html(start + 1, answers))
+        f.write("".join(nav) + "</body></html>\n")
+
+
+def _write_pdf(path, start, stop):
+    from PyQt6.QtCore import QMarginsF, QUrl
+    from PyQt6.QtGui import QImage, QPageLayout, QPageSize, QPdfWriter, QTextDocument
+    source, images, key = _worker["source"], _worker["images"], _worker["key"]
+    document = QTextDocument()
+    document.setDefaultStyleSheet(PAGE_STYLE)
+    added = {}
+
+    def image_tag(name, size):
+        # QTextDocument does not read data URIs; images go in as resources
+        if (name, size) not in added:
+            variant, data = images.read(name, size)
+            added[name, size] = None
+            if data is not None:
+                shrunk = shrink_image(data, size) if variant == name else None
+                image = shrunk[0] if shrunk is not None else QImage.fromData(data)
+                if not image.isNull():
+                    added[name, size] = url = f"img:{size[0]}x{size[1]}/{name}"
+                    document.addResource(QTextDocument.ResourceType.ImageResource.value, QUrl(url), image)
+        url = added[name, size]
+        return f'<img src="{escape(url)}">' if url else ""
+
+    parts, answers = [], []
+    for i in range(start, stop):
+        question = source[i]
+        parts.append(question_html(i + 1, question, image_tag))
+        answers.append(correct_index(question))
+    if key:
+        parts.append(key_html(start + 1, answers))
+    document.setHtml("<html><body>" + "".join(parts) + "</body></html>")
+    tmp_path = path + ".tmp"
+    writer = QPdfWriter(tmp_path)
+    writer.setTitle(f"Questions {start + 1}-{stop}")
+    writer.setPageSize(QPageSize(QPageSize.PageSizeId.A4))
+    writer.setPageMargins(QMarginsF(15, 15, 15, 15), QPageLayout.Unit.Millimeter)
+    writer.setResolution(150)
+    document.print(writer)
+    # The file is only complete once the writer is gone
+    del writer
+    os.replace(tmp_path, path)
+
+
+def _export_job(args):
+    out_dir, chunk, chunks, start, stop = args
+    path = os.path.join(out_dir, chunk_name(chunk, _worker["fmt"]))
+    try:
+        if _worker["fmt"] == "html":
+            _write_html(path + ".tmp", chunk, chunks, start, stop)
+            os.replace(path + ".tmp", path)
+        else:
+            _write_pdf(path, start, stop)
+    except Exception as e:
+        return chunk, start, stop, str(e)
+    return chunk, start, stop, None
+
+
+def export_test(test_path, out_dir, fmt="html", chunk_size=CHUNK_QUESTIONS, workers=None, key=False, progress=None):
+    # Renders the test in chunks of chunk_size questions across a process
+    # pool, one HTML page or PDF part per chunk, and writes an index.html
+    # linking them as the chunks finish. Returns [(chunk, start, stop, error)].
+    source = open_source(test_path)
+    try:
+        # Also builds the question index, so the workers start from it
+        count = len(source)
+    finally:
+        source.close()
+    os.makedirs(out_dir, exist_ok=True)
+    chunks = (count + chunk_size - 1) // chunk_size
+    jobs = [(out_dir, chunk, chunks, chunk * chunk_size, min(count, (chunk + 1) * chunk_size))
+            for chunk in range(chunks)]
+    title = escape(os.path.basename(os.path.normpath(test_path)))
+    results = []
+    index_tmp = os.path.join(out_dir, "index.html.tmp")
+    with open(index_tmp, "w", encoding="utf-8") as index, \
+            ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                initargs=(test_path, fmt, key)) as pool:
+        index.write(f'<!doctype html>\n<html><head><meta charset="utf-8"><title>{title}</title>'
+                    f"<style>{PAGE_STYLE}</style></head><body>\n<h1>{title}</h1>\n"
+                    f"<p>{count} questions</p>\n<ul>\n")
+        for result in pool.map(_export_job, jobs):
+            chunk, start, stop, error = result
+            results.append(result)
+            if error is None:
+                index.write(f'<li><a href="{chunk_name(chunk, fmt)}">Questions {start + 1}-{stop}</a></li>\n')
+            if progress is not None:
+                progress(len(results), chunks)
+        index.write("</ul>\n</body></html>\n")
+    os.replace(index_tmp, os.path.join(out_dir, "index.html"))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export a test to static HTML pages or PDF parts")
+    parser.add_argument("test", help="test folder or .tpk")
+    parser.add_argument("out", help="output folder")
+    parser.add_argument("--format", choices=("html", "pdf"), default="html")
+    parser.add_argument("--chunk", type=int, default=CHUNK_QUESTIONS, help="questions per page or PDF part")
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--key", action="store_true", help="add an answer key after each chunk")
+    args = parser.parse_args(argv)
+
+    began = time.perf_counter()
+    results = export_test(args.test, args.out, args.format, max(1, args.chunk), args.workers, args.key)
+    failed = [(chunk, error) for chunk, _, _, error in results if error]
+    for chunk, error in failed:
+        print(f"{chunk_name(chunk, args.format)}: {error}")
+    questions = sum(stop - start for _, start, stop, error in results if not error)
+    print(f"Exported {questions} questions to {len(results) - len(failed)} {args.format.upper()} files "
+          f"in {time.perf_counter() - began:.1f}s")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
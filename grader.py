@@ -0,0 +1,196 @@
+import os
+import csv
+import sys
+import json
+import argparse
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from engine import Question
+from questions import open_questions
+from testpack import TestPack, is_pack
+
+CHUNK_ROWS = 5000
+
+# Answer sheets come in two shapes, one candidate per row/line:
+#   CSV:   candidate,1,2,3,...   (column header = 1-based question number, cell = answer text)
+#   JSONL: {"candidate": "...", "answers": ["4", "obama", ...]}  or  {"answers": {"1": "4", ...}}
+
+_answer_key = None
+
+
+def build_answer_key(questions):
+    # Correct answer text per question, None where a question has no correct answer
+    key = []
+    for question in questions:
+        record = question if isinstance(question, Question) else Question.from_dict(question)
+        key.append(record.answers[record.correct] if record.correct >= 0 else None)
+    return key
+
+
+def _init_worker(answer_key):
+    global _answer_key
+    _answer_key = answer_key
+
+
+def grade_chunk(rows):
+    # rows: list of (candidate, {question index: answer text}); returns the scores
+    # plus per-question attempt and correct counts for the chunk
+    key = _answer_key
+    attempts = array("I", bytes(4 * len(key)))
+    correct = array("I", bytes(4 * len(key)))
+    scores = []
+    for candidate, answers in rows:
+        score = 0
+        for index, text in answers.items():
+            if 0 <= index < len(key) and text != "":
+                attempts[index] += 1
+                if text == key[index]:
+                    correct[index] += 1
+                    score += 1
+        scores.append((candidate, score))
+    return scores, attempts, correct
+
+
+def read_csv(f):
+    # The header is checked here, before any sheet is graded
+    reader = csv.reader(f)
+    header = next(reader, [])
+    columns = []
+    for column, name in enumerate(header[1:], start=2):
+        number = name.strip().lstrip("Qq")
+        if not (number.isascii() and number.isdigit()) or int(number) < 1:
+            raise ValueError(f"column {column}: {name!r} is not a question number (expected Q1, Q2, ...)")
+        columns.append(int(number) - 1)
+    return _csv_sheets(reader, columns)
+
+
+def _csv_sheets(reader, columns):
+    for row in reader:
+        if row:
+            yield row[0], {index: text for index, text in zip(columns, row[1:])}
+
+
+def read_jsonl(f, on_error):
+    # Sheets that can't be read are skipped and passed to on_error(line, message)
+    for n, line in enumerate(f, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield _jsonl_sheet(n, line)
+        except ValueError as e:
+            on_error(n, str(e))
+
+
+def _jsonl_sheet(n, line):
+    try:
+        sheet = json.loads(line)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"invalid JSON: {e.msg}") from None
+    answers = sheet.get("answers") if isinstance(sheet, dict) else None
+    if isinstance(answers, dict):
+        numbered = {}
+        for k, v in answers.items():
+            if not (k.isascii() and k.isdigit()) or int(k) < 1:
+                raise ValueError(f"{k!r} is not a question number (expected 1, 2, ...)")
+            numbered[int(k) - 1] = v
+    elif isinstance(answers, list):
+        numbered = dict(enumerate(answers))
+    else:
+        raise ValueError('no "answers" list or object')
+    for index, text in numbered.items():
+        if text is not None and not isinstance(text, str):
+            raise ValueError(f"answer to question {index + 1} is not text")
+    return str(sheet.get("candidate", n)), {i: v for i, v in numbered.items() if v is not None}
+
+
+def chunked(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def grade(answer_key, sheets, on_scores, workers=None, chunk_rows=CHUNK_ROWS):
+    # Grades a stream of sheets over a process pool, keeping at most two chunks
+    # per worker in flight so memory stays flat however long the input is
+    total_attempts = array("Q", bytes(8 * len(answer_key)))
+    total_correct = array("Q", bytes(8 * len(answer_key)))
+    workers = workers or os.cpu_count() or 1
+
+    def collect(future):
+        scores, attempts, correct = future.result()
+        on_scores(scores)
+        for i in range(len(answer_key)):
+            total_attempts[i] += attempts[i]
+            total_correct[i] += correct[i]
+
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(answer_key,)) as pool:
+        in_flight = []
+        for chunk in chunked(sheets, chunk_rows):
+            in_flight.append(pool.submit(grade_chunk, chunk))
+            if len(in_flight) >= workers * 2:
+                collect(in_flight.pop(0))
+        for future in in_flight:
+            collect(future)
+    return total_attempts, total_correct
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Grade recorded answer sheets against a test")
+    parser.add_argument("test", help="test folder or .tpk pack")
+    parser.add_argument("sheets", help="answer sheets, .csv or .jsonl")
+    parser.add_argument("-o", "--scores", default="-", help="per-candidate scores CSV (default: stdout)")
+    parser.add_argument("--stats", help="per-question statistics CSV")
+    parser.add_argument("--workers", type=int, help="grading processes (default: CPU count)")
+    args = parser.parse_args(argv)
+
+    source = TestPack(args.test) if is_pack(args.test) else open_questions(os.path.join(args.test, "test.json"))
+    try:
+        answer_key = build_answer_key(source)
+    finally:
+        source.close()
+    total = len(answer_key)
+
+    skipped = []
+
+    def on_error(line, message):
+        skipped.append(line)
+        print(f"{args.sheets}:{line}: {message}", file=sys.stderr)
+
+    with open(args.sheets, newline="", encoding="utf-8") as f:
+        try:
+            sheets = read_jsonl(f, on_error) if args.sheets.endswith(".jsonl") else read_csv(f)
+        except ValueError as e:
+            print(f"{args.sheets}: {e}", file=sys.stderr)
+            sys.exit(1)
+
+        out = sys.stdout if args.scores == "-" else open(args.scores, "w", newline="")
+        writer = csv.writer(out)
+        writer.writerow(["candidate", "score", "total", "percentage"])
+
+        def on_scores(scores):
+            for candidate, score in scores:
+                writer.writerow([candidate, score, total, f"{score / total * 100 if total else 0:.1f}"])
+
+        attempts, correct = grade(answer_key, sheets, on_scores, args.workers)
+    if out is not sys.stdout:
+        out.close()
+
+    if args.stats:
+        with open(args.stats, "w", newline="") as f:
+            stats = csv.writer(f)
+            stats.writerow(["question", "correct_answer", "attempts", "correct", "p_correct"])
+            for i, answer in enumerate(answer_key):
+                p = correct[i] / attempts[i] if attempts[i] else 0
+                stats.writerow([i + 1, answer if answer is not None else "", attempts[i], correct[i], f"{p:.3f}"])
+    if skipped:
+        print(f"Skipped {len(skipped)} unreadable answer sheets", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+import copy
+from PyQt6.QtGui import QUndoCommand
+
+UNDO_LIMIT = 200
+_MISSING = object()
+
+
+def diff_fields(before, after):
+    # Top-level fields that differ, as {field: (old, new)}; a question diff
+    # only holds what changed, never the whole question or test
+    diff = {}
+    for key in before.keys() | after.keys():
+        old = before.get(key, _MISSING)
+        new = after.get(key, _MISSING)
+        if old != new:
+            diff[key] = (old, copy.deepcopy(new))
+    return diff
+
+
+def apply_fields(question, diff, undo):
+    for key, (old, new) in diff.items():
+        value = old if undo else new
+        if value is _MISSING:
+            question.pop(key, None)
+        else:
+            question[key] = copy.deepcopy(value)
+
+
+def held_questions(stack):
+    # Every question an undo or redo step could bring back, e.g. so the images
+    # they use are not cleaned up from under them
+    for i in range(stack.count()):
+        yield from stack.command(i).held_questions()
+
+
+class EditQuestion(QUndoCommand):
+    TYPING = 1
+
+    def __init__(self, editor, row, diff, text):
+        super().__init__(text)
+        self.editor = editor
+        self.row = row
+        self.diff = diff
+        # The edit is already on screen when the command is pushed
+        self.applied = True
+
+    def id(self):
+        # Consecutive keystrokes in the question text collapse into one step
+        return self.TYPING if self.diff.keys() == {"question"} else -1
+
+    def mergeWith(self, other):
+        if other.row != self.row or other.diff.keys() != {"question"}:
+            return False
+        old = self.diff["question"][0]
+        new = other.diff["question"][1]
+        self.diff["question"] = (old, new)
+        self.setObsolete(old == new)
+        return True
+
+    def held_questions(self):
+        # Both sides of the diff, shaped as questions
+        for side in (0, 1):
+            question = {"question_image": "", "answers": []}
+            for key, values in self.diff.items():
+                if values[side] is not _MISSING:
+                    question[key] = values[side]
+            yield question
+
+    def redo(self):
+        if self.applied:
+            self.applied = False
+            return
+        self._apply(undo=False)
+
+    def undo(self):
+        self._apply(undo=True)
+
+    def _apply(self, undo):
+        question = self.editor.test_data[self.row]
+        apply_fields(question, self.diff, undo)
+        self.editor.question_changed(self.row, question)
+        self.editor.show_question_row(self.row)
+
+
+class InsertQuestion(QUndoCommand):
+    def __init__(self, editor, row, question, text="Add Question"):
+        super().__init__(text)
+        self.editor = editor
+        self.row = row
+        self.question = question
+
+    def held_questions(self):
+        return [self.question]
+
+    def redo(self):
+        self.editor.insert_row(self.row, self.question)
+        self.editor.show_question_row(self.row)
+
+    def undo(self):
+        self.question = self.editor.remove_row(self.row)
+
+
+class InsertQuestions(QUndoCommand):
+    # A bulk insert, e.g. a CSV import, as a single step
+    def __init__(self, editor, row, questions, text):
+        super().__init__(text)
+        self.editor = editor
+        self.row = row
+        self.questions = questions
+
+    def held_questions(self):
+        return self.questions
+
+    def redo(self):
+        self.editor.insert_rows(self.row, self.questions)
+
+    def undo(self):
+        self.questions = self.editor.remove_rows(self.row, len(self.questions))
+
+
+class RemoveQuestion(QUndoCommand):
+    def __init__(self, editor, row, text="Remove Question"):
+        super().__init__(text)
+        self.editor = editor
+        self.row = row
+        self.question = None
+
+    def held_questions(self):
+        return [self.question] if self.question is not None else []
+
+    def redo(self):
+        self.question = self.editor.remove_row(self.row)
+
+    def undo(self):
+        self.editor.insert_row(self.row, self.question)
+        self.editor.show_question_row(self.row)
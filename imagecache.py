@@ -0,0 +1,124 @@
+import os
+import time
+from collections import OrderedDict
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, QSize, QBuffer, QByteArray, Qt, pyqtSignal
+from PyQt6.QtGui import QImage, QImageReader, QPixmap
+
+
+class _DecodeTask(QRunnable):
+    def __init__(self, cache, key, ref, size):
+        super().__init__()
+        self.cache = cache
+        self.key = key
+        self.ref = ref
+        self.size = size
+
+    def run(self):
+        start = time.perf_counter()
+        if isinstance(self.ref, str):
+            reader = QImageReader(self.ref)
+        else:
+            # In-memory image, e.g. a blob mapped from a test pack
+            buffer = QBuffer()
+            buffer.setData(QByteArray(bytes(self.ref.data())))
+            reader = QImageReader(buffer)
+        reader.setAutoTransform(True)
+        # Let the codec decode straight to the target size where it can (JPEG does),
+        # so big photos never get fully expanded in memory
+        source_size = reader.size()
+        if source_size.isValid():
+            reader.setScaledSize(source_size.scaled(self.size, Qt.AspectRatioMode.KeepAspectRatio))
+        image = reader.read()
+        if not image.isNull() and (image.width() > self.size.width() or image.height() > self.size.height()):
+            image = image.scaled(self.size, Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation)
+        try:
+            self.cache._decoded.emit(self.key, image, time.perf_counter() - start)
+        except RuntimeError:
+            # The cache went away (window closed) while this decode was running
+            pass
+
+
+class ImageCache(QObject):
+    _decoded = pyqtSignal(object, QImage, float)
+
+    def __init__(self, parent=None, max_bytes=64 * 1024 * 1024, threads=None):
+        super().__init__(parent)
+        self.max_bytes = max_bytes
+        self.used_bytes = 0
+        self.pixmaps = OrderedDict()
+        self.decode_times = {}
+        self.pending = {}
+        self.pool = QThreadPool(self)
+        if threads is None:
+            threads = max(2, (os.cpu_count() or 2) - 1)
+        self.pool.setMaxThreadCount(threads)
+        self._decoded.connect(self._on_decoded)
+
+    def make_key(self, ref, size):
+        # ref is a file path or an object with cache_key() and data(), like testpack.PackImage
+        if isinstance(ref, str):
+            try:
+                base = (ref, os.stat(ref).st_mtime_ns)
+            except OSError:
+                return None
+        else:
+            base = ref.cache_key()
+            if base is None:
+                return None
+        return base + (size.width(), size.height())
+
+    def request(self, ref, size, callback=None):
+        # Returns False when the image does not exist; otherwise the callback is
+        # called with a scaled QPixmap, right away on a hit or later on the GUI thread
+        key = self.make_key(ref, size)
+        if key is None:
+            return False
+        pixmap = self.pixmaps.get(key)
+        if pixmap is not None:
+            self.pixmaps.move_to_end(key)
+            if callback:
+                callback(pixmap)
+            return True
+        callbacks = self.pending.get(key)
+        if callbacks is None:
+            self.pending[key] = [callback] if callback else []
+            self.pool.start(_DecodeTask(self, key, ref, QSize(size)))
+        elif callback:
+            callbacks.append(callback)
+        return True
+
+    def prefetch(self, ref, size):
+        return self.request(ref, size)
+
+    def decode_seconds(self, key):
+        # Worker time spent decoding a cached image, whenever that happened
+        return self.decode_times.get(key, 0.0)
+
+    def shutdown(self):
+        # Decodes may be reading from a mapped test pack, so let them finish first
+        self.pool.clear()
+        self.pool.waitForDone()
+
+    def clear(self):
+        self.pixmaps.clear()
+        self.decode_times.clear()
+        self.used_bytes = 0
+
+    def _on_decoded(self, key, image, seconds):
+        callbacks = self.pending.pop(key, [])
+        if image.isNull():
+            return
+        pixmap = QPixmap.fromImage(image)
+        self._store(key, pixmap)
+        self.decode_times[key] = seconds
+        for callback in callbacks:
+            callback(pixmap)
+
+    def _store(self, key, pixmap):
+        cost = pixmap.width() * pixmap.height() * max(pixmap.depth() // 8, 1)
+        self.pixmaps[key] = pixmap
+        self.used_bytes += cost
+        while self.used_bytes > self.max_bytes and len(self.pixmaps) > 1:
+            old_key, old = self.pixmaps.popitem(last=False)
+            self.decode_times.pop(old_key, None)
+            self.used_bytes -= old.width() * old.height() * max(old.depth() // 8, 1)
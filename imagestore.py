@@ -0,0 +1,148 @@
+import os
+import sys
+import hashlib
+import tempfile
+from collections import Counter
+from questions import open_questions, save_questions, QuestionList
+from autosave import apply_journal, journal_path
+from thumbnails import remove_thumbnails
+
+CHUNK_SIZE = 1 << 20
+DIGEST_SIZE = 16
+
+
+def file_digest(path):
+    h = hashlib.blake2b(digest_size=DIGEST_SIZE)
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def store_image(imgs_folder, src_path):
+    # Copies src_path into imgs_folder under its content digest, hashing while
+    # it streams; an identical image that is already stored is reused
+    os.makedirs(imgs_folder, exist_ok=True)
+    ext = os.path.splitext(src_path)[1].lower()
+    h = hashlib.blake2b(digest_size=DIGEST_SIZE)
+    fd, tmp_path = tempfile.mkstemp(dir=imgs_folder, prefix=".incoming-")
+    try:
+        with open(src_path, "rb") as src, os.fdopen(fd, "wb") as dst:
+            while True:
+                chunk = src.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                h.update(chunk)
+                dst.write(chunk)
+        filename = h.hexdigest() + ext
+        dest_path = os.path.join(imgs_folder, filename)
+        if os.path.exists(dest_path):
+            os.remove(tmp_path)
+        else:
+            os.replace(tmp_path, dest_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return filename
+
+
+def question_images(question):
+    if question["question_image"]:
+        yield question["question_image"]
+    for answer in question["answers"]:
+        if answer["image"]:
+            yield answer["image"]
+
+
+def image_refcounts(questions):
+    refs = Counter()
+    for question in questions:
+        refs.update(question_images(question))
+    return refs
+
+
+def peek_all(questions):
+    return (questions.peek(i) for i in range(len(questions)))
+
+
+def folder_refcounts(folder):
+    # Counts references in test.json plus any autosave journal not folded in yet
+    test_file = os.path.join(folder, "test.json")
+    questions = QuestionList(open_questions(test_file))
+    try:
+        apply_journal(test_file, questions)
+        return image_refcounts(peek_all(questions))
+    finally:
+        questions.close()
+
+
+def unreferenced_images(imgs_folder, refs):
+    unused = []
+    with os.scandir(imgs_folder) as entries:
+        for entry in entries:
+            if entry.is_file() and not entry.name.startswith(".") and entry.name not in refs:
+                unused.append(entry.name)
+    return unused
+
+
+def collect_garbage(imgs_folder, refs, dry_run=False):
+    # Removes images nothing refers to; returns their names and the bytes freed
+    removed = unreferenced_images(imgs_folder, refs)
+    freed = 0
+    for name in removed:
+        path = os.path.join(imgs_folder, name)
+        freed += os.path.getsize(path)
+        if not dry_run:
+            os.remove(path)
+            remove_thumbnails(imgs_folder, name)
+    return removed, freed
+
+
+def migrate_folder(folder):
+    # Renames every referenced image to its digest, so duplicates collapse into
+    # one file, then rewrites test.json and drops the leftovers
+    test_file = os.path.join(folder, "test.json")
+    imgs_folder = os.path.join(folder, "imgs")
+    questions = QuestionList(open_questions(test_file))
+    journaled = apply_journal(test_file, questions)
+    renamed = {}
+    for name in image_refcounts(peek_all(questions)):
+        path = os.path.join(imgs_folder, name)
+        if os.path.isfile(path):
+            new_name = store_image(imgs_folder, path)
+            if new_name != name:
+                renamed[name] = new_name
+    if renamed or journaled:
+        for i in range(len(questions)):
+            question = questions.peek(i)
+            if any(name in renamed for name in question_images(question)):
+                question = questions[i]
+                question["question_image"] = renamed.get(question["question_image"], question["question_image"])
+                for answer in question["answers"]:
+                    answer["image"] = renamed.get(answer["image"], answer["image"])
+        save_questions(test_file, questions)
+        if journaled:
+            os.remove(journal_path(test_file))
+    questions.close()
+    removed, freed = collect_garbage(imgs_folder, folder_refcounts(folder))
+    return len(renamed), removed, freed
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3 or sys.argv[1] not in ("gc", "migrate"):
+        print("usage: imagestore.py gc <test folder> [--dry-run]\n       imagestore.py migrate <test folder>")
+        sys.exit(2)
+    folder = sys.argv[2]
+    if sys.argv[1] == "gc":
+        refs = folder_refcounts(folder)
+        removed, freed = collect_garbage(os.path.join(folder, "imgs"), refs, dry_run="--dry-run" in sys.argv)
+    else:
+        renamed, removed, freed = migrate_folder(folder)
+        print(f"Renamed {renamed} images to their digests")
+    for name in removed:
+        print(name)
+    print(f"{len(removed)} unreferenced images, {freed} bytes")
@@ -0,0 +1,276 @@
+import os
+import re
+import csv
+import sys
+import argparse
+from itertools import chain
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from autosave import apply_journal, journal_path
+from imagestore import store_image
+from questions import QuestionList, commit_snapshot, encode_question, open_questions, write_snapshot
+from thumbnails import generate_thumbnails, needs_thumbnails
+
+LIST_SEP = "|"
+# Rows whose images are still being copied; bounds memory however long the CSV is
+WINDOW = 256
+LETTERS = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+# Default column names (case-insensitive). Answers are either numbered columns
+# (answer1, answer 2, option_3, choice4, ...) or one "answers" column split on "|".
+_NUMBERED = re.compile(r"^(?:answer|option|choice)[ _]?(\d+)$")
+_NUMBERED_IMAGE = re.compile(r"^(?:answer|option|choice)[ _]?(\d+)[ _]image$")
+QUESTION_NAMES = ("question", "question text", "prompt")
+QUESTION_IMAGE_NAMES = ("question_image", "question image", "image")
+ANSWERS_NAMES = ("answers", "options", "choices")
+ANSWER_IMAGES_NAMES = ("answers_images", "answer images", "answer_images")
+CORRECT_NAMES = ("correct", "correct answer", "correct_answer", "key")
+TAGS_NAMES = ("tags", "tag", "category")
+
+
+class Columns:
+    # Column positions of one CSV layout; answer lists hold one position per
+    # answer, or a single position whose cell is split on LIST_SEP
+    __slots__ = ("question", "question_image", "answers", "answers_joined",
+                 "answer_images", "answer_images_joined", "correct", "tags")
+
+    def __init__(self, header, overrides=None):
+        overrides = overrides or {}
+        names = [name.strip().lower() for name in header]
+
+        def find(key, candidates):
+            wanted = overrides.get(key)
+            if wanted is not None:
+                try:
+                    return names.index(wanted.strip().lower())
+                except ValueError:
+                    raise ValueError(f"no column named {wanted!r}")
+            return next((names.index(name) for name in candidates if name in names), None)
+
+        def find_list(key, pattern, candidates):
+            wanted = overrides.get(key)
+            if wanted is not None:
+                positions = []
+                for name in wanted.split(","):
+                    if name.strip().lower() not in names:
+                        raise ValueError(f"no column named {name!r}")
+                    positions.append(names.index(name.strip().lower()))
+                return positions, len(positions) == 1
+            numbered = sorted((int(m.group(1)), i) for i, m in ((i, pattern.match(n)) for i, n in enumerate(names)) if m)
+            if numbered:
+                return [i for _, i in numbered], False
+            joined = next((names.index(name) for name in candidates if name in names), None)
+            return ([joined], True) if joined is not None else ([], False)
+
+        self.question = find("question", QUESTION_NAMES)
+        if self.question is None:
+            raise ValueError("no question column; name one with --question")
+        self.question_image = find("question_image", QUESTION_IMAGE_NAMES)
+        self.answers, self.answers_joined = find_list("answers", _NUMBERED, ANSWERS_NAMES)
+        if not self.answers:
+            raise ValueError("no answer columns; name them with --answers")
+        self.answer_images, self.answer_images_joined = find_list("answer_images", _NUMBERED_IMAGE, ANSWER_IMAGES_NAMES)
+        self.correct = find("correct", CORRECT_NAMES)
+        self.tags = find("tags", TAGS_NAMES)
+
+
+def _cell(row, index):
+    return row[index].strip() if index is not None and index < len(row) else ""
+
+
+def _cells(row, positions, joined):
+    if joined:
+        text = _cell(row, positions[0])
+        return [part.strip() for part in text.split(LIST_SEP)] if text else []
+    return [_cell(row, i) for i in positions]
+
+
+def parse_row(row, columns):
+    # One CSV row as a question plus the image paths it refers to, as
+    # {answer position, or None for the question image: path}
+    text = _cell(row, columns.question)
+    if not text:
+        raise ValueError("empty question")
+    answers = _cells(row, columns.answers, columns.answers_joined)
+    images = _cells(row, columns.answer_images, columns.answer_images_joined)
+    images += [""] * (len(answers) - len(images))
+    pairs = [(answer, image) for answer, image in zip(answers, images) if answer]
+    if not pairs:
+        raise ValueError("no answers")
+
+    correct = _cell(row, columns.correct)
+    correct_index = -1
+    if correct:
+        texts = [answer for answer, _ in pairs]
+        if texts.count(correct) > 1:
+            raise ValueError(f"correct answer {correct!r} matches more than one answer")
+        if correct in texts:
+            correct_index = texts.index(correct)
+        elif correct.isdigit() and 1 <= int(correct) <= len(pairs):
+            correct_index = int(correct) - 1
+        elif len(correct) == 1 and correct.upper() in LETTERS[:len(pairs)]:
+            correct_index = LETTERS.index(correct.upper())
+        else:
+            raise ValueError(f"correct answer {correct!r} is not one of the answers")
+
+    question = {
+        "question": text,
+        "question_image": "",
+        "answers": [{"id": i, "text": answer, "image": ""} for i, (answer, _) in enumerate(pairs)],
+        "correct": correct_index if correct_index >= 0 else None,
+    }
+    tags = _cell(row, columns.tags)
+    if tags:
+        question["tags"] = [tag.strip() for tag in tags.split(LIST_SEP) if tag.strip()]
+
+    refs = {}
+    if _cell(row, columns.question_image):
+        refs[None] = _cell(row, columns.question_image)
+    for i, (_, image) in enumerate(pairs):
+        if image:
+            refs[i] = image
+    return question, refs
+
+
+def copy_image(imgs_folder, path):
+    name = store_image(imgs_folder, path)
+    if needs_thumbnails(imgs_folder, name):
+        generate_thumbnails(imgs_folder, name)
+    return name
+
+
+def open_csv(csv_path, delimiter=None):
+    f = open(csv_path, newline="", encoding="utf-8-sig")
+    if delimiter is None:
+        sample = f.read(64 * 1024)
+        f.seek(0)
+        try:
+            delimiter = csv.Sniffer().sniff(sample, delimiters=",;\t").delimiter
+        except csv.Error:
+            delimiter = ","
+    return f, csv.reader(f, delimiter=delimiter)
+
+
+def import_csv(csv_path, imgs_folder, overrides=None, images_dir=None, workers=None, errors=None, delimiter=None):
+    # Streams questions out of a CSV export in row order. Referenced images are
+    # copied into imgs_folder (content-addressed, with thumbnails) on a thread
+    # pool while later rows are parsed. Bad rows are skipped and reported in
+    # `errors` as (line, message), in line order.
+    errors = [] if errors is None else errors
+    images_dir = images_dir or os.path.dirname(os.path.abspath(csv_path))
+    f, reader = open_csv(csv_path, delimiter)
+    with f, ThreadPoolExecutor(max_workers=workers or min(32, (os.cpu_count() or 1) * 4)) as pool:
+        columns = Columns(next(reader), overrides)
+        copies = {}
+        window = deque()
+
+        def finish(line, question, refs):
+            # A row that failed to parse waits its turn too, so errors stay in line order
+            if question is None:
+                errors.append((line, refs))
+                return None
+            for i, future in refs.items():
+                try:
+                    name = future.result()
+                except OSError as e:
+                    errors.append((line, f"image not imported: {e}"))
+                    continue
+                if i is None:
+                    question["question_image"] = name
+                else:
+                    question["answers"][i]["image"] = name
+            return question
+
+        for row in reader:
+            if not any(cell.strip() for cell in row):
+                continue
+            try:
+                question, refs = parse_row(row, columns)
+            except ValueError as e:
+                window.append((reader.line_num, None, str(e)))
+                continue
+            futures = {}
+            for key, path in refs.items():
+                path = os.path.join(images_dir, path)
+                future = copies.get(path)
+                if future is None:
+                    copies[path] = future = pool.submit(copy_image, imgs_folder, path)
+                futures[key] = future
+            window.append((reader.line_num, question, futures))
+            while len(window) > WINDOW:
+                question = finish(*window.popleft())
+                if question is not None:
+                    yield question
+        while window:
+            question = finish(*window.popleft())
+            if question is not None:
+                yield question
+
+
+def import_into_folder(csv_path, folder, **options):
+    # Appends the CSV's questions to folder/test.json (created if missing),
+    # streaming existing and new questions into one atomic rewrite
+    f, reader = open_csv(csv_path, options.get("delimiter"))
+    with f:
+        # Fail on an unusable header before anything is written
+        Columns(next(reader, []), options.get("overrides"))
+    os.makedirs(folder, exist_ok=True)
+    imgs_folder = os.path.join(folder, "imgs")
+    os.makedirs(imgs_folder, exist_ok=True)
+    test_file = os.path.join(folder, "test.json")
+    existing = QuestionList()
+    if os.path.exists(test_file):
+        existing = QuestionList(open_questions(test_file))
+        # Edits the creator autosaved to the journal belong to the test too
+        apply_journal(test_file, existing)
+    errors = options.pop("errors", [])
+    imported = [0]
+
+    def encoded():
+        for question in import_csv(csv_path, imgs_folder, errors=errors, **options):
+            imported[0] += 1
+            yield encode_question(question)
+
+    try:
+        tmp_path, offsets = write_snapshot(test_file, chain(existing.snapshot(), encoded()), existing.source)
+    finally:
+        existing.close()
+    commit_snapshot(test_file, tmp_path, offsets)
+    try:
+        os.remove(journal_path(test_file))
+    except OSError:
+        pass
+    return imported[0], errors
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import questions from a CSV or spreadsheet export")
+    parser.add_argument("csv", help="CSV file with a header row")
+    parser.add_argument("folder", help="test folder to create or append to")
+    parser.add_argument("--question", help="question column")
+    parser.add_argument("--question-image", help="question image column")
+    parser.add_argument("--answers", help="answer columns, comma separated, or one column split on '|'")
+    parser.add_argument("--answer-images", help="answer image columns, like --answers")
+    parser.add_argument("--correct", help="correct answer column: answer text, 1-based number or letter")
+    parser.add_argument("--tags", help="tags column, split on '|'")
+    parser.add_argument("--images-dir", help="where image paths are relative to (default: the CSV's folder)")
+    parser.add_argument("--delimiter", help="field delimiter (default: sniffed)")
+    parser.add_argument("--workers", type=int, help="image copy threads")
+    args = parser.parse_args(argv)
+
+    overrides = {key: getattr(args, key) for key in
+                 ("question", "question_image", "answers", "answer_images", "correct", "tags")
+                 if getattr(args, key) is not None}
+    try:
+        imported, errors = import_into_folder(args.csv, args.folder, overrides=overrides, images_dir=args.images_dir,
+                                              workers=args.workers, delimiter=args.delimiter)
+    except ValueError as e:
+        print(f"{args.csv}: {e}")
+        sys.exit(1)
+    for line, message in errors:
+        print(f"{args.csv}:{line}: {message}")
+    print(f"Imported {imported} questions into {os.path.join(args.folder, 'test.json')}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+import os
+import sys
+import json
+import time
+import hashlib
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from cachedir import cache_dir
+from questions import count_questions
+from testpack import PACK_SUFFIX, TestPack
+from thumbnails import THUMBS_DIR
+
+LIBRARY_VERSION = 1
+# Never crawled into: image folders and anything hidden
+SKIP_DIRS = {"imgs", "__pycache__"}
+
+
+def index_path(root):
+    # Per-library index in the user's cache, so shared storage is never written to
+    digest = hashlib.blake2b(os.path.abspath(root).encode("utf-8"), digest_size=8).hexdigest()
+    return os.path.join(cache_dir(), f"library-{digest}.json")
+
+
+def load_library(root):
+    try:
+        with open(index_path(root), encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if data.get("version") != LIBRARY_VERSION or data.get("root") != os.path.abspath(root):
+        return {}
+    return data["tests"]
+
+
+def save_library(root, entries):
+    path = index_path(root)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"version": LIBRARY_VERSION, "root": os.path.abspath(root), "tests": entries}, f)
+    os.replace(tmp_path, path)
+
+
+def _scan_dir(path):
+    # One directory: its subdirectories to crawl next and the tests found in it
+    # as (kind, path, stat fingerprint)
+    subdirs = []
+    tests = []
+    imgs_mtime = 0
+    test_stat = None
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.name.startswith("."):
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name == "imgs":
+                        imgs_mtime = entry.stat().st_mtime_ns
+                    elif entry.name not in SKIP_DIRS:
+                        subdirs.append(entry.path)
+                elif entry.name == "test.json":
+                    test_stat = entry.stat()
+                elif entry.name.endswith(PACK_SUFFIX) and entry.is_file():
+                    st = entry.stat()
+                    tests.append(("pack", entry.path, [st.st_mtime_ns, st.st_size]))
+    except OSError:
+        return subdirs, tests
+    if test_stat is not None:
+        tests.append(("folder", path, [test_stat.st_mtime_ns, test_stat.st_size, imgs_mtime]))
+    return subdirs, tests
+
+
+def crawl(root, pool):
+    # Breadth-first scandir over `pool`; every directory is listed exactly once
+    found = []
+    pending = {pool.submit(_scan_dir, root)}
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            subdirs, tests = future.result()
+            found.extend(tests)
+            pending.update(pool.submit(_scan_dir, path) for path in subdirs)
+    return found
+
+
+def describe_folder(path):
+    test_file = os.path.join(path, "test.json")
+    # Never parses a question, and never leaves an index in the shared folder
+    questions = count_questions(test_file)
+    images = 0
+    size = os.path.getsize(test_file)
+    try:
+        with os.scandir(os.path.join(path, "imgs")) as entries:
+            for entry in entries:
+                if entry.is_file() and not entry.name.startswith("."):
+                    images += 1
+                    size += entry.stat().st_size
+    except OSError:
+        pass
+    return {"title": os.path.basename(os.path.normpath(path)), "questions": questions, "images": images, "size": size}
+
+
+def describe_pack(path):
+    pack = TestPack(path)
+    try:
+        images = sum(1 for name in pack.image_spans if not name.startswith(THUMBS_DIR + "/"))
+        questions = len(pack)
+    finally:
+        pack.close()
+    return {"title": os.path.splitext(os.path.basename(path))[0], "questions": questions,
+            "images": images, "size": os.path.getsize(path)}
+
+
+def _describe(kind, path, stamp):
+    try:
+        entry = describe_pack(path) if kind == "pack" else describe_folder(path)
+    except (OSError, ValueError) as e:
+        entry = {"title": os.path.basename(path), "questions": 0, "images": 0, "size": 0, "error": str(e)}
+    entry.update(kind=kind, stamp=stamp, mtime=stamp[0] // 1_000_000_000)
+    return entry
+
+
+def refresh_library(root, entries=None, workers=None):
+    # Crawls `root` and re-describes only tests whose stat fingerprint changed.
+    # Returns the new entries (keyed by path relative to root) and how many
+    # tests were (re)indexed; the index is saved when anything changed.
+    if entries is None:
+        entries = load_library(root)
+    workers = workers or min(32, (os.cpu_count() or 1) * 4)
+    updated = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        stale = []
+        for kind, path, stamp in crawl(root, pool):
+            key = os.path.relpath(path, root)
+            entry = entries.get(key)
+            if entry is not None and entry.get("kind") == kind and entry.get("stamp") == stamp:
+                updated[key] = entry
+            else:
+                stale.append((key, pool.submit(_describe, kind, path, stamp)))
+        for key, future in stale:
+            updated[key] = future.result()
+    updated = dict(sorted(updated.items()))
+    if stale or updated.keys() != entries.keys():
+        save_library(root, updated)
+    return updated, len(stale)
+
+
+def format_size(size):
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("usage: library.py <library folder> [--rebuild]")
+        sys.exit(2)
+    root = sys.argv[1]
+    start = time.perf_counter()
+    entries, changed = refresh_library(root, {} if "--rebuild" in sys.argv else None)
+    elapsed = time.perf_counter() - start
+    for key, entry in entries.items():
+        print(f"{key}\t{entry['title']}\t{entry['questions']} questions\t{entry['images']} images\t{format_size(entry['size'])}")
+    print(f"{len(entries)} tests, {changed} re-indexed in {elapsed:.2f}s")
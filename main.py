@@ -1,87 +1,162 @@
+# First, so the startup report includes loading Qt and everything below
+from startup import StartupTimer
 import os
-import json
+import sys
+import time
 import random
+import threading
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QHBoxLayout, QVBoxLayout,
     QLabel, QPushButton, QFrame, QButtonGroup, QSpacerItem, QSizePolicy,
-    QFileDialog, QStackedWidget
+    QFileDialog, QStackedWidget, QSpinBox, QCheckBox, QLineEdit, QTableWidget,
+    QTableWidgetItem, QHeaderView, QAbstractItemView, QMessageBox, QComboBox
 )
-from PyQt6.QtCore import Qt, QSize, QTimer
-from PyQt6.QtGui import QFont, QPixmap, QIcon
+from PyQt6.QtCore import Qt, QSize, QTimer, QRegularExpression, pyqtSignal
+from PyQt6.QtGui import QFont, QIcon, QRegularExpressionValidator
+from engine import QuizSession
+from imagecache import ImageCache
+from questions import open_questions
+from telemetry import Telemetry, telemetry_path
+from testpack import TestPack, is_pack
+from theme import DEFAULT_THEME, THEMES, apply_theme
+from thumbnails import best_variant, thumbnail_path
+
+QUESTION_IMAGE_SIZE = QSize(300, 300)
+ANSWER_ICON_SIZE = QSize(40, 40)
+PREFETCH_QUESTIONS = 3
+
+class SortKeyItem(QTableWidgetItem):
+    # Sorts by the raw value in UserRole rather than the displayed text
+    def __lt__(self, other):
+        return self.data(Qt.ItemDataRole.UserRole) < other.data(Qt.ItemDataRole.UserRole)
 
 class QuizApp(QMainWindow):
+    _library_refreshed = pyqtSignal(str, object, int)
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Quiz Game")
         self.setMinimumSize(QSize(800, 500))
-        self.bg_color = "#DCE1DE"
-        self.fg_color = "#A1A5A3"
-        self.text_color = "#2F2F2F"
+        self.theme = os.environ.get("QUIZ_THEME", DEFAULT_THEME)
+        if self.theme not in THEMES:
+            self.theme = DEFAULT_THEME
+        apply_theme(QApplication.instance(), self.theme)
         self.test_data = []
-        self.current_question = 0
-        self.score = 0
+        self.pack = None
+        self.session = None
+        self.checkpoint = None
+        self.scheduler = None
         self.test_path = ""
+        self.image_cache = ImageCache(self)
+        self.question_generation = 0
+        # Counts an unindexed test in steps once its first question is up
+        self.count_timer = QTimer(self)
+        self.count_timer.timeout.connect(self.count_step)
+        self.telemetry = Telemetry()
+        self.library_root = None
+        self._library_refreshed.connect(self.on_library_refreshed)
         
         self.stacked_widget = QStackedWidget()
         self.setCentralWidget(self.stacked_widget)
         
-        self.init_folder_ui()
-        self.init_quiz_ui()
+        # Pages are built the first time they are shown, so the first frame
+        # only waits for the start page
+        self.pages = {}
+        self.show_page("folder")
+
+    def page(self, name):
+        widget = self.pages.get(name)
+        if widget is None:
+            widget = self.pages[name] = getattr(self, f"init_{name}_ui")()
+            self.stacked_widget.addWidget(widget)
+        return widget
+
+    def show_page(self, name):
+        self.stacked_widget.setCurrentWidget(self.page(name))
 
     def init_folder_ui(self):
         folder_widget = QWidget()
-        folder_widget.setStyleSheet(f"background-color: {self.bg_color};")
+        folder_widget.setObjectName("folderPage")
         layout = QVBoxLayout(folder_widget)
         
         title = QLabel("Quiz Game")
-        title.setStyleSheet(f"font-size: 24px; color: {self.text_color};")
+        title.setObjectName("title")
         title.setAlignment(Qt.AlignmentFlag.AlignCenter)
         layout.addWidget(title)
         
         self.folder_btn = QPushButton("Select Test Folder")
-        self.folder_btn.setStyleSheet(f"""
-            background-color: {self.fg_color};
-            color: {self.text_color};
-            border-radius: 24px;
-            padding: 15px;
-            font-size: 16px;
-        """)
+        self.folder_btn.setProperty("role", "primary")
         self.folder_btn.clicked.connect(self.select_folder)
         layout.addWidget(self.folder_btn)
+
+        self.pack_btn = QPushButton("Open Test Pack")
+        self.pack_btn.setProperty("role", "primary")
+        self.pack_btn.clicked.connect(self.select_pack)
+        layout.addWidget(self.pack_btn)
+
+        self.library_btn = QPushButton("Open Library")
+        self.library_btn.setProperty("role", "primary")
+        self.library_btn.clicked.connect(self.select_library)
+        layout.addWidget(self.library_btn)
         
         self.folder_label = QLabel("No folder selected")
-        self.folder_label.setStyleSheet(f"color: {self.text_color};")
         layout.addWidget(self.folder_label)
+
+        # Draw an exam from a larger pool instead of playing every question
+        sample_layout = QHBoxLayout()
+        self.sample_spin = QSpinBox()
+        self.sample_spin.setRange(0, 1000000)
+        self.sample_spin.setSpecialValueText("All questions")
+        self.sample_spin.setPrefix("Questions: ")
+        self.stratify_check = QCheckBox("Balance by tag")
+        self.seed_edit = QLineEdit()
+        self.seed_edit.setPlaceholderText("Seed (random)")
+        self.seed_edit.setValidator(QRegularExpressionValidator(QRegularExpression(r"\d{0,10}")))
+        for widget in (self.sample_spin, self.stratify_check, self.seed_edit):
+            sample_layout.addWidget(widget)
+        layout.addLayout(sample_layout)
+
+        # Practice picks each next question from the learner's own history
+        practice_layout = QHBoxLayout()
+        self.practice_check = QCheckBox("Adaptive practice")
+        self.learner_edit = QLineEdit()
+        self.learner_edit.setPlaceholderText("Learner name")
+        for widget in (self.practice_check, self.learner_edit):
+            practice_layout.addWidget(widget)
+        layout.addLayout(practice_layout)
         
         self.start_btn = QPushButton("Start Quiz")
-        self.start_btn.setStyleSheet(f"""
-            background-color: {self.fg_color};
-            color: {self.text_color};
-            border-radius: 24px;
-            padding: 15px;
-            font-size: 16px;
-        """)
+        self.start_btn.setProperty("role", "primary")
         self.start_btn.setEnabled(False)
         self.start_btn.clicked.connect(self.start_quiz)
         layout.addWidget(self.start_btn)
         
         layout.addStretch()
-        self.stacked_widget.addWidget(folder_widget)
+        theme_layout = QHBoxLayout()
+        theme_layout.addWidget(QLabel("Theme:"))
+        self.theme_combo = QComboBox()
+        self.theme_combo.addItems(THEMES)
+        self.theme_combo.setCurrentText(self.theme)
+        self.theme_combo.currentTextChanged.connect(self.set_theme)
+        theme_layout.addWidget(self.theme_combo)
+        theme_layout.addStretch()
+        layout.addLayout(theme_layout)
+        return folder_widget
+
+    def set_theme(self, name):
+        # Restyles every page in place; nothing is rebuilt
+        self.theme = name
+        apply_theme(QApplication.instance(), name)
 
     def init_quiz_ui(self):
         quiz_widget = QWidget()
-        quiz_widget.setStyleSheet(f"background-color: {self.bg_color}; padding: 20px;")
+        quiz_widget.setObjectName("quizPage")
         main_layout = QHBoxLayout(quiz_widget)
         main_layout.setContentsMargins(20, 20, 20, 20)
         main_layout.setSpacing(20)
 
         self.left_panel = QFrame()
-        self.left_panel.setStyleSheet(f"""
-            background-color: {self.fg_color};
-            color: {self.text_color};
-            border-radius: 24px;
-            padding: 20px;
-        """)
+        self.left_panel.setObjectName("questionPanel")
         self.left_panel.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
         self.left_layout = QVBoxLayout()
         self.left_panel.setLayout(self.left_layout)
@@ -99,14 +174,16 @@ class QuizApp(QMainWindow):
         main_layout.addWidget(self.left_panel, 40)
 
         right_panel = QFrame()
-        right_panel.setStyleSheet("background: transparent;")
+        right_panel.setObjectName("answerPanel")
         right_layout = QVBoxLayout()
         right_panel.setLayout(right_layout)
         right_layout.setContentsMargins(20, 20, 20, 20)
         right_layout.setSpacing(20)
 
         self.button_container = QWidget()
-        self.button_container.setStyleSheet("background: transparent;")
+        self.button_container.setObjectName("answerButtons")
+        # Correct/incorrect coloring comes from the theme, picked by the
+        # "state" dynamic property
         self.button_layout = QVBoxLayout()
         self.button_container.setLayout(self.button_layout)
         self.button_layout.setSpacing(20)
@@ -115,15 +192,106 @@ class QuizApp(QMainWindow):
         right_layout.addWidget(self.button_container)
         right_layout.addStretch()
 
-        self.score_label = QLabel(f"Score: {self.score}/{len(self.test_data)}")
-        self.score_label.setStyleSheet(f"color: {self.text_color}; font-size: 16px;")
+        self.score_label = QLabel("Score: 0/0")
+        self.score_label.setObjectName("scoreLabel")
         self.score_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
         right_layout.addWidget(self.score_label)
         
         main_layout.addWidget(right_panel, 60)
         self.answer_buttons = []
-        self.button_group = QButtonGroup()
-        self.stacked_widget.addWidget(quiz_widget)
+        self.button_pool = []
+        self.button_group = QButtonGroup(self)
+        self.button_group.idClicked.connect(self.answer_clicked)
+        return quiz_widget
+
+    def init_library_ui(self):
+        library_widget = QWidget()
+        library_widget.setObjectName("libraryPage")
+        layout = QVBoxLayout(library_widget)
+
+        self.library_label = QLabel()
+        layout.addWidget(self.library_label)
+
+        self.library_table = QTableWidget(0, 5)
+        self.library_table.setHorizontalHeaderLabels(["Test", "Questions", "Images", "Size", "Modified"])
+        self.library_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self.library_table.verticalHeader().setVisible(False)
+        self.library_table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.library_table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.library_table.setSortingEnabled(True)
+        self.library_table.cellActivated.connect(self.library_test_chosen)
+        layout.addWidget(self.library_table)
+
+        back_btn = QPushButton("Back")
+        back_btn.setProperty("role", "primary")
+        back_btn.clicked.connect(lambda: self.show_page("folder"))
+        layout.addWidget(back_btn)
+        return library_widget
+
+    def select_library(self):
+        root = QFileDialog.getExistingDirectory(self, "Select Library Folder")
+        if root:
+            self.show_library(root)
+
+    def show_library(self, root):
+        # The saved index shows right away; the crawl only re-reads tests whose
+        # files changed since and updates the table when it is done
+        from library import load_library
+        self.library_root = root
+        self.show_page("library")
+        self.fill_library(load_library(root))
+        self.library_label.setText(f"{root} (refreshing...)")
+        threading.Thread(target=self.refresh_library_job, args=(root, ), daemon=True).start()
+
+    def refresh_library_job(self, root):
+        from library import refresh_library
+        try:
+            entries, changed = refresh_library(root)
+        except OSError as e:
+            entries, changed = None, str(e)
+        try:
+            self._library_refreshed.emit(root, entries, changed)
+        except RuntimeError:
+            # The window closed while the crawl was running
+            pass
+
+    def on_library_refreshed(self, root, entries, changed):
+        if root != self.library_root:
+            return
+        if entries is None:
+            self.library_label.setText(f"{root} (refresh failed: {changed})")
+            return
+        if changed:
+            self.fill_library(entries)
+        self.library_label.setText(f"{root}: {len(entries)} tests, {changed} updated")
+
+    def fill_library(self, entries):
+        from library import format_size
+        table = self.library_table
+        table.setSortingEnabled(False)
+        table.setRowCount(len(entries))
+        for row, (key, entry) in enumerate(entries.items()):
+            title = QTableWidgetItem(entry["title"])
+            title.setData(Qt.ItemDataRole.UserRole, key)
+            title.setToolTip(entry.get("error") or key)
+            cells = [title]
+            for value, text in ((entry["questions"], str(entry["questions"])),
+                                (entry["images"], str(entry["images"])),
+                                (entry["size"], format_size(entry["size"])),
+                                (entry["mtime"], time.strftime("%Y-%m-%d %H:%M", time.localtime(entry["mtime"])))):
+                item = SortKeyItem(text)
+                item.setData(Qt.ItemDataRole.UserRole, value)
+                cells.append(item)
+            for column, item in enumerate(cells):
+                table.setItem(row, column, item)
+        table.setSortingEnabled(True)
+
+    def library_test_chosen(self, row, column):
+        key = self.library_table.item(row, 0).data(Qt.ItemDataRole.UserRole)
+        self.test_path = os.path.normpath(os.path.join(self.library_root, key))
+        self.folder_label.setText(f"Selected: {self.library_table.item(row, 0).text()}")
+        self.start_btn.setEnabled(True)
+        self.show_page("folder")
 
     def select_folder(self):
         folder = QFileDialog.getExistingDirectory(self, "Select Test Folder")
@@ -136,118 +304,274 @@ class QuizApp(QMainWindow):
                 self.start_btn.setEnabled(False)
                 self.folder_label.setText("Error: No test.json found")
 
+    def select_pack(self):
+        pack_path, _ = QFileDialog.getOpenFileName(self, "Select Test Pack", "", "Test packs (*.tpk)")
+        if pack_path:
+            self.test_path = pack_path
+            self.folder_label.setText(f"Selected: {os.path.basename(pack_path)}")
+            self.start_btn.setEnabled(True)
+
     def start_quiz(self):
-        with open(os.path.join(self.test_path, "test.json"), "r") as f:
-            self.test_data = json.load(f)
-        self.stacked_widget.setCurrentIndex(1)
+        # Only a quiz needs these; they stay out of the start-up path
+        from checkpoint import Checkpoint, discard_checkpoint, load_checkpoint
+        from sampling import draw
+        if is_pack(self.test_path):
+            self.test_data = self.pack = TestPack(self.test_path)
+        else:
+            self.test_data = open_questions(os.path.join(self.test_path, "test.json"))
+            self.pack = None
+        if self.checkpoint is not None:
+            self.checkpoint.close()
+            self.checkpoint = None
+        if self.scheduler is not None:
+            self.scheduler.close()
+            self.scheduler = None
+        if self.practice_check.isChecked():
+            self.start_practice()
+            return
+        saved = load_checkpoint(self.test_path)
+        # Nothing answered yet means nothing worth resuming
+        if saved is not None and (not saved[1] or not self.ask_resume(*saved)):
+            discard_checkpoint(self.test_path)
+            saved = None
+        if saved is not None:
+            header, entries = saved
+        else:
+            seed = int(self.seed_edit.text()) if self.seed_edit.text() else random.randrange(1 << 32)
+            header = {"seed": seed, "count": self.sample_spin.value(), "stratify": self.stratify_check.isChecked()}
+            entries = []
+        if header["count"]:
+            # Same seed for the draw and the answer order, so one number replays the exam
+            self.test_data = draw(self.test_data, header["count"], header["seed"], header["stratify"])
+        self.session = QuizSession(self.test_data, header["seed"])
+        self.session.restore(entry["ok"] for entry in entries)
+        self.checkpoint = Checkpoint(self.test_path, header, entries)
+        self.show_session()
+
+    def start_practice(self):
+        # Questions are picked one at a time as they are played, so there is
+        # no seed to replay and nothing to checkpoint
+        from scheduler import DEFAULT_LEARNER, PRACTICE_ROUND, LearnerStore, PracticeRound, Scheduler, learner_path
+        learner = self.learner_edit.text().strip() or DEFAULT_LEARNER
+        store = LearnerStore(learner_path(learner), os.path.abspath(self.test_path), self.test_data)
+        self.scheduler = Scheduler(len(self.test_data), store)
+        self.test_data = PracticeRound(self.test_data, self.scheduler, self.sample_spin.value() or PRACTICE_ROUND)
+        self.session = QuizSession(self.test_data)
+        self.show_session()
+
+    def show_session(self):
+        self.show_page("quiz")
+        self.update_score()
+        if not getattr(self.test_data, "complete", True):
+            self.count_timer.start(0)
+        if self.session.finished():
+            self.show_results()
+            return
         self.show_question()
+        self.prefetch_images(self.session.current + 1)
+
+    def update_score(self):
+        # The total is left off until a lazily indexed test has been counted
+        if getattr(self.test_data, "complete", True):
+            self.score_label.setText(f"Score: {self.session.score}/{len(self.session)}")
+        else:
+            self.score_label.setText(f"Score: {self.session.score}")
+
+    def count_step(self):
+        try:
+            done = getattr(self.test_data, "complete", True) or self.test_data.scan_step()
+        except ValueError as e:
+            # Malformed past the questions shown so far; the quiz can't go on
+            self.count_timer.stop()
+            QMessageBox.critical(self, "Error", f"Failed to load test: {e}")
+            self.show_page("folder")
+            return
+        if done:
+            self.count_timer.stop()
+            if self.session is not None:
+                self.update_score()
+
+    def ask_resume(self, header, entries):
+        # The checkpoint only holds the seed and the answers so far; nothing else
+        # is needed to rebuild the exam exactly where it stopped
+        score = sum(entry["ok"] for entry in entries)
+        count = f" of {header['count']}" if header["count"] else ""
+        reply = QMessageBox.question(
+            self, "Resume Quiz",
+            f"This quiz was interrupted after {len(entries)}{count} questions (score {score}).\n"
+            "Resume where you left off?")
+        return reply == QMessageBox.StandardButton.Yes
+
+    def image_ref(self, img_name, size):
+        # Smallest pre-scaled variant that still fills `size`, else the original
+        if self.pack is not None:
+            spans = self.pack.image_spans
+            return self.pack.image(best_variant(img_name, (size.width(), size.height()), spans.__contains__))
+        return thumbnail_path(os.path.join(self.test_path, "imgs"), img_name, size.width(), size.height())
+
+    def prefetch_images(self, start, count=PREFETCH_QUESTIONS):
+        for question in self.test_data[start:start + count]:
+            if question["question_image"]:
+                self.image_cache.prefetch(self.image_ref(question["question_image"], QUESTION_IMAGE_SIZE), QUESTION_IMAGE_SIZE)
+            for answer in question["answers"]:
+                if answer["image"]:
+                    self.image_cache.prefetch(self.image_ref(answer["image"], ANSWER_ICON_SIZE), ANSWER_ICON_SIZE)
+
+    def flush_telemetry(self):
+        # QUIZ_TELEMETRY (.csv or .jsonl) overrides the per-test file in the cache
+        path = os.environ.get("QUIZ_TELEMETRY") or telemetry_path(self.test_path)
+        try:
+            self.telemetry.flush(path)
+        except OSError as e:
+            QMessageBox.warning(self, "Telemetry", f"Could not write telemetry to {path}: {e}")
+
+    def set_question_pixmap(self, generation, timing, key, pixmap):
+        if generation == self.question_generation:
+            self.question_image.setPixmap(pixmap)
+            self.telemetry.image_ready(timing, self.image_cache.decode_seconds(key))
+
+    def set_answer_icon(self, generation, timing, key, button, pixmap):
+        if generation == self.question_generation:
+            button.setIcon(QIcon(pixmap))
+            button.setIconSize(ANSWER_ICON_SIZE)
+            self.telemetry.image_ready(timing, self.image_cache.decode_seconds(key))
+
+    def pooled_buttons(self, count):
+        while len(self.button_pool) < count:
+            button = QPushButton()
+            self.button_group.addButton(button, len(self.button_pool))
+            self.button_layout.addWidget(button)
+            self.button_pool.append(button)
+        for i, button in enumerate(self.button_pool):
+            button.setVisible(i < count)
+        return self.button_pool[:count]
+
+    def set_button_state(self, button, state):
+        if button.property("state") != state:
+            button.setProperty("state", state)
+            button.style().unpolish(button)
+            button.style().polish(button)
+
+    def answer_clicked(self, index):
+        if index < len(self.answer_buttons):
+            self.check_answer(index)
 
     def show_question(self):
-        for button in self.answer_buttons:
-            button.deleteLater()
         self.answer_buttons = []
-        self.button_group = QButtonGroup()
         self.question_image.clear()
+        self.question_generation += 1
+        generation = self.question_generation
         
-        if self.current_question >= len(self.test_data):
+        if self.session.finished():
             self.show_results()
             return
             
-        question = self.test_data[self.current_question]
-        self.question_label.setText(question["question"])
-
-        if question["question_image"]:
-            img_path = os.path.join(self.test_path, "imgs", question["question_image"])
-            if os.path.exists(img_path):
-                pixmap = QPixmap(img_path)
-                self.question_image.setPixmap(pixmap.scaled(300, 300, Qt.AspectRatioMode.KeepAspectRatio))
-
-        answers = list(zip(question["answers"].items(), question["answers_images"]))
-        random.shuffle(answers)
-        self.correct_answer = None
-
-        for i, ((answer, is_correct), img_name) in enumerate(answers):
-            button = QPushButton(answer)
-            button.setStyleSheet(f"""
-                QPushButton {{
-                    background-color: {self.fg_color};
-                    color: {self.text_color};
-                    border-radius: 24px;
-                    padding: 20px;
-                    font-size: 14px;
-                    text-align: left;
-                    border: none;
-                    min-height: 60px;
-                }}
-                QPushButton:hover {{
-                    background-color: #B8BCBA;
-                }}
-            """)
-            
-            if img_name:
-                img_path = os.path.join(self.test_path, "imgs", img_name)
-                if os.path.exists(img_path):
-                    icon = QPixmap(img_path).scaled(40, 40, Qt.AspectRatioMode.KeepAspectRatio)
-                    button.setIcon(QIcon(icon))
-                    button.setIconSize(QSize(40, 40))
-
-            button.clicked.connect(lambda _, a=answer: self.check_answer(a))
-            self.answer_buttons.append(button)
-            self.button_group.addButton(button, i)
-            self.button_layout.addWidget(button)
-            
-            if is_correct:
-                self.correct_answer = answer
+        question = self.session.question()
+        index = self.session.current
+        if hasattr(self.test_data, "source_index"):
+            index = self.test_data.source_index(index)
+        timing = self.telemetry.question_shown(self.session.seed, index)
+        self.question_label.setText(question.text)
+
+        if question.image:
+            ref = self.image_ref(question.image, QUESTION_IMAGE_SIZE)
+            key = self.image_cache.make_key(ref, QUESTION_IMAGE_SIZE)
+            self.image_cache.request(
+                ref, QUESTION_IMAGE_SIZE,
+                lambda pixmap: self.set_question_pixmap(generation, timing, key, pixmap)
+            )
 
-        self.button_layout.addStretch()
+        answers = self.session.answers()
+        self.answer_buttons = self.pooled_buttons(len(answers))
+        for button, (answer, img_name) in zip(self.answer_buttons, answers):
+            button.setText(answer)
+            button.setIcon(QIcon())
+            button.setEnabled(True)
+            self.set_button_state(button, "")
 
-    def check_answer(self, selected_answer):
-        for button in self.answer_buttons:
+            if img_name:
+                ref = self.image_ref(img_name, ANSWER_ICON_SIZE)
+                key = self.image_cache.make_key(ref, ANSWER_ICON_SIZE)
+                self.image_cache.request(
+                    ref, ANSWER_ICON_SIZE,
+                    lambda pixmap, b=button, k=key: self.set_answer_icon(generation, timing, k, b, pixmap)
+                )
+        self.telemetry.rendered(timing)
+
+    def check_answer(self, choice):
+        correct_choice = self.session.correct_choice()
+        for i, button in enumerate(self.answer_buttons):
             button.setEnabled(False)
-            if button.text() == self.correct_answer:
-                button.setStyleSheet(f"""
-                    background-color: #8BC34A;
-                    color: {self.text_color};
-                    border-radius: 24px;
-                    padding: 20px;
-                """)
-            elif button.text() == selected_answer and selected_answer != self.correct_answer:
-                button.setStyleSheet(f"""
-                    background-color: #FF5252;
-                    color: white;
-                    border-radius: 24px;
-                    padding: 20px;
-                """)
-
-        if selected_answer == self.correct_answer:
-            self.score += 1
-            self.score_label.setText(f"Score: {self.score}/{len(self.test_data)}")
-
-        self.current_question += 1
-        if self.current_question < len(self.test_data):
+            if i == correct_choice:
+                self.set_button_state(button, "correct")
+            elif i == choice:
+                self.set_button_state(button, "incorrect")
+
+        index = self.session.current
+        correct = self.session.answer(choice)
+        self.telemetry.answered(correct)
+        if self.checkpoint is not None:
+            self.checkpoint.record(index, choice, correct)
+        if self.scheduler is not None:
+            self.scheduler.answered(self.test_data.source_index(index), correct)
+        if correct:
+            self.update_score()
+
+        if not self.session.finished():
+            # Decode upcoming images while the feedback delay is running
+            self.prefetch_images(self.session.current)
             QTimer.singleShot(1500, self.show_question)
         else:
             QTimer.singleShot(1500, self.show_results)
 
     def show_results(self):
-        percentage = (self.score / len(self.test_data)) * 100
+        from sampling import Sample
+        percentage = self.session.percentage()
+        if self.scheduler is not None:
+            detail = f"<p>Due for review now: {self.scheduler.due()}</p>"
+        elif isinstance(self.test_data, Sample):
+            detail = f"<p>Exam seed: {self.session.seed}</p>"
+        else:
+            detail = ""
         result_text = f"""
         <div style='text-align:center;'>
             <h2>Quiz Completed!</h2>
             <p style='font-size:18px;'>
-                Your score: {self.score}/{len(self.test_data)}<br>
+                Your score: {self.session.score}/{len(self.session)}<br>
                 ({percentage:.1f}%)
             </p>
+            {detail}
         </div>
         """
         self.question_label.setText(result_text)
+        self.question_generation += 1
         self.question_image.clear()
-        for button in self.answer_buttons:
-            button.deleteLater()
+        self.pooled_buttons(0)
         self.answer_buttons = []
+        if self.checkpoint is not None:
+            self.checkpoint.finish()
+            self.checkpoint = None
+        self.flush_telemetry()
+
+    def closeEvent(self, event):
+        # A quiz abandoned halfway still reports what was answered
+        if self.telemetry.ring:
+            self.flush_telemetry()
+        if self.checkpoint is not None:
+            # Left on disk so the quiz can be resumed next time
+            self.checkpoint.close()
+        if self.scheduler is not None:
+            self.scheduler.close()
+        self.image_cache.shutdown()
+        event.accept()
 
 if __name__ == "__main__":
+    timer = StartupTimer("quiz")
+    timer.mark("imports")
     app = QApplication([])
+    timer.mark("application")
     window = QuizApp()
+    timer.mark("window")
     window.show()
-    app.exec()
\ No newline at end of file
+    timer.watch(window)
+    sys.exit(app.exec())
\ No newline at end of file
@@ -0,0 +1,403 @@
+import os
+import re
+import json
+import struct
+import threading
+from array import array
+from collections import OrderedDict
+from collections.abc import MutableSequence
+
+INDEX_SUFFIX = ".idx"
+INDEX_MAGIC = b"TQIX"
+INDEX_VERSION = 1
+INDEX_HEADER = struct.Struct("<4sIQQQ")
+CHUNK_SIZE = 1 << 20
+PARSED_CACHE_SIZE = 64
+# Questions indexed per scan_step, a few milliseconds of work
+SCAN_STEP = 2000
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+# Answers keyed by text mark a question in the format upgrade_question converts
+_LEGACY_ANSWERS = re.compile(rb'"answers"\s*:\s*\{')
+_TAGS_KEY = re.compile(r'"tags"\s*:\s*')
+_decoder = json.JSONDecoder()
+
+
+def scan_offsets(f, chunk_size=CHUNK_SIZE):
+    # Yields (start, end) byte offsets of every object in the top-level JSON
+    # array. Each object is skipped over by the C decoder. Latin-1 maps bytes
+    # to characters one to one, so string positions are byte offsets, and
+    # UTF-8 can only appear inside JSON strings, where any character goes.
+    text = ""
+    base = 0
+    i = 0
+    eof = False
+    expect = "["
+    while True:
+        i = _WHITESPACE.match(text, i).end()
+        if i == len(text):
+            if eof:
+                raise ValueError("Truncated JSON question list")
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            text, base, i = chunk.decode("latin-1"), base + i, 0
+            continue
+        ch = text[i]
+        if expect == "[":
+            if ch != "[":
+                raise ValueError(f"Expected a question list at byte {base + i}")
+            expect = "first"
+            i += 1
+        elif ch == "]" and expect != "value":
+            return
+        elif expect == "separator":
+            if ch != ",":
+                raise ValueError(f"Expected , or ] at byte {base + i}")
+            expect = "value"
+            i += 1
+        elif ch != "{":
+            raise ValueError(f"Expected a question object at byte {base + i}")
+        else:
+            try:
+                _, end = _decoder.raw_decode(text, i)
+            except json.JSONDecodeError as e:
+                if eof:
+                    raise ValueError(f"{e.msg} at byte {base + e.pos}") from None
+                # Most likely cut off by the end of the chunk: read on and retry
+                chunk = f.read(chunk_size)
+                eof = not chunk
+                text, base, i = text[i:] + chunk.decode("latin-1"), base + i, 0
+                continue
+            yield base + i, base + end
+            expect = "separator"
+            i = end
+
+
+def raw_tags(raw):
+    # Tags of one raw question; only the tags value itself is decoded
+    text = raw.decode("utf-8")
+    for match in _TAGS_KEY.finditer(text):
+        i = match.start()
+        while i > 0 and text[i - 1] == "\\":
+            i -= 1
+        if (match.start() - i) % 2:
+            # An escaped quote, so this is inside some other string
+            continue
+        try:
+            value, _ = _decoder.raw_decode(text, match.end())
+        except ValueError:
+            continue
+        if isinstance(value, str):
+            return [value]
+        if isinstance(value, list):
+            return [tag for tag in value if isinstance(tag, str)]
+    return []
+
+
+def upgrade_question(question):
+    # Older files keyed answers by their text ({"4": 1, "20": 0}) with images
+    # in a parallel "answers_images" list. Now each answer is an object with
+    # an id that is unique within its question, and "correct" holds the id of
+    # the correct answer (null for none), so answer texts may repeat.
+    answers = question.get("answers")
+    if isinstance(answers, dict):
+        images = question.pop("answers_images", None) or []
+        question["answers"] = [{"id": i, "text": text, "image": images[i] if i < len(images) else ""}
+                               for i, text in enumerate(answers)]
+        # The last answer marked 1 wins, as it always did
+        question["correct"] = next((i for i, value in reversed(list(enumerate(answers.values()))) if value), None)
+    return question
+
+
+def correct_index(question):
+    # Position of the correct answer, -1 if there is none
+    correct = question.get("correct")
+    for i, answer in enumerate(question["answers"]):
+        if answer["id"] == correct:
+            return i
+    return -1
+
+
+def next_answer_id(question):
+    return max((answer["id"] for answer in question["answers"]), default=-1) + 1
+
+
+def index_path(test_file):
+    return test_file + INDEX_SUFFIX
+
+
+def read_index(test_file):
+    try:
+        st = os.stat(test_file)
+        with open(index_path(test_file), "rb") as f:
+            magic, version, size, mtime, count = INDEX_HEADER.unpack(f.read(INDEX_HEADER.size))
+            if magic != INDEX_MAGIC or version != INDEX_VERSION or size != st.st_size or mtime != st.st_mtime_ns:
+                return None
+            offsets = array("Q")
+            offsets.fromfile(f, count * 2)
+    except (OSError, struct.error, EOFError):
+        return None
+    return offsets
+
+
+def write_index(test_file, offsets):
+    st = os.stat(test_file)
+    tmp_path = index_path(test_file) + ".tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(INDEX_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, st.st_size, st.st_mtime_ns, len(offsets) // 2))
+            offsets.tofile(f)
+        os.replace(tmp_path, index_path(test_file))
+    except OSError:
+        # A read-only test folder just means the index is rebuilt next time
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+
+def count_questions(test_file):
+    # Question count that writes nothing next to test_file: an existing index
+    # is reused, otherwise the file is scanned and the offsets dropped
+    offsets = read_index(test_file)
+    if offsets is not None:
+        return len(offsets) // 2
+    with open(test_file, "rb") as f:
+        return sum(1 for _ in scan_offsets(f))
+
+
+class QuestionSource:
+    # Read-only, lazily parsed view over a test.json question list
+
+    def __init__(self, test_file):
+        self.path = test_file
+        self.file = open(test_file, "rb")
+        self.parsed = OrderedDict()
+        # Background saves read raw questions while the GUI thread parses them
+        self.lock = threading.RLock()
+        self.offsets = read_index(test_file)
+        self.scanner = None
+        # Set once the scan finds the file malformed; raised again on later reads
+        self.error = None
+        self.complete = self.offsets is not None
+        if not self.complete:
+            self.offsets = array("Q")
+            self.scan_file = open(test_file, "rb")
+            self.scanner = scan_offsets(self.scan_file)
+
+    def _scan_to(self, index):
+        # Extends the index just far enough to reach question `index`
+        while not self.complete and (index is None or len(self.offsets) // 2 <= index):
+            if self.error is not None:
+                raise self.error
+            try:
+                start, end = next(self.scanner)
+            except ValueError as e:
+                # The offsets so far are not the whole test, so no index is written
+                self.error = e
+                self.close_scanner()
+                raise
+            except StopIteration:
+                # Only reached once the scan has read the closing ]
+                self.complete = True
+                self.close_scanner()
+                write_index(self.path, self.offsets)
+                break
+            self.offsets.append(start)
+            self.offsets.append(end)
+
+    def __len__(self):
+        with self.lock:
+            self._scan_to(None)
+        return len(self.offsets) // 2
+
+    def indexed(self):
+        # Questions found so far, without scanning any further
+        return len(self.offsets) // 2
+
+    def has_index(self, index):
+        # Scans only as far as `index`, so a quiz can start before the count is known
+        with self.lock:
+            self._scan_to(index)
+        return 0 <= index < len(self.offsets) // 2
+
+    def scan_step(self, count=SCAN_STEP):
+        # Indexes up to `count` more questions; True once the whole file is indexed
+        with self.lock:
+            self._scan_to(len(self.offsets) // 2 + count - 1)
+        return self.complete
+
+    def __iter__(self):
+        i = 0
+        while True:
+            with self.lock:
+                self._scan_to(i)
+            if i >= len(self.offsets) // 2:
+                return
+            yield self[i]
+            i += 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.start or 0, index.stop, index.step or 1
+            if stop is not None and 0 <= start and 0 <= stop and step > 0:
+                # A forward slice only needs the index to reach its end
+                with self.lock:
+                    self._scan_to(stop - 1)
+                return [self[i] for i in range(start, min(stop, len(self.offsets) // 2), step)]
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        question = self.parsed.get(index)
+        if question is not None:
+            self.parsed.move_to_end(index)
+            return question
+        question = upgrade_question(json.loads(self.raw(index)))
+        self.parsed[index] = question
+        if len(self.parsed) > PARSED_CACHE_SIZE:
+            self.parsed.popitem(last=False)
+        return question
+
+    def tags(self, index):
+        question = self.parsed.get(index)
+        if question is not None:
+            tags = question.get("tags", [])
+            return [tags] if isinstance(tags, str) else list(tags)
+        return raw_tags(self.raw(index))
+
+    def raw(self, index):
+        with self.lock:
+            self._scan_to(index)
+            if not 0 <= index < len(self.offsets) // 2:
+                raise IndexError("question index out of range")
+            start, end = self.offsets[index * 2], self.offsets[index * 2 + 1]
+            self.file.seek(start)
+            return self.file.read(end - start)
+
+    def close_scanner(self):
+        if self.scanner is not None:
+            self.scanner = None
+            self.scan_file.close()
+
+    def close(self):
+        self.file.close()
+        self.close_scanner()
+
+
+def open_questions(test_file):
+    return QuestionSource(test_file)
+
+
+class QuestionList(MutableSequence):
+    # Editable question list over a QuestionSource. Questions stay as source
+    # indices until they are first touched, then live on as plain dicts.
+
+    def __init__(self, source=None):
+        self.source = source
+        self.items = list(range(len(source))) if source is not None else []
+
+    def __len__(self):
+        return len(self.items)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        item = self.items[index]
+        if isinstance(item, int):
+            item = self.source[item]
+            self.items[index] = item
+        return item
+
+    def peek(self, index):
+        # Reads a question without pinning it in memory, e.g. for list labels
+        item = self.items[index]
+        return self.source[item] if isinstance(item, int) else item
+
+    def __setitem__(self, index, question):
+        self.items[index] = question
+
+    def __delitem__(self, index):
+        del self.items[index]
+
+    def insert(self, index, question):
+        self.items.insert(index, question)
+
+    def snapshot(self):
+        # Untouched questions stay source indices, edited ones are encoded now so
+        # the GUI can keep editing while the snapshot is written elsewhere
+        return [item if isinstance(item, int) else encode_question(item) for item in self.items]
+
+    def rebind(self, source, snapshot):
+        # Points untouched questions at their position in a file written from `snapshot`
+        new_positions = {item: i for i, item in enumerate(snapshot) if isinstance(item, int)}
+        self.source = source
+        self.items = [new_positions[item] if isinstance(item, int) else item for item in self.items]
+
+    def close(self):
+        if self.source is not None:
+            self.source.close()
+
+
+def encode_question(question):
+    return json.dumps(question, indent=2).replace("\n", "\n  ").encode("utf-8")
+
+
+def write_questions(f, snapshot, source=None):
+    # Streams the list as an indent=2 JSON array and returns the new byte offsets;
+    # untouched questions are copied through as raw bytes without being parsed,
+    # unless they are in the old answer format, which is upgraded on the way
+    offsets = array("Q")
+    pos = f.write(b"[")
+    for i, item in enumerate(snapshot):
+        pos += f.write(b",\n  " if i else b"\n  ")
+        data = source.raw(item) if isinstance(item, int) else item
+        if isinstance(item, int) and _LEGACY_ANSWERS.search(data):
+            data = encode_question(upgrade_question(json.loads(data)))
+        offsets.append(pos)
+        pos += f.write(data)
+        offsets.append(pos)
+    f.write(b"\n]" if snapshot else b"]")
+    return offsets
+
+
+def write_snapshot(test_file, snapshot, source=None):
+    # Writes and fsyncs the temp file next to test_file; commit_snapshot swaps it in
+    tmp_path = test_file + ".tmp"
+    with open(tmp_path, "wb") as f:
+        offsets = write_questions(f, snapshot, source)
+        f.flush()
+        os.fsync(f.fileno())
+    return tmp_path, offsets
+
+
+def replace_file(tmp_path, path):
+    os.replace(tmp_path, path)
+    if hasattr(os, "O_DIRECTORY"):
+        # Make the rename itself durable
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+def commit_snapshot(test_file, tmp_path, offsets, questions=None, snapshot=None):
+    if questions is not None:
+        questions.close()
+    replace_file(tmp_path, test_file)
+    write_index(test_file, offsets)
+    if questions is not None:
+        questions.rebind(QuestionSource(test_file), snapshot)
+
+
+def save_questions(test_file, questions):
+    # Synchronous atomic save of a QuestionList or any question sequence
+    if isinstance(questions, QuestionList):
+        snapshot = questions.snapshot()
+        tmp_path, offsets = write_snapshot(test_file, snapshot, questions.source)
+        commit_snapshot(test_file, tmp_path, offsets, questions, snapshot)
+    else:
+        snapshot = [encode_question(q) for q in questions] if not hasattr(questions, "raw") \
+            else list(range(len(questions)))
+        tmp_path, offsets = write_snapshot(test_file, snapshot, questions)
+        commit_snapshot(test_file, tmp_path, offsets)
@@ -0,0 +1,128 @@
+import os
+import random
+import argparse
+from array import array
+from collections.abc import Sequence
+
+UNTAGGED = ""
+
+
+class Sample(Sequence):
+    # The picked questions of a larger source, in play order. Questions are
+    # only read from the source when played, so the rest are never parsed.
+
+    def __init__(self, source, indices):
+        self.source = source
+        self.indices = indices
+
+    def __len__(self):
+        return len(self.indices)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.source[i] for i in self.indices[index]]
+        return self.source[self.indices[index]]
+
+    def source_index(self, index):
+        return self.indices[index]
+
+    def close(self):
+        self.source.close()
+
+
+def question_tags(source, index):
+    tags = getattr(source, "tags", None)
+    if tags is not None:
+        return tags(index)
+    tags = source[index].get("tags", [])
+    return [tags] if isinstance(tags, str) else list(tags)
+
+
+def strata(source, tags=None):
+    # Question indices grouped by stratum. Without `tags` a question's stratum
+    # is its first tag; otherwise the first of its tags listed in `tags`, and
+    # questions with none of them are left out.
+    groups = {}
+    for index in range(len(source)):
+        found = question_tags(source, index)
+        if tags is None:
+            key = found[0] if found else UNTAGGED
+        else:
+            key = next((tag for tag in found if tag in tags), None)
+            if key is None:
+                continue
+        group = groups.get(key)
+        if group is None:
+            groups[key] = group = array("I")
+        group.append(index)
+    return groups
+
+
+def allocate(sizes, count):
+    # Splits `count` across strata in proportion to their sizes (largest remainder)
+    total = sum(sizes.values())
+    count = min(count, total)
+    exact = {key: count * size / total for key, size in sizes.items()}
+    quotas = {key: int(share) for key, share in exact.items()}
+    short = count - sum(quotas.values())
+    for key in sorted(exact, key=lambda key: (quotas[key] - exact[key], key))[:short]:
+        quotas[key] += 1
+    return quotas
+
+
+def sample_indices(source, count, seed, stratify=False, quotas=None):
+    # Reproducible pick of `count` question indices, in play order. Plain
+    # sampling only needs the question count; stratified sampling reads each
+    # question's tags but never parses the rest of it.
+    rng = random.Random(seed)
+    if quotas:
+        groups = strata(source, quotas)
+    elif stratify:
+        groups = strata(source)
+        quotas = allocate({key: len(group) for key, group in groups.items()}, count)
+    else:
+        total = len(source)
+        return rng.sample(range(total), min(count, total))
+    picked = []
+    for key, group in groups.items():
+        picked.extend(rng.sample(group, min(quotas.get(key, 0), len(group))))
+    rng.shuffle(picked)
+    return picked
+
+
+def draw(source, count, seed, stratify=False, quotas=None):
+    return Sample(source, sample_indices(source, count, seed, stratify, quotas))
+
+
+def parse_quota(text):
+    tag, _, count = text.rpartition("=")
+    if not tag or not count.isdigit():
+        raise argparse.ArgumentTypeError(f"expected tag=count, got {text!r}")
+    return tag, int(count)
+
+
+def main(argv=None):
+    from questions import open_questions
+    from testpack import TestPack, is_pack
+
+    parser = argparse.ArgumentParser(description="Draw a reproducible exam from a question pool")
+    parser.add_argument("test", help="test folder or .tpk pack")
+    parser.add_argument("count", type=int, help="questions to draw")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--stratify", action="store_true", help="keep the pool's tag proportions")
+    parser.add_argument("--quota", type=parse_quota, action="append", help="tag=count, repeatable")
+    args = parser.parse_args(argv)
+
+    source = TestPack(args.test) if is_pack(args.test) else open_questions(os.path.join(args.test, "test.json"))
+    try:
+        sample = draw(source, args.count, args.seed, args.stratify, dict(args.quota) if args.quota else None)
+        for i in range(len(sample)):
+            index = sample.source_index(i)
+            tags = ", ".join(question_tags(source, index))
+            print(f"{index + 1}\t{tags}\t{sample[i]['question']}")
+    finally:
+        source.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+import os
+import re
+import json
+import time
+import heapq
+import random
+import hashlib
+import sqlite3
+import argparse
+from array import array
+from collections.abc import Sequence
+from cachedir import cache_dir
+
+# SM-2: every question has an ease factor; each correct answer in a row
+# stretches the wait before it is asked again, a wrong one starts it over
+START_EASE = 2.5
+MIN_EASE = 1.3
+# A missed question comes back within the same practice session
+RELEARN_SECONDS = 60
+FIRST_INTERVAL = 24 * 3600
+SECOND_INTERVAL = 6 * 24 * 3600
+PRACTICE_ROUND = 20
+DEFAULT_LEARNER = "default"
+
+
+def learner_path(learner):
+    name = re.sub(r"[^\w.-]", "_", learner) or DEFAULT_LEARNER
+    return os.path.join(cache_dir(), "learners", f"{name}.sqlite")
+
+
+class ItemState:
+    __slots__ = ("ease", "interval", "reps", "lapses", "due")
+
+    def __init__(self, ease=START_EASE, interval=0.0, reps=0, lapses=0, due=0.0):
+        self.ease = ease
+        self.interval = interval
+        self.reps = reps
+        self.lapses = lapses
+        self.due = due
+
+
+def quality(correct):
+    # SM-2 grades answers 0-5; a multiple choice answer is right or wrong
+    return 4 if correct else 1
+
+
+def review(state, grade, now):
+    if grade < 3:
+        state.reps = 0
+        state.lapses += 1
+        state.interval = RELEARN_SECONDS
+    else:
+        state.reps += 1
+        if state.reps == 1:
+            state.interval = FIRST_INTERVAL
+        elif state.reps == 2:
+            state.interval = SECOND_INTERVAL
+        else:
+            state.interval *= state.ease
+    state.ease = max(MIN_EASE, state.ease + 0.1 - (5 - grade) * (0.08 + (5 - grade) * 0.02))
+    state.due = now + state.interval
+    return state
+
+
+def question_key(question):
+    # A question's identity in the learner's history: its text and answer
+    # texts, so the history stays with it when questions around it are
+    # inserted or removed
+    content = [question.get("question", ""), [answer["text"] for answer in question["answers"]]]
+    return hashlib.blake2b(json.dumps(content).encode("utf-8"), digest_size=8).hexdigest()
+
+
+class LearnerStore:
+    # One learner's state for every question they have answered, one row per
+    # (test, question key), in a single SQLite file. Only the current state is
+    # kept, so the file stays small however long the history gets. Each row
+    # also remembers where its question last was, so loading only hashes the
+    # questions seen before unless some of them have moved.
+
+    def __init__(self, path, test, source):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.test = test
+        self.source = source
+        self.keys = {}
+        self.db = sqlite3.connect(path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("""CREATE TABLE IF NOT EXISTS questions (
+            test TEXT NOT NULL, key TEXT NOT NULL, position INTEGER NOT NULL,
+            ease REAL NOT NULL, interval REAL NOT NULL, reps INTEGER NOT NULL,
+            lapses INTEGER NOT NULL, due REAL NOT NULL,
+            PRIMARY KEY (test, key)) WITHOUT ROWID""")
+
+    def key(self, index):
+        key = self.keys.get(index)
+        if key is None:
+            self.keys[index] = key = question_key(self.source[index])
+        return key
+
+    def load(self):
+        count = len(self.source)
+        rows = self.db.execute("SELECT key, position, ease, interval, reps, lapses, due FROM questions WHERE test = ?",
+                               (self.test, ))
+        states = {}
+        moved = []
+        for key, position, *state in rows:
+            if position < count and self.key(position) == key:
+                states[position] = ItemState(*state)
+            else:
+                moved.append((key, ItemState(*state)))
+        if moved:
+            # Questions were inserted or removed: find the rest by content
+            positions = {self.key(i): i for i in range(count) if i not in states}
+            with self.db:
+                for key, state in moved:
+                    index = positions.get(key)
+                    if index is not None:
+                        states[index] = state
+                        self.db.execute("UPDATE questions SET position = ? WHERE test = ? AND key = ?",
+                                        (index, self.test, key))
+        return states
+
+    def save(self, question, state):
+        with self.db:
+            self.db.execute("INSERT OR REPLACE INTO questions VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                            (self.test, self.key(question), question, state.ease, state.interval, state.reps,
+                             state.lapses, state.due))
+
+    def close(self):
+        self.db.close()
+
+
+class Scheduler:
+    # Picks the next question for one learner: the most overdue review, else
+    # the first question they have never seen, else the review due soonest.
+    # Reviews sit in a heap keyed on due time, so a pick is O(log n).
+
+    def __init__(self, count, store=None):
+        self.count = count
+        self.store = store
+        self.states = store.load() if store is not None else {}
+        self.heap = [(state.due, i) for i, state in self.states.items() if i < count]
+        heapq.heapify(self.heap)
+        self.new = 0
+
+    def next_new(self):
+        while self.new < self.count and self.new in self.states:
+            self.new += 1
+        return self.new if self.new < self.count else None
+
+    def next(self, now=None):
+        now = time.time() if now is None else now
+        if self.heap and self.heap[0][0] <= now:
+            return heapq.heappop(self.heap)[1]
+        index = self.next_new()
+        if index is not None:
+            # Counted as seen once picked; it is pushed back when answered
+            self.states[index] = ItemState()
+            return index
+        if self.heap:
+            return heapq.heappop(self.heap)[1]
+        return None
+
+    def answered(self, index, correct, now=None):
+        now = time.time() if now is None else now
+        state = review(self.states.setdefault(index, ItemState()), quality(correct), now)
+        heapq.heappush(self.heap, (state.due, index))
+        if self.store is not None:
+            self.store.save(index, state)
+        return state
+
+    def due(self, now=None):
+        now = time.time() if now is None else now
+        return sum(1 for due, _ in self.heap if due <= now)
+
+    def close(self):
+        if self.store is not None:
+            self.store.close()
+
+
+class PracticeRound(Sequence):
+    # `length` questions of a source, each chosen by the scheduler only when
+    # it is about to be played, so every pick sees the answers before it
+
+    def __init__(self, source, scheduler, length):
+        self.source = source
+        self.scheduler = scheduler
+        # Never longer than the bank, or questions would come round twice
+        self.length = min(length, len(source))
+        self.indices = array("I")
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            # Only questions already picked; later ones are not known yet
+            return [self.source[i] for i in self.indices[index]]
+        if index < 0:
+            index += self.length
+        if index == len(self.indices) and index < self.length:
+            self.indices.append(self.scheduler.next())
+        return self.source[self.indices[index]]
+
+    def source_index(self, index):
+        return self.indices[index]
+
+    def close(self):
+        self.source.close()
+
+
+def main(argv=None):
+    from questions import open_questions
+    from testpack import TestPack, is_pack
+    parser = argparse.ArgumentParser(description="Show a learner's spaced repetition state for a test")
+    parser.add_argument("test", help="test folder or .tpk")
+    parser.add_argument("--learner", default=DEFAULT_LEARNER)
+    parser.add_argument("--simulate", type=int, metavar="N",
+                        help="time N picks and random answers against a throwaway learner")
+    args = parser.parse_args(argv)
+
+    source = TestPack(args.test) if is_pack(args.test) else open_questions(os.path.join(args.test, "test.json"))
+    count = len(source)
+    if args.simulate:
+        source.close()
+        rng = random.Random(0)
+        scheduler = Scheduler(count)
+        now = time.time()
+        start = time.perf_counter()
+        for _ in range(args.simulate):
+            index = scheduler.next(now)
+            scheduler.answered(index, rng.random() < 0.7, now)
+            now += 5
+        elapsed = time.perf_counter() - start
+        print(f"{args.simulate} picks over {count} questions: {elapsed / args.simulate * 1e6:.1f} us per pick and answer")
+        return
+
+    store = LearnerStore(learner_path(args.learner), os.path.abspath(args.test), source)
+    scheduler = Scheduler(count, store)
+    try:
+        seen = sum(1 for i in scheduler.states if i < count)
+        lapses = sum(state.lapses for state in scheduler.states.values())
+        print(f"{args.learner}: {seen}/{count} questions seen, {scheduler.due()} due now, {lapses} lapses")
+        if scheduler.heap:
+            print(f"Next review: {time.strftime('%Y-%m-%d %H:%M', time.localtime(scheduler.heap[0][0]))}")
+    finally:
+        scheduler.close()
+        source.close()
+
+
+if __name__ == "__main__":
+    main()
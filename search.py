@@ -0,0 +1,164 @@
+import re
+from bisect import bisect_left, insort
+
+_WORD = re.compile(r"\w+")
+MIN_PREFIX = 2
+# Longest run of vocabulary words a prefix is expanded over in full; past it
+# the expansion stops at RESULT_LIMIT matches and the search is marked partial
+PREFIX_SPAN = 256
+RESULT_LIMIT = 2000
+
+
+def tokenize(text):
+    return _WORD.findall(text.lower())
+
+
+def question_tokens(question):
+    tokens = set(tokenize(question["question"]))
+    for answer in question["answers"]:
+        tokens.update(tokenize(answer["text"]))
+    return tokens
+
+
+class SearchIndex:
+    # Inverted index over question and answer text. Questions get a stable key
+    # when they enter the index, so inserts and removals only shift the
+    # row -> key list and never touch the postings of other questions.
+
+    def __init__(self):
+        self.postings = {}
+        self.vocabulary = []
+        self.tokens = {}
+        self.row_keys = []
+        self.unindexed = []
+        self.next_key = 0
+        self.key_rows = None
+        # Whether the last search stopped at RESULT_LIMIT on a short prefix
+        self.partial = False
+
+    def reset(self, count):
+        # Registers `count` rows to be indexed later by index_pending
+        self.postings.clear()
+        self.vocabulary = []
+        self.tokens.clear()
+        self.row_keys = list(range(count))
+        self.unindexed = list(reversed(self.row_keys))
+        self.next_key = count
+        self.key_rows = None
+
+    def complete(self):
+        return not self.unindexed
+
+    def index_pending(self, questions, budget=500):
+        # Indexes up to `budget` not-yet-seen questions; returns True when done
+        if self.unindexed:
+            rows = self.rows_by_key()
+            for _ in range(min(budget, len(self.unindexed))):
+                key = self.unindexed.pop()
+                row = rows.get(key)
+                if row is not None:
+                    self._add(key, question_tokens(questions.peek(row)))
+        return not self.unindexed
+
+    def _add(self, key, tokens):
+        self.tokens[key] = tokens
+        for token in tokens:
+            posting = self.postings.get(token)
+            if posting is None:
+                self.postings[token] = posting = set()
+                insort(self.vocabulary, token)
+            posting.add(key)
+
+    def _discard(self, key):
+        for token in self.tokens.pop(key, ()):
+            posting = self.postings[token]
+            posting.discard(key)
+            if not posting:
+                del self.postings[token]
+                del self.vocabulary[bisect_left(self.vocabulary, token)]
+
+    def insert_row(self, row, question):
+        self.insert_rows(row, [question])
+
+    def insert_rows(self, row, questions):
+        keys = list(range(self.next_key, self.next_key + len(questions)))
+        self.next_key += len(questions)
+        self.row_keys[row:row] = keys
+        self._shift_rows(row)
+        for key, question in zip(keys, questions):
+            self._add(key, question_tokens(question))
+
+    def remove_row(self, row):
+        self.remove_rows(row, 1)
+
+    def remove_rows(self, row, count):
+        keys = self.row_keys[row:row + count]
+        del self.row_keys[row:row + count]
+        for key in keys:
+            if self.key_rows is not None:
+                del self.key_rows[key]
+            self._discard(key)
+        self._shift_rows(row)
+
+    def _shift_rows(self, row):
+        # Keeps key_rows in step with an insert or removal at `row`; only the
+        # rows after it move, and appending at the end moves nothing
+        if self.key_rows is not None:
+            row_keys = self.row_keys
+            for i in range(row, len(row_keys)):
+                self.key_rows[row_keys[i]] = i
+
+    def update_row(self, row, question):
+        key = self.row_keys[row]
+        tokens = question_tokens(question)
+        if tokens != self.tokens.get(key):
+            self._discard(key)
+            self._add(key, tokens)
+
+    def rows_by_key(self):
+        if self.key_rows is None:
+            self.key_rows = {key: row for row, key in enumerate(self.row_keys)}
+        return self.key_rows
+
+    def _prefix_matches(self, token, candidates):
+        # Search-as-you-type: the last word also matches longer words it starts.
+        # Returns the matching keys among `candidates` (all keys if None).
+        start = bisect_left(self.vocabulary, token)
+        end = bisect_left(self.vocabulary, token + "\uffff", start)
+        if end - start <= 1:
+            keys = self.postings[self.vocabulary[start]] if end > start else set()
+            return keys if candidates is None else keys & candidates
+        if candidates is not None and len(candidates) <= end - start:
+            # Fewer rows left than words to union: check those rows' own words
+            return {key for key in candidates if any(word.startswith(token) for word in self.tokens[key])}
+        keys = set()
+        # By position: a slice would copy the whole run before the first match
+        for i in range(start, end):
+            posting = self.postings[self.vocabulary[i]]
+            keys |= posting if candidates is None else posting & candidates
+            if end - start > PREFIX_SPAN and len(keys) >= RESULT_LIMIT:
+                # Too broad to gather in full while typing; more letters narrow it
+                self.partial = True
+                break
+        return keys
+
+    def search(self, query):
+        # Rows whose question or answers contain every word of `query`, in order;
+        # see `partial` for whether a short last word cut the list off
+        self.partial = False
+        words = tokenize(query)
+        if not words:
+            return None
+        prefix = None
+        if not query[-1:].isspace() and len(words[-1]) >= MIN_PREFIX:
+            prefix = words.pop()
+        # Whole words first, so a prefix is only expanded over what they leave
+        keys = None
+        for posting in sorted((self.postings.get(word, set()) for word in words), key=len):
+            keys = set(posting) if keys is None else keys & posting
+            if not keys:
+                return []
+        if prefix is not None:
+            keys = self._prefix_matches(prefix, keys)
+        rows = self.rows_by_key()
+        return sorted(rows[key] for key in keys if key in rows)
@@ -0,0 +1,534 @@
+import os
+import json
+import time
+import base64
+import random
+import asyncio
+import hashlib
+import secrets
+import argparse
+import tempfile
+import mimetypes
+from engine import QuizSession, load_questions
+from sampling import Sample, draw
+from testpack import TestPack, is_pack, pack_folder
+from thumbnails import best_variant
+
+QUESTION_IMAGE_SIZE = (300, 300)
+ANSWER_ICON_SIZE = (40, 40)
+SESSION_TTL = 4 * 60 * 60
+MAX_BODY = 64 * 1024
+WS_GUID = b"258EAFA5-E914-47DA-95CA-C5AB0DC11B65"
+REASONS = {200: "OK", 101: "Switching Protocols", 400: "Bad Request", 404: "Not Found",
+           405: "Method Not Allowed", 413: "Payload Too Large"}
+IMAGE_TYPES = {".webp": "image/webp", ".png": "image/png", ".jpg": "image/jpeg", ".jpeg": "image/jpeg", ".bmp": "image/bmp"}
+
+# Classroom client: one WebSocket per candidate
+CLIENT_PAGE = b"""<!doctype html>
+<html><head><meta charset="utf-8"><title>Quiz</title>
+<style>
+body { font-family: Arial, sans-serif; background: #DCE1DE; color: #2F2F2F; max-width: 720px; margin: 2em auto; }
+button { display: block; width: 100%; margin: .5em 0; padding: 1em; border: none; border-radius: 24px;
+         background: #A1A5A3; font-size: 14px; text-align: left; }
+button.correct { background: #8BC34A; } button.incorrect { background: #FF5252; color: white; }
+button img { height: 40px; vertical-align: middle; margin-right: 1em; }
+#image { max-width: 300px; max-height: 300px; }
+</style></head><body>
+<div id="start"><input id="name" placeholder="Your name"> <button onclick="start()">Start</button></div>
+<h2 id="question"></h2><img id="image" hidden><div id="answers"></div><p id="score"></p>
+<script>
+let ws;
+function start() {
+  ws = new WebSocket(`ws://${location.host}/ws`);
+  ws.onopen = () => ws.send(JSON.stringify({op: "start", candidate: document.getElementById("name").value}));
+  ws.onmessage = (event) => show(JSON.parse(event.data));
+  document.getElementById("start").hidden = true;
+}
+function show(msg) {
+  const answers = document.getElementById("answers");
+  if (msg.type === "result") {
+    [...answers.children].forEach((b, i) => { b.disabled = true;
+      if (i === msg.correct_choice) b.className = "correct"; else if (i === msg.choice) b.className = "incorrect"; });
+    document.getElementById("score").textContent = `Score: ${msg.score}/${msg.total}`;
+    return;
+  }
+  setTimeout(() => {
+    const image = document.getElementById("image");
+    answers.innerHTML = "";
+    if (msg.finished) {
+      document.getElementById("question").textContent = "Quiz Completed!";
+      image.hidden = true;
+      document.getElementById("score").textContent = `Your score: ${msg.score}/${msg.total} (${msg.percentage.toFixed(1)}%)`;
+      return;
+    }
+    document.getElementById("question").textContent = msg.text;
+    image.hidden = !msg.image; if (msg.image) image.src = msg.image;
+    msg.answers.forEach((answer, i) => {
+      const b = document.createElement("button");
+      if (answer.image) { const img = document.createElement("img"); img.src = answer.image; b.appendChild(img); }
+      b.appendChild(document.createTextNode(answer.text));
+      b.onclick = () => ws.send(JSON.stringify({op: "answer", choice: i}));
+      answers.appendChild(b);
+    });
+    if (!msg.answers.length) ws.send(JSON.stringify({op: "answer", skip: true}));
+  }, msg.index ? 1500 : 0);
+}
+</script></body></html>
+"""
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class Exam:
+    # One test loaded once for every candidate: the questions as compact
+    # records and the images as pre-encoded blobs in the mapped pack. Answer
+    # JSON is encoded ahead of time, so a question payload is just a join.
+
+    def __init__(self, test_path, count=0):
+        self.tmp_pack = None
+        if not is_pack(test_path):
+            fd, self.tmp_pack = tempfile.mkstemp(suffix=".tpk")
+            os.close(fd)
+            try:
+                pack_folder(test_path, self.tmp_pack)
+            except BaseException:
+                os.remove(self.tmp_pack)
+                raise
+        self.pack = TestPack(self.tmp_pack or test_path)
+        self.records = load_questions(self.pack)
+        self.count = min(count, len(self.records)) if count else 0
+        self.heads = []
+        self.answers = []
+        for record in self.records:
+            self.heads.append(f'"text":{json.dumps(record.text)},"image":{json.dumps(self.image_url(record.image, QUESTION_IMAGE_SIZE))}')
+            self.answers.append([json.dumps({"text": text, "image": self.image_url(img, ANSWER_ICON_SIZE)})
+                                 for text, img in zip(record.answers, record.images)])
+
+    def image_url(self, name, size):
+        if not name:
+            return None
+        return "/img/" + best_variant(name, size, self.pack.image_spans.__contains__)
+
+    def new_session(self, seed=None):
+        seed = random.randrange(1 << 32) if seed is None else seed
+        questions = draw(self.records, self.count, seed) if self.count else self.records
+        return QuizSession(questions, seed)
+
+    def question_payload(self, session):
+        if session.question() is None:
+            return (f'{{"type":"question","finished":true,"score":{session.score},"total":{len(session)},'
+                    f'"percentage":{session.percentage()}}}').encode()
+        index = session.current
+        source = session.questions.source_index(index) if isinstance(session.questions, Sample) else index
+        fragments = self.answers[source]
+        answers = ",".join(fragments[i] for i in session.order)
+        return (f'{{"type":"question","index":{index},"total":{len(session)},"score":{session.score},'
+                f'{self.heads[source]},"answers":[{answers}]}}').encode()
+
+    def image(self, name):
+        return self.pack.image_data(name)
+
+    def close(self):
+        self.pack.close()
+        if self.tmp_pack:
+            os.remove(self.tmp_pack)
+
+
+class Candidate:
+    __slots__ = ("name", "session", "seen")
+
+    def __init__(self, name, session):
+        self.name = name
+        self.session = session
+        self.seen = time.monotonic()
+
+
+class ExamServer:
+    def __init__(self, exam, results_path=None):
+        self.exam = exam
+        self.results_path = results_path
+        self.candidates = {}
+
+    # Sessions
+
+    def start_session(self, name):
+        token = secrets.token_urlsafe(12)
+        self.candidates[token] = Candidate(str(name or "")[:100], self.exam.new_session())
+        return token
+
+    def candidate(self, token):
+        candidate = self.candidates.get(token)
+        if candidate is None:
+            raise HTTPError(404, "unknown session")
+        candidate.seen = time.monotonic()
+        return candidate
+
+    def answer(self, candidate, message):
+        # The same grading as the desktop quiz: QuizSession.answer by display position
+        session = candidate.session
+        record = session.question()
+        if record is None:
+            raise HTTPError(400, "quiz already finished")
+        correct_choice = session.correct_choice()
+        if message.get("skip") and not record.answers:
+            correct, choice = session.skip(), -1
+        else:
+            choice = message.get("choice")
+            if not isinstance(choice, int) or not 0 <= choice < len(record.answers):
+                raise HTTPError(400, "choice out of range")
+            correct = session.answer(choice)
+        if session.finished():
+            self.record_result(candidate)
+        return {"type": "result", "choice": choice, "correct": correct, "correct_choice": correct_choice,
+                "score": session.score, "total": len(session), "finished": session.finished()}
+
+    def record_result(self, candidate):
+        if self.results_path:
+            session = candidate.session
+            with open(self.results_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"candidate": candidate.name, "seed": session.seed, "score": session.score,
+                                    "total": len(session), "finished_at": time.time()}) + "\n")
+
+    async def prune(self):
+        while True:
+            await asyncio.sleep(60)
+            cutoff = time.monotonic() - SESSION_TTL
+            for token in [t for t, c in self.candidates.items() if c.seen < cutoff]:
+                del self.candidates[token]
+
+    # HTTP
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    break
+                lines = head.decode("latin-1").split("\r\n")
+                try:
+                    method, target, version = lines[0].split(" ", 2)
+                except ValueError:
+                    break
+                headers = {}
+                for line in lines[1:]:
+                    name, sep, value = line.partition(":")
+                    if sep:
+                        headers[name.strip().lower()] = value.strip()
+                if headers.get("upgrade", "").lower() == "websocket":
+                    await self.websocket(reader, writer, headers)
+                    break
+                length = headers.get("content-length") or "0"
+                if not (length.isascii() and length.isdigit()):
+                    writer.write(response(400, b'{"error":"bad content-length"}', close=True))
+                    break
+                length = int(length)
+                if length > MAX_BODY:
+                    writer.write(response(413, b'{"error":"request too large"}', close=True))
+                    break
+                body = await reader.readexactly(length) if length else b""
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                try:
+                    status, payload, content_type, extra = self.route(method, target.split("?", 1)[0], body)
+                except HTTPError as e:
+                    status, payload, content_type, extra = e.status, json.dumps({"error": str(e)}).encode(), "application/json", ()
+                writer.write(response(status, b"", content_type, extra, not keep_alive, len(payload)))
+                # Image blobs go out straight from the mapped pack
+                writer.write(payload)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def route(self, method, path, body):
+        parts = path.strip("/").split("/")
+        if path == "/":
+            return 200, CLIENT_PAGE, "text/html; charset=utf-8", ()
+        if parts[0] == "img" and len(parts) > 1:
+            name = "/".join(parts[1:])
+            data = self.exam.image(name)
+            if data is None:
+                raise HTTPError(404, "no such image")
+            content_type = IMAGE_TYPES.get(os.path.splitext(name)[1].lower()) or \
+                mimetypes.guess_type(name)[0] or "application/octet-stream"
+            return 200, data, content_type, ("Cache-Control: max-age=86400",)
+        if parts[0] == "session":
+            if len(parts) == 1 and method == "POST":
+                message = parse_json(body) if body else {}
+                token = self.start_session(message.get("candidate"))
+                return 200, json.dumps({"session": token, "total": len(self.candidates[token].session)}).encode(), "application/json", ()
+            if len(parts) == 3:
+                candidate = self.candidate(parts[1])
+                if parts[2] == "question" and method == "GET":
+                    return 200, self.exam.question_payload(candidate.session), "application/json", ()
+                if parts[2] == "answer" and method == "POST":
+                    return 200, json.dumps(self.answer(candidate, parse_json(body))).encode(), "application/json", ()
+            raise HTTPError(405 if len(parts) in (1, 3) else 404, "unsupported request")
+        raise HTTPError(404, "not found")
+
+    # WebSocket
+
+    async def websocket(self, reader, writer, headers):
+        key = headers.get("sec-websocket-key")
+        if not key:
+            writer.write(response(400, b'{"error":"missing websocket key"}', close=True))
+            return
+        accept = base64.b64encode(hashlib.sha1(key.encode() + WS_GUID).digest()).decode()
+        writer.write(("HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                      f"Sec-WebSocket-Accept: {accept}\r\n\r\n").encode())
+        candidate = None
+        while True:
+            opcode, payload = await read_frame(reader, masked=True)
+            if opcode == 0x8:
+                writer.write(frame(0x8, payload[:2]))
+                break
+            if opcode == 0x9:
+                writer.write(frame(0xA, payload))
+                continue
+            if opcode != 0x1:
+                continue
+            try:
+                message = parse_json(payload)
+                op = message.get("op")
+                if op == "start":
+                    candidate = self.candidates[self.start_session(message.get("candidate"))]
+                elif op == "resume":
+                    candidate = self.candidate(message.get("session"))
+                elif op == "answer" and candidate is not None:
+                    candidate.seen = time.monotonic()
+                    writer.write(frame(0x1, json.dumps(self.answer(candidate, message)).encode()))
+                else:
+                    raise HTTPError(400, "unknown op")
+                writer.write(frame(0x1, self.exam.question_payload(candidate.session)))
+            except HTTPError as e:
+                writer.write(frame(0x1, json.dumps({"type": "error", "error": str(e)}).encode()))
+            await writer.drain()
+
+
+def parse_json(body):
+    try:
+        message = json.loads(body)
+    except ValueError:
+        raise HTTPError(400, "invalid JSON")
+    if not isinstance(message, dict):
+        raise HTTPError(400, "expected a JSON object")
+    return message
+
+
+def response(status, body, content_type="application/json", extra=(), close=False, length=None):
+    head = [f"HTTP/1.1 {status} {REASONS.get(status, '')}", f"Content-Type: {content_type}",
+            f"Content-Length: {len(body) if length is None else length}", *extra]
+    if close:
+        head.append("Connection: close")
+    return ("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body
+
+
+def frame(opcode, payload, mask=False):
+    head = bytearray([0x80 | opcode])
+    mask_bit = 0x80 if mask else 0
+    n = len(payload)
+    if n < 126:
+        head.append(mask_bit | n)
+    elif n < 1 << 16:
+        head.append(mask_bit | 126)
+        head += n.to_bytes(2, "big")
+    else:
+        head.append(mask_bit | 127)
+        head += n.to_bytes(8, "big")
+    if mask:
+        key = os.urandom(4)
+        return bytes(head) + key + apply_mask(payload, key)
+    return bytes(head) + payload
+
+
+def apply_mask(payload, key):
+    # XOR the whole payload at once instead of byte by byte
+    n = len(payload)
+    repeated = (key * (n // 4 + 1))[:n]
+    return (int.from_bytes(payload, "big") ^ int.from_bytes(repeated, "big")).to_bytes(n, "big")
+
+
+async def read_frame(reader, masked):
+    # Returns (opcode, payload) of one message, joining continuation frames
+    message = b""
+    opcode = None
+    while True:
+        b0, b1 = await reader.readexactly(2)
+        n = b1 & 0x7F
+        if n == 126:
+            n = int.from_bytes(await reader.readexactly(2), "big")
+        elif n == 127:
+            n = int.from_bytes(await reader.readexactly(8), "big")
+        if n > MAX_BODY:
+            raise ConnectionError("websocket frame too large")
+        key = await reader.readexactly(4) if b1 & 0x80 else None
+        if masked and key is None:
+            raise ConnectionError("client frames must be masked")
+        payload = await reader.readexactly(n)
+        if key:
+            payload = apply_mask(payload, key)
+        if b0 & 0x0F >= 0x8:
+            # Control frames can arrive between fragments
+            return b0 & 0x0F, payload
+        if opcode is None:
+            opcode = b0 & 0x0F
+        message += payload
+        if b0 & 0x80:
+            return opcode, message
+
+
+async def serve(exam, host, port, results_path=None, ready=None):
+    server = ExamServer(exam, results_path)
+    listener = await asyncio.start_server(server.handle, host, port, backlog=1024)
+    pruner = asyncio.create_task(server.prune())
+    if ready is not None:
+        ready.set_result(listener.sockets[0].getsockname()[:2])
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        pruner.cancel()
+
+
+# Load testing
+
+class HTTPClient:
+    def __init__(self, reader, writer, host):
+        self.reader = reader
+        self.writer = writer
+        self.host = host
+
+    async def request(self, method, path, message=None):
+        body = json.dumps(message).encode() if message is not None else b""
+        self.writer.write(f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body)
+        head = await self.reader.readuntil(b"\r\n\r\n")
+        length = 0
+        for line in head.split(b"\r\n")[1:]:
+            if line.lower().startswith(b"content-length:"):
+                length = int(line.split(b":", 1)[1])
+        return json.loads(await self.reader.readexactly(length))
+
+
+async def http_candidate(host, port, rng, latencies):
+    reader, writer = await asyncio.open_connection(host, port)
+    client = HTTPClient(reader, writer, host)
+    try:
+        start = time.perf_counter()
+        token = (await client.request("POST", "/session", {"candidate": f"load-{rng.randrange(1 << 20)}"}))["session"]
+        question = await client.request("GET", f"/session/{token}/question")
+        latencies.append(time.perf_counter() - start)
+        while not question.get("finished"):
+            start = time.perf_counter()
+            if question["answers"]:
+                await client.request("POST", f"/session/{token}/answer", {"choice": rng.randrange(len(question["answers"]))})
+            else:
+                await client.request("POST", f"/session/{token}/answer", {"skip": True})
+            question = await client.request("GET", f"/session/{token}/question")
+            latencies.append(time.perf_counter() - start)
+        return question["score"]
+    finally:
+        writer.close()
+
+
+async def ws_candidate(host, port, rng, latencies):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        key = base64.b64encode(os.urandom(16)).decode()
+        writer.write((f"GET /ws HTTP/1.1\r\nHost: {host}\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                      f"Sec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n").encode())
+        await reader.readuntil(b"\r\n\r\n")
+        start = time.perf_counter()
+        writer.write(frame(0x1, b'{"op":"start","candidate":"load"}', mask=True))
+        question = json.loads((await read_frame(reader, masked=False))[1])
+        latencies.append(time.perf_counter() - start)
+        while not question.get("finished"):
+            start = time.perf_counter()
+            if question["answers"]:
+                message = {"op": "answer", "choice": rng.randrange(len(question["answers"]))}
+            else:
+                message = {"op": "answer", "skip": True}
+            writer.write(frame(0x1, json.dumps(message).encode(), mask=True))
+            await read_frame(reader, masked=False)
+            question = json.loads((await read_frame(reader, masked=False))[1])
+            latencies.append(time.perf_counter() - start)
+        writer.write(frame(0x8, b"\x03\xe8", mask=True))
+        return question["score"]
+    finally:
+        writer.close()
+
+
+async def load_test(host, port, clients, use_ws=False, seed=0):
+    # Plays `clients` full sessions concurrently; latency is per question round trip
+    rng = random.Random(seed)
+    latencies = []
+    candidate = ws_candidate if use_ws else http_candidate
+    start = time.perf_counter()
+    scores = await asyncio.gather(*(candidate(host, port, random.Random(rng.random()), latencies) for _ in range(clients)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000 if latencies else 0.0
+
+    return {"clients": clients, "transport": "websocket" if use_ws else "http", "seconds": round(elapsed, 3),
+            "round_trips": len(latencies), "round_trips_per_s": round(len(latencies) / elapsed, 1),
+            "p50_ms": round(percentile(0.5), 3), "p95_ms": round(percentile(0.95), 3), "p99_ms": round(percentile(0.99), 3),
+            "mean_score": round(sum(scores) / len(scores), 2) if scores else 0.0}
+
+
+async def local_load_test(exam, clients, use_ws):
+    ready = asyncio.get_running_loop().create_future()
+    server = asyncio.create_task(serve(exam, "127.0.0.1", 0, ready=ready))
+    host, port = await ready
+    try:
+        return await load_test(host, port, clients, use_ws)
+    finally:
+        server.cancel()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve a test to many candidates over HTTP/WebSocket")
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve_cmd = commands.add_parser("serve", help="run the exam server")
+    serve_cmd.add_argument("test", help="test folder or .tpk pack")
+    serve_cmd.add_argument("--host", default="0.0.0.0")
+    serve_cmd.add_argument("--port", type=int, default=8080)
+    serve_cmd.add_argument("--count", type=int, default=0, help="random questions per candidate (default: all)")
+    serve_cmd.add_argument("--results", help="append finished sessions to this JSONL file")
+    load_cmd = commands.add_parser("loadtest", help="simulate many candidates")
+    load_cmd.add_argument("test", nargs="?", help="test to serve in-process (omit with --connect)")
+    load_cmd.add_argument("--connect", help="host:port of a running server")
+    load_cmd.add_argument("--clients", type=int, default=200)
+    load_cmd.add_argument("--count", type=int, default=0)
+    load_cmd.add_argument("--ws", action="store_true", help="use WebSocket instead of HTTP requests")
+    args = parser.parse_args(argv)
+
+    if args.command == "loadtest" and args.connect:
+        host, _, port = args.connect.rpartition(":")
+        print(json.dumps(asyncio.run(load_test(host or "127.0.0.1", int(port), args.clients, args.ws)), indent=2))
+        return
+    if not args.test:
+        parser.error("a test is needed unless --connect is given")
+    exam = Exam(args.test, args.count)
+    try:
+        if args.command == "serve":
+            print(f"Serving {len(exam.records)} questions on http://{args.host}:{args.port}/")
+            try:
+                asyncio.run(serve(exam, args.host, args.port, args.results))
+            except KeyboardInterrupt:
+                pass
+        else:
+            print(json.dumps(asyncio.run(local_load_test(exam, args.clients, args.ws)), indent=2))
+    finally:
+        exam.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+import os
+import sys
+import json
+import time
+
+# Taken when an app module starts importing, so the report includes loading Qt
+STARTED = time.perf_counter()
+# Time-to-first-paint budget; QUIZ_STARTUP_BUDGET_MS overrides
+BUDGET_MS = 800
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 1)
+
+
+class StartupTimer:
+    # Milestones from import to the first painted frame. QUIZ_STARTUP_REPORT
+    # prints them to stderr ("1") or appends them as a JSON line to a file;
+    # QUIZ_STARTUP_EXIT quits after the first frame, failing when over budget.
+    def __init__(self, name):
+        self.name = name
+        self.marks = {}
+        self.budget_ms = float(os.environ.get("QUIZ_STARTUP_BUDGET_MS", BUDGET_MS))
+        self.report_to = os.environ.get("QUIZ_STARTUP_REPORT")
+        self.exit_after = bool(os.environ.get("QUIZ_STARTUP_EXIT"))
+        self.filter = None
+
+    def mark(self, label):
+        self.marks[label] = _ms(time.perf_counter() - STARTED)
+
+    def watch(self, window):
+        if not (self.report_to or self.exit_after):
+            return
+        # Qt is loaded by now; keeping it out of the module keeps this import free
+        from PyQt6.QtCore import QEvent, QObject, QTimer
+        from PyQt6.QtWidgets import QApplication
+        timer = self
+
+        class FirstPaint(QObject):
+            def eventFilter(self, obj, event):
+                if event.type() == QEvent.Type.Paint and obj.isWidgetType() and obj.window() is window:
+                    QApplication.instance().removeEventFilter(self)
+                    # Queued behind the rest of this frame's painting
+                    QTimer.singleShot(0, timer.first_paint)
+                return False
+
+        self.filter = FirstPaint()
+        QApplication.instance().installEventFilter(self.filter)
+
+    def first_paint(self):
+        self.mark("first_paint")
+        over = self.marks["first_paint"] > self.budget_ms
+        if self.report_to:
+            self.report(over)
+        if self.exit_after:
+            from PyQt6.QtWidgets import QApplication
+            QApplication.instance().exit(1 if over else 0)
+
+    def report(self, over):
+        if self.report_to in ("1", "-"):
+            marks = ", ".join(f"{label} {ms:.1f} ms" for label, ms in self.marks.items())
+            verdict = "OVER BUDGET" if over else "ok"
+            print(f"{self.name} startup: {marks} (budget {self.budget_ms:.0f} ms, {verdict})", file=sys.stderr)
+            return
+        try:
+            with open(self.report_to, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"app": self.name, "marks": self.marks, "budget_ms": self.budget_ms}) + "\n")
+        except OSError as e:
+            print(f"Could not write startup report: {e}")
@@ -0,0 +1,91 @@
+import os
+import csv
+import json
+import time
+import hashlib
+from collections import deque
+from cachedir import cache_dir
+
+RING_SIZE = 4096
+FIELDS = ("session", "question", "shown_at", "render_ms", "decode_ms", "image_ms", "answer_ms", "correct")
+
+
+def telemetry_path(test_path):
+    # Kept in the user's cache, like checkpoints; test folders may be shared or read-only
+    digest = hashlib.blake2b(os.path.abspath(test_path).encode("utf-8"), digest_size=8).hexdigest()
+    return os.path.join(cache_dir(), f"telemetry-{digest}.jsonl")
+
+
+def _ms(ns):
+    return round(ns / 1e6, 3)
+
+
+class QuestionTiming:
+    # One question as the candidate saw it. Image timings can land after the
+    # answer, so the record stays mutable while it sits in the ring.
+    __slots__ = ("session", "question", "shown_at", "shown_ns", "render_ns",
+                 "decode_ns", "image_ns", "answer_ns", "correct")
+
+    def __init__(self, session, question):
+        self.session = session
+        self.question = question
+        self.shown_at = time.time()
+        self.shown_ns = time.perf_counter_ns()
+        self.render_ns = 0
+        self.decode_ns = 0
+        self.image_ns = 0
+        self.answer_ns = -1
+        self.correct = None
+
+    def row(self):
+        return (self.session, self.question, round(self.shown_at, 3),
+                _ms(self.render_ns), _ms(self.decode_ns), _ms(self.image_ns),
+                _ms(self.answer_ns) if self.answer_ns >= 0 else None, self.correct)
+
+
+class Telemetry:
+    # Fixed-size ring of per-question timings, written out in one go when the
+    # quiz ends; the oldest records are dropped if nobody flushes
+    def __init__(self, capacity=RING_SIZE):
+        self.ring = deque(maxlen=capacity)
+        self.current = None
+
+    def question_shown(self, session, question):
+        self.current = QuestionTiming(session, question)
+        self.ring.append(self.current)
+        return self.current
+
+    def rendered(self, timing):
+        timing.render_ns = time.perf_counter_ns() - timing.shown_ns
+
+    def image_ready(self, timing, decode_seconds):
+        # Decode cost is summed over the question's images; image time is when
+        # the last of them was on screen
+        timing.decode_ns += int(decode_seconds * 1e9)
+        timing.image_ns = time.perf_counter_ns() - timing.shown_ns
+
+    def answered(self, correct):
+        timing = self.current
+        if timing is not None and timing.answer_ns < 0:
+            timing.answer_ns = time.perf_counter_ns() - timing.shown_ns
+            timing.correct = correct
+
+    def flush(self, path):
+        # Appends the buffered records to a .csv or .jsonl file and empties the ring
+        if not self.ring:
+            return 0
+        rows = [timing.row() for timing in self.ring]
+        self.ring.clear()
+        self.current = None
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        if path.endswith(".csv"):
+            with open(path, "a", newline="", encoding="utf-8") as f:
+                writer = csv.writer(f)
+                if f.tell() == 0:
+                    writer.writerow(FIELDS)
+                writer.writerows(rows)
+        else:
+            with open(path, "a", encoding="utf-8") as f:
+                f.writelines(json.dumps(dict(zip(FIELDS, row))) + "\n" for row in rows)
+        return len(rows)
@@ -0,0 +1,256 @@
+import os
+import sys
+import json
+import mmap
+import struct
+from questions import open_questions, save_questions
+from thumbnails import THUMBS_DIR, THUMB_SIZES, thumbnail_name
+
+PACK_SUFFIX = ".tpk"
+PACK_MAGIC = b"TPK1"
+PACK_VERSION = 1
+IMAGE_ALIGN = 64
+NO_STRING = 0xFFFFFFFF
+MAX_ANSWER_ID = 0xFFFFFFFF
+COPY_CHUNK = 1 << 20
+
+# Layout: header, question table, answer table, string table, string data,
+# image table, then the image blobs, each starting on an IMAGE_ALIGN boundary
+HEADER = struct.Struct("<4sHHIIIIQQQQQ")
+QUESTION = struct.Struct("<IIIII")      # text, image name, first answer, answer count, extra fields
+ANSWER = struct.Struct("<IIBxxxI")      # text, image name, correct, answer id
+STRING = struct.Struct("<QI")           # offset into string data, byte length
+IMAGE = struct.Struct("<I4xQQ")         # name, blob offset, blob length
+
+CORE_FIELDS = ("question", "question_image", "answers", "correct")
+
+
+def is_pack(path):
+    return path.endswith(PACK_SUFFIX) and os.path.isfile(path)
+
+
+def _align(pos):
+    return (pos + IMAGE_ALIGN - 1) // IMAGE_ALIGN * IMAGE_ALIGN
+
+
+class _StringTable:
+    def __init__(self):
+        self.ids = {}
+        self.entries = []
+        self.data = bytearray()
+
+    def intern(self, text):
+        if not text:
+            return NO_STRING
+        string_id = self.ids.get(text)
+        if string_id is None:
+            encoded = text.encode("utf-8")
+            string_id = len(self.entries)
+            self.ids[text] = string_id
+            self.entries.append((len(self.data), len(encoded)))
+            self.data += encoded
+        return string_id
+
+
+def pack_folder(folder, pack_path):
+    strings = _StringTable()
+    question_table = bytearray()
+    answer_table = bytearray()
+    answer_count = 0
+    image_names = {}
+
+    def image_id(name):
+        string_id = strings.intern(name)
+        if name and name not in image_names:
+            image_names[name] = string_id
+        return string_id
+
+    source = open_questions(os.path.join(folder, "test.json"))
+    try:
+        for question in source:
+            extra = {k: v for k, v in question.items() if k not in CORE_FIELDS}
+            answers = question["answers"]
+            question_table += QUESTION.pack(
+                strings.intern(question["question"]),
+                image_id(question["question_image"]),
+                answer_count, len(answers),
+                strings.intern(json.dumps(extra)) if extra else NO_STRING,
+            )
+            for answer in answers:
+                answer_table += ANSWER.pack(strings.intern(answer["text"]), image_id(answer["image"]),
+                                            1 if answer["id"] == question["correct"] else 0, answer["id"])
+            answer_count += len(answers)
+        question_count = len(source)
+    finally:
+        source.close()
+
+    images = []
+    for name, string_id in image_names.items():
+        img_path = os.path.join(folder, "imgs", name)
+        if not os.path.isfile(img_path):
+            continue
+        images.append((string_id, img_path, os.path.getsize(img_path)))
+        # Thumbnails ride along so the player can pick a small variant from the pack too
+        for size in THUMB_SIZES:
+            thumb = thumbnail_name(name, size)
+            thumb_path = os.path.join(folder, "imgs", thumb)
+            if os.path.isfile(thumb_path):
+                images.append((strings.intern(thumb), thumb_path, os.path.getsize(thumb_path)))
+
+    string_table = bytearray()
+    for offset, length in strings.entries:
+        string_table += STRING.pack(offset, length)
+
+    question_off = HEADER.size
+    answer_off = question_off + len(question_table)
+    string_table_off = answer_off + len(answer_table)
+    string_data_off = string_table_off + len(string_table)
+    image_table_off = string_data_off + len(strings.data)
+    pos = image_table_off + IMAGE.size * len(images)
+    image_table = bytearray()
+    for string_id, _, size in images:
+        pos = _align(pos)
+        image_table += IMAGE.pack(string_id, pos, size)
+        pos += size
+
+    tmp_path = pack_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(
+            PACK_MAGIC, PACK_VERSION, 0, question_count, answer_count, len(strings.entries), len(images),
+            question_off, answer_off, string_table_off, string_data_off, image_table_off,
+        ))
+        f.write(question_table)
+        f.write(answer_table)
+        f.write(string_table)
+        f.write(strings.data)
+        f.write(image_table)
+        for _, img_path, _ in images:
+            f.write(b"\0" * (_align(f.tell()) - f.tell()))
+            with open(img_path, "rb") as src:
+                while True:
+                    chunk = src.read(COPY_CHUNK)
+                    if not chunk:
+                        break
+                    f.write(chunk)
+    os.replace(tmp_path, pack_path)
+
+
+class PackImage:
+    __slots__ = ("pack", "name")
+
+    def __init__(self, pack, name):
+        self.pack = pack
+        self.name = name
+
+    def cache_key(self):
+        if self.name not in self.pack.image_spans:
+            return None
+        return (self.pack.path, self.pack.mtime, self.name)
+
+    def data(self):
+        return self.pack.image_data(self.name)
+
+
+class TestPack:
+    # Read-only, memory-mapped test pack with the same sequence interface as QuestionSource
+
+    def __init__(self, pack_path):
+        self.path = pack_path
+        self.mtime = os.stat(pack_path).st_mtime_ns
+        with open(pack_path, "rb") as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.view = memoryview(self.map)
+        (magic, version, _, self.question_count, self.answer_count, self.string_count, image_count,
+         self.question_off, self.answer_off, self.string_table_off, self.string_data_off,
+         image_table_off) = HEADER.unpack_from(self.map, 0)
+        if magic != PACK_MAGIC or version != PACK_VERSION:
+            self.close()
+            raise ValueError(f"{pack_path} is not a test pack")
+        self.image_spans = {}
+        for i in range(image_count):
+            string_id, offset, length = IMAGE.unpack_from(self.map, image_table_off + i * IMAGE.size)
+            self.image_spans[self.string(string_id)] = (offset, length)
+
+    def string(self, string_id):
+        if string_id == NO_STRING:
+            return ""
+        offset, length = STRING.unpack_from(self.map, self.string_table_off + string_id * STRING.size)
+        start = self.string_data_off + offset
+        return str(self.view[start:start + length], "utf-8")
+
+    def __len__(self):
+        return self.question_count
+
+    def __iter__(self):
+        for i in range(self.question_count):
+            yield self[i]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += self.question_count
+        if not 0 <= index < self.question_count:
+            raise IndexError("question index out of range")
+        text, image, first, count, extra = QUESTION.unpack_from(self.map, self.question_off + index * QUESTION.size)
+        question = {"question": self.string(text), "question_image": self.string(image), "answers": [], "correct": None}
+        for a in range(first, first + count):
+            answer_text, answer_image, correct, answer_id = ANSWER.unpack_from(self.map, self.answer_off + a * ANSWER.size)
+            question["answers"].append({"id": answer_id, "text": self.string(answer_text), "image": self.string(answer_image)})
+            if correct:
+                question["correct"] = answer_id
+        if extra != NO_STRING:
+            question.update(json.loads(self.string(extra)))
+        return question
+
+    def tags(self, index):
+        # Reads just the question's extra fields, not its answers
+        _, _, _, _, extra = QUESTION.unpack_from(self.map, self.question_off + index * QUESTION.size)
+        tags = json.loads(self.string(extra)).get("tags", []) if extra != NO_STRING else []
+        return [tags] if isinstance(tags, str) else list(tags)
+
+    def raw(self, index):
+        return json.dumps(self[index], indent=2).replace("\n", "\n  ").encode("utf-8")
+
+    def image(self, name):
+        return PackImage(self, name)
+
+    def image_data(self, name):
+        # A view straight into the mapping; nothing is copied until it is decoded
+        span = self.image_spans.get(name)
+        if span is None:
+            return None
+        offset, length = span
+        return self.view[offset:offset + length]
+
+    def close(self):
+        self.view.release()
+        self.map.close()
+
+
+def unpack_pack(pack_path, folder):
+    pack = TestPack(pack_path)
+    try:
+        imgs_folder = os.path.join(folder, "imgs")
+        os.makedirs(os.path.join(imgs_folder, THUMBS_DIR), exist_ok=True)
+        for name in pack.image_spans:
+            # Names keep their subfolders of imgs/, but may not climb out of it
+            path = os.path.normpath(os.path.join(imgs_folder, name))
+            if os.path.isabs(name) or os.path.commonpath([imgs_folder, path]) != os.path.normpath(imgs_folder):
+                raise ValueError(f"{pack_path}: image {name!r} is outside imgs/")
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(pack.image_data(name))
+        save_questions(os.path.join(folder, "test.json"), pack)
+    finally:
+        pack.close()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 4 or sys.argv[1] not in ("pack", "unpack"):
+        print("usage: testpack.py pack <test folder> <out.tpk>\n       testpack.py unpack <test.tpk> <out folder>")
+        sys.exit(2)
+    if sys.argv[1] == "pack":
+        pack_folder(sys.argv[2], sys.argv[3])
+    else:
+        unpack_pack(sys.argv[2], sys.argv[3])
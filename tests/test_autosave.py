@@ -0,0 +1,106 @@
+import json
+import os
+import pytest
+
+QtCore = pytest.importorskip("PyQt6.QtCore")
+
+from autosave import STALE_SUFFIX, Autosave, apply_journal, journal_path
+from questions import QuestionList, open_questions, save_questions
+
+
+@pytest.fixture(scope="module", autouse=True)
+def app():
+    return QtCore.QCoreApplication.instance() or QtCore.QCoreApplication([])
+
+
+def question(text):
+    return {"question": text, "question_image": "", "answers": [{"id": 0, "text": "a", "image": ""}], "correct": 0}
+
+
+@pytest.fixture
+def test_file(tmp_path):
+    path = str(tmp_path / "test.json")
+    save_questions(path, [question(f"q{i}") for i in range(5)])
+    return path
+
+
+def load(test_file):
+    questions = QuestionList(open_questions(test_file))
+    return questions, apply_journal(test_file, questions)
+
+
+def texts(questions):
+    return [q["question"] for q in questions]
+
+
+def journal_edits(test_file):
+    # Three journaled edits, as the creator makes them
+    questions, _ = load(test_file)
+    autosave = Autosave(journal_limit=100)
+    autosave.bind(test_file, questions)
+    questions[1] = question("changed")
+    autosave.question_changed(1, questions[1])
+    questions.insert(0, question("new"))
+    autosave.question_inserted(0, questions[0])
+    del questions[5]
+    autosave.question_removed(5)
+    autosave.flush(wait=True)
+    autosave.close()
+    questions.close()
+
+
+def test_replays_journaled_edits(test_file):
+    journal_edits(test_file)
+    questions, applied = load(test_file)
+    assert applied == 3
+    assert texts(questions) == ["new", "q0", "changed", "q2", "q3"]
+    questions.close()
+
+
+def test_full_save_folds_journal_in(test_file):
+    journal_edits(test_file)
+    questions, _ = load(test_file)
+    autosave = Autosave()
+    autosave.bind(test_file, questions, journaled=3)
+    autosave.flush(full=True, wait=True)
+    autosave.close()
+    questions.close()
+    assert not os.path.exists(journal_path(test_file))
+    questions, applied = load(test_file)
+    assert applied == 0
+    assert texts(questions) == ["new", "q0", "changed", "q2", "q3"]
+    questions.close()
+
+
+def test_torn_tail_is_cut_off(test_file):
+    journal_edits(test_file)
+    path = journal_path(test_file)
+    whole = os.path.getsize(path)
+    with open(path, "ab") as f:
+        f.write(b'{"op": "set", "i": 0, "q": {"question": "tor')
+    questions, applied = load(test_file)
+    assert applied == 3
+    assert texts(questions)[0] == "new"
+    questions.close()
+    assert os.path.getsize(path) == whole
+
+
+def test_stale_journal_is_moved_aside(test_file):
+    journal_edits(test_file)
+    # test.json rewritten behind the journal's back
+    save_questions(test_file, [question("other")])
+    questions, applied = load(test_file)
+    assert applied == 0
+    assert texts(questions) == ["other"]
+    questions.close()
+    assert not os.path.exists(journal_path(test_file))
+    assert os.path.exists(journal_path(test_file) + STALE_SUFFIX)
+
+
+def test_unreadable_header_is_stale(test_file):
+    with open(journal_path(test_file), "w") as f:
+        f.write("not a header\n" + json.dumps({"op": "remove", "i": 0}) + "\n")
+    questions, applied = load(test_file)
+    assert applied == 0 and len(questions) == 5
+    questions.close()
+    assert os.path.exists(journal_path(test_file) + STALE_SUFFIX)
@@ -0,0 +1,112 @@
+import io
+import json
+import os
+import pytest
+from questions import QuestionSource, count_questions, index_path, read_index, scan_offsets
+
+
+def question(i, text=None):
+    return {"question": text if text is not None else f"Question {i}", "question_image": "",
+            "answers": [{"id": 0, "text": "yes", "image": ""}, {"id": 1, "text": "no", "image": ""}],
+            "correct": 0}
+
+
+# Braces, brackets, quotes and multi-byte characters inside strings
+TRICKY = ["a { b } [ c ]", 'say "hi" \\ ]', "café ☃ \U0001f600", "", "}]"]
+
+
+def write_test(folder, questions, indent=2):
+    path = os.path.join(folder, "test.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(questions, f, indent=indent, ensure_ascii=False)
+    return path
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 64, 1 << 20])
+def test_scan_offsets_across_chunk_boundaries(chunk_size):
+    questions = [question(i, TRICKY[i % len(TRICKY)]) for i in range(20)]
+    data = json.dumps(questions, indent=2, ensure_ascii=False).encode("utf-8")
+    offsets = list(scan_offsets(io.BytesIO(data), chunk_size))
+    assert [json.loads(data[start:end]) for start, end in offsets] == questions
+
+
+@pytest.mark.parametrize("data", [b"[]", b"  [ ] \n", b"[\n]"])
+def test_scan_offsets_empty_list(data):
+    assert list(scan_offsets(io.BytesIO(data), 2)) == []
+
+
+@pytest.mark.parametrize("data", [
+    b"",
+    b"{}",
+    b'[{"question": "a"}',
+    b'[{"question": "a"},',
+    b'[{"question": "a"}, {"question": "b',
+    b'[{"question": "a"} {"question": "b"}]',
+    b'[{"question": "a"},]',
+    b'[1, 2]',
+])
+def test_scan_offsets_rejects_malformed_input(data):
+    with pytest.raises(ValueError):
+        list(scan_offsets(io.BytesIO(data), 4))
+
+
+def test_source_builds_and_reuses_index(tmp_path):
+    questions = [question(i) for i in range(50)]
+    path = write_test(str(tmp_path), questions)
+    source = QuestionSource(path)
+    try:
+        # Reading the start does not index the whole file
+        assert source[3] == questions[3]
+        assert not os.path.exists(index_path(path))
+        assert len(source) == 50
+    finally:
+        source.close()
+    assert len(read_index(path)) == 100
+
+    source = QuestionSource(path)
+    try:
+        assert source.complete and source.scanner is None
+        assert list(source) == questions
+    finally:
+        source.close()
+
+
+def test_source_ignores_index_of_changed_file(tmp_path):
+    path = write_test(str(tmp_path), [question(i) for i in range(5)])
+    source = QuestionSource(path)
+    len(source)
+    source.close()
+    assert read_index(path) is not None
+    write_test(str(tmp_path), [question(i) for i in range(8)], indent=None)
+    assert read_index(path) is None
+    source = QuestionSource(path)
+    try:
+        assert len(source) == 8
+        assert source[7] == question(7)
+    finally:
+        source.close()
+
+
+def test_truncated_file_is_never_indexed(tmp_path):
+    path = write_test(str(tmp_path), [question(i) for i in range(200)])
+    with open(path, "r+b") as f:
+        f.truncate(os.path.getsize(path) - 40)
+    source = QuestionSource(path)
+    try:
+        # Questions before the damage still read
+        assert source[0] == question(0)
+        for _ in range(2):
+            with pytest.raises(ValueError):
+                len(source)
+        with pytest.raises(ValueError):
+            source.scan_step()
+        assert not source.complete
+    finally:
+        source.close()
+    assert not os.path.exists(index_path(path))
+
+
+def test_count_questions_writes_nothing(tmp_path):
+    path = write_test(str(tmp_path), [question(i) for i in range(12)])
+    assert count_questions(path) == 12
+    assert os.listdir(str(tmp_path)) == ["test.json"]
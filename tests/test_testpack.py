@@ -0,0 +1,90 @@
+import json
+import os
+import pytest
+import testpack
+from questions import open_questions
+from testpack import pack_folder, unpack_pack
+from thumbnails import THUMB_SIZES, THUMBS_DIR, thumbnail_name
+
+IMAGES = {
+    "top.png": b"\x89PNG top",
+    "sub/inner.png": b"\x89PNG inner",
+    thumbnail_name("top.png", THUMB_SIZES[0]): b"\x89PNG thumb",
+}
+
+QUESTIONS = [
+    {"question": "With images", "question_image": "top.png",
+     "answers": [{"id": 70000, "text": "big id", "image": "sub/inner.png"},
+                 {"id": 3, "text": "", "image": ""}],
+     "correct": 70000},
+    {"question": "No correct answer ☃", "question_image": "",
+     "answers": [{"id": 0, "text": "same", "image": ""}, {"id": 1, "text": "same", "image": ""}],
+     "correct": None, "tags": ["x", "y"], "explanation": "extra fields ride along"},
+    {"question": "", "question_image": "missing.png", "answers": [], "correct": None},
+]
+
+
+def make_folder(folder, questions=QUESTIONS, images=IMAGES):
+    os.makedirs(os.path.join(folder, "imgs"), exist_ok=True)
+    for name, data in images.items():
+        path = os.path.join(folder, "imgs", name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data)
+    with open(os.path.join(folder, "test.json"), "w", encoding="utf-8") as f:
+        json.dump(questions, f)
+
+
+def test_pack_reads_back_every_question(tmp_path):
+    make_folder(str(tmp_path / "src"))
+    pack_path = str(tmp_path / "test.tpk")
+    pack_folder(str(tmp_path / "src"), pack_path)
+    pack = testpack.TestPack(pack_path)
+    try:
+        assert len(pack) == len(QUESTIONS)
+        assert list(pack) == QUESTIONS
+        assert pack[-1] == QUESTIONS[-1]
+        assert pack.tags(1) == ["x", "y"]
+        # Only images that exist are stored, thumbnails included
+        assert set(pack.image_spans) == set(IMAGES)
+        for name, data in IMAGES.items():
+            assert bytes(pack.image_data(name)) == data
+    finally:
+        pack.close()
+
+
+def test_unpack_restores_the_folder(tmp_path):
+    make_folder(str(tmp_path / "src"))
+    pack_path = str(tmp_path / "test.tpk")
+    pack_folder(str(tmp_path / "src"), pack_path)
+    out = str(tmp_path / "out")
+    unpack_pack(pack_path, out)
+    source = open_questions(os.path.join(out, "test.json"))
+    try:
+        assert list(source) == QUESTIONS
+    finally:
+        source.close()
+    for name, data in IMAGES.items():
+        with open(os.path.join(out, "imgs", name), "rb") as f:
+            assert f.read() == data
+    assert os.path.isdir(os.path.join(out, "imgs", THUMBS_DIR))
+
+
+def test_unpack_keeps_images_inside_imgs(tmp_path):
+    src = str(tmp_path / "src")
+    questions = [{"question": "q", "question_image": "../escape.png", "answers": [], "correct": None}]
+    make_folder(src, questions, {})
+    with open(os.path.join(src, "escape.png"), "wb") as f:
+        f.write(b"outside")
+    pack_path = str(tmp_path / "test.tpk")
+    pack_folder(src, pack_path)
+    with pytest.raises(ValueError):
+        unpack_pack(pack_path, str(tmp_path / "out"))
+    assert not os.path.exists(tmp_path / "escape.png")
+
+
+def test_not_a_pack(tmp_path):
+    path = tmp_path / "bad.tpk"
+    path.write_bytes(b"\0" * 128)
+    with pytest.raises(ValueError):
+        testpack.TestPack(str(path))
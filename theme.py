@@ -0,0 +1,105 @@
+from functools import lru_cache
+
+DEFAULT_THEME = "light"
+
+THEMES = {
+    "light": {
+        "bg_color": "#DCE1DE", "fg_color": "#A1A5A3", "text_color": "#2F2F2F", "hover_color": "#B8BCBA",
+        "correct_color": "#8BC34A", "incorrect_color": "#FF5252", "incorrect_text": "white", "border_color": "#999",
+    },
+    "dark": {
+        "bg_color": "#1F2326", "fg_color": "#3A4045", "text_color": "#E4E7E5", "hover_color": "#4A5156",
+        "correct_color": "#4E7D2A", "incorrect_color": "#B3261E", "incorrect_text": "white", "border_color": "#777",
+    },
+    "contrast": {
+        "bg_color": "#000000", "fg_color": "#1A1A1A", "text_color": "#FFFFFF", "hover_color": "#404040",
+        "correct_color": "#00C853", "incorrect_color": "#FF1744", "incorrect_text": "black", "border_color": "#FFF",
+    },
+}
+
+# One sheet for every window. Widgets are picked out by object name or the
+# "role" property; per-widget state (an answer being right or wrong) is a
+# dynamic property, so changing it only re-polishes that widget.
+STYLESHEET = """
+QWidget#folderPage, QWidget#libraryPage {{
+    background-color: {bg_color};
+    color: {text_color};
+}}
+QWidget#quizPage {{
+    background-color: {bg_color};
+    padding: 20px;
+}}
+#folderPage QLabel, #folderPage QCheckBox, #libraryPage QLabel {{
+    color: {text_color};
+}}
+#folderPage QSpinBox, #folderPage QLineEdit, #folderPage QComboBox, #libraryPage QTableView {{
+    background-color: {bg_color};
+    color: {text_color};
+}}
+QLabel#title {{
+    font-size: 24px;
+}}
+QPushButton[role="primary"] {{
+    background-color: {fg_color};
+    color: {text_color};
+    border-radius: 24px;
+    padding: 15px;
+    font-size: 16px;
+}}
+QPushButton[role="primary"]:disabled {{
+    color: {hover_color};
+}}
+QFrame#questionPanel {{
+    background-color: {fg_color};
+    color: {text_color};
+    border-radius: 24px;
+    padding: 20px;
+}}
+#questionPanel QLabel {{
+    background: transparent;
+    color: {text_color};
+}}
+QFrame#answerPanel, QWidget#answerButtons {{
+    background: transparent;
+}}
+#answerButtons QPushButton {{
+    background-color: {fg_color};
+    color: {text_color};
+    border-radius: 24px;
+    padding: 20px;
+    font-size: 14px;
+    text-align: left;
+    border: none;
+    min-height: 60px;
+}}
+#answerButtons QPushButton:hover {{
+    background-color: {hover_color};
+}}
+#answerButtons QPushButton[state="correct"] {{
+    background-color: {correct_color};
+}}
+#answerButtons QPushButton[state="incorrect"] {{
+    background-color: {incorrect_color};
+    color: {incorrect_text};
+}}
+QLabel#scoreLabel {{
+    background: transparent;
+    color: {text_color};
+    font-size: 16px;
+}}
+QLabel#imagePreview {{
+    border: 1px dashed {border_color};
+}}
+"""
+
+
+@lru_cache(maxsize=None)
+def stylesheet(name):
+    return STYLESHEET.format(**THEMES[name])
+
+
+def apply_theme(app, name):
+    # Swapping the application sheet re-polishes existing widgets in place
+    sheet = stylesheet(name)
+    if app.styleSheet() != sheet:
+        app.setStyleSheet(sheet)
@@ -0,0 +1,131 @@
+import os
+import sys
+from PyQt6.QtCore import QSize, Qt
+from PyQt6.QtGui import QImageReader
+
+THUMBS_DIR = ".thumbs"
+# Every size either app draws an image at: answer icons, the creator's answer
+# and question previews, and the quiz question image
+THUMB_SIZES = [(40, 40), (100, 100), (200, 150), (300, 300)]
+
+
+def thumbnail_name(name, size):
+    return f"{THUMBS_DIR}/{name}@{size[0]}x{size[1]}.png"
+
+
+def variants_for(size):
+    # Thumbnail sizes that can stand in for `size`, smallest first
+    w, h = size
+    return [s for s in sorted(THUMB_SIZES, key=lambda s: s[0] * s[1]) if s[0] >= w and s[1] >= h]
+
+
+def best_variant(name, size, exists):
+    # Relative name of the smallest thumbnail that fits, or the original image
+    for variant in variants_for(size):
+        thumb = thumbnail_name(name, variant)
+        if exists(thumb):
+            return thumb
+    return name
+
+
+def thumbnail_path(imgs_folder, name, width, height):
+    img_path = os.path.join(imgs_folder, name)
+    try:
+        source_mtime = os.stat(img_path).st_mtime_ns
+    except OSError:
+        return img_path
+
+    def fresh(thumb):
+        # Digest-named images never change, but legacy names can be overwritten
+        try:
+            return os.stat(os.path.join(imgs_folder, thumb)).st_mtime_ns >= source_mtime
+        except OSError:
+            return False
+
+    return os.path.join(imgs_folder, best_variant(name, (width, height), fresh))
+
+
+def generate_thumbnails(imgs_folder, name):
+    # Decodes the image once, at the largest thumbnail size, and derives the
+    # smaller variants from that. Returns how many thumbnails were written.
+    reader = QImageReader(os.path.join(imgs_folder, name))
+    reader.setAutoTransform(True)
+    source_size = reader.size()
+    if not source_size.isValid():
+        return 0
+    largest = max(THUMB_SIZES, key=lambda s: s[0] * s[1])
+    fitted = source_size.scaled(QSize(*largest), Qt.AspectRatioMode.KeepAspectRatio)
+    if fitted.width() < source_size.width():
+        reader.setScaledSize(fitted)
+    image = reader.read()
+    if image.isNull():
+        return 0
+    os.makedirs(os.path.join(imgs_folder, THUMBS_DIR), exist_ok=True)
+    written = 0
+    for size in sorted(THUMB_SIZES, key=lambda s: s[0] * s[1], reverse=True):
+        box = QSize(*size)
+        if source_size.width() <= box.width() and source_size.height() <= box.height():
+            # Already small enough; the original is the thumbnail
+            continue
+        thumb = image.scaled(box, Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation)
+        thumb_path = os.path.join(imgs_folder, thumbnail_name(name, size))
+        tmp_path = thumb_path + ".tmp"
+        if thumb.save(tmp_path, "PNG"):
+            os.replace(tmp_path, thumb_path)
+            written += 1
+    return written
+
+
+def needs_thumbnails(imgs_folder, name):
+    # The smallest thumbnail is written for every image bigger than it
+    smallest = min(THUMB_SIZES, key=lambda s: s[0] * s[1])
+    try:
+        source_mtime = os.stat(os.path.join(imgs_folder, name)).st_mtime_ns
+        return os.stat(os.path.join(imgs_folder, thumbnail_name(name, smallest))).st_mtime_ns < source_mtime
+    except OSError:
+        return True
+
+
+def remove_thumbnails(imgs_folder, name):
+    for size in THUMB_SIZES:
+        try:
+            os.remove(os.path.join(imgs_folder, thumbnail_name(name, size)))
+        except OSError:
+            pass
+
+
+def _generate_job(args):
+    imgs_folder, name = args
+    try:
+        return name, generate_thumbnails(imgs_folder, name), None
+    except Exception as e:
+        return name, 0, str(e)
+
+
+def generate_folder(imgs_folder, workers=None, force=False):
+    # Batch thumbnailing over a process pool; images whose thumbnails are all
+    # newer than the source are skipped unless force is set
+    names = []
+    with os.scandir(imgs_folder) as entries:
+        for entry in entries:
+            if not entry.is_file() or entry.name.startswith("."):
+                continue
+            if force or needs_thumbnails(imgs_folder, entry.name):
+                names.append(entry.name)
+    if not names:
+        return []
+    # Imported here: multiprocessing is slow to load and only batch runs need it
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_generate_job, [(imgs_folder, name) for name in names], chunksize=8))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("usage: thumbnails.py <test folder> [--force]")
+        sys.exit(2)
+    results = generate_folder(os.path.join(sys.argv[1], "imgs"), force="--force" in sys.argv)
+    for name, written, error in results:
+        if error:
+            print(f"{name}: {error}")
+    print(f"Thumbnailed {len(results)} images")
@@ -0,0 +1,216 @@
+import os
+import sys
+import json
+from concurrent.futures import ThreadPoolExecutor
+from PyQt6.QtCore import QBuffer, QByteArray
+from PyQt6.QtGui import QImageReader
+from questions import scan_offsets
+from testpack import MAX_ANSWER_ID, TestPack, is_pack
+
+ERROR = "error"
+WARNING = "warning"
+
+
+class Issue:
+    __slots__ = ("index", "severity", "message")
+
+    def __init__(self, index, severity, message):
+        self.index = index
+        self.severity = severity
+        self.message = message
+
+    def __str__(self):
+        where = f"Q{self.index + 1}" if self.index is not None else "test"
+        return f"{where}: {self.severity}: {self.message}"
+
+
+class _Duplicates(dict):
+    # object_pairs_hook result that remembers keys json would silently collapse
+    def __init__(self, pairs):
+        super().__init__()
+        self.duplicates = []
+        for key, value in pairs:
+            if key in self:
+                self.duplicates.append(key)
+            self[key] = value
+
+
+def iter_test_file(test_file):
+    # Single streaming pass over test.json that keeps duplicate answer keys visible
+    with open(test_file, "rb") as scan, open(test_file, "rb") as f:
+        for start, end in scan_offsets(scan):
+            f.seek(start)
+            yield json.loads(f.read(end - start), object_pairs_hook=_Duplicates)
+
+
+def check_question(index, question):
+    issues = []
+    if not isinstance(question, dict):
+        return [Issue(index, ERROR, "is not an object")]
+    text = question.get("question")
+    if not isinstance(text, str):
+        issues.append(Issue(index, ERROR, "missing 'question' text"))
+    elif not text.strip():
+        issues.append(Issue(index, WARNING, "question text is empty"))
+    if not isinstance(question.get("question_image", None), str):
+        issues.append(Issue(index, ERROR, "missing 'question_image' (use \"\" for none)"))
+    answers = question.get("answers")
+    if isinstance(answers, list):
+        return issues + check_answers(index, question, answers)
+    images = question.get("answers_images")
+    if not isinstance(answers, dict):
+        issues.append(Issue(index, ERROR, "'answers' must be a list of answers"))
+        return issues
+    # Answers keyed by text, from before answer ids; still loaded as they are
+    if not isinstance(images, list) or not all(isinstance(name, str) for name in images):
+        issues.append(Issue(index, ERROR, "'answers_images' must be a list of file names"))
+    elif len(images) != len(answers):
+        issues.append(Issue(index, ERROR, f"{len(answers)} answers but {len(images)} answer images"))
+    for key in getattr(answers, "duplicates", ()):
+        issues.append(Issue(index, ERROR, f"answer {key!r} appears more than once"))
+    seen = {}
+    for key in answers:
+        folded = " ".join(key.split()).casefold()
+        if folded in seen:
+            issues.append(Issue(index, WARNING, f"answers {seen[folded]!r} and {key!r} look the same"))
+        seen.setdefault(folded, key)
+        if not key.strip():
+            issues.append(Issue(index, ERROR, "an answer has no text"))
+    if any(value not in (0, 1) for value in answers.values()):
+        issues.append(Issue(index, ERROR, "answer values must be 0 or 1"))
+    correct = sum(1 for value in answers.values() if value == 1)
+    if correct != 1:
+        issues.append(Issue(index, ERROR, f"{correct} correct answers, expected exactly one"))
+    if len(answers) < 2:
+        issues.append(Issue(index, WARNING, f"only {len(answers)} answer(s)"))
+    return issues
+
+
+def check_answers(index, question, answers):
+    issues = []
+    ids = set()
+    seen = {}
+    for answer in answers:
+        if not isinstance(answer, dict) or not isinstance(answer.get("text"), str) \
+                or not isinstance(answer.get("image"), str):
+            issues.append(Issue(index, ERROR, "each answer needs 'id', 'text' and 'image'"))
+            continue
+        answer_id = answer.get("id")
+        if not isinstance(answer_id, int) or isinstance(answer_id, bool):
+            issues.append(Issue(index, ERROR, f"answer {answer['text']!r} has no integer id"))
+        elif not 0 <= answer_id <= MAX_ANSWER_ID:
+            # Packs store ids as unsigned 32-bit numbers
+            issues.append(Issue(index, ERROR, f"answer id {answer_id} is outside 0..{MAX_ANSWER_ID}"))
+        elif answer_id in ids:
+            issues.append(Issue(index, ERROR, f"answer id {answer_id} appears more than once"))
+        else:
+            ids.add(answer_id)
+        key = answer["text"]
+        if not key.strip():
+            issues.append(Issue(index, ERROR, "an answer has no text"))
+        folded = " ".join(key.split()).casefold()
+        if folded in seen:
+            # Allowed, since answers are told apart by id, but candidates can't
+            issues.append(Issue(index, WARNING, f"answers {seen[folded]!r} and {key!r} look the same"))
+        seen.setdefault(folded, key)
+    correct = question.get("correct")
+    if correct is None:
+        issues.append(Issue(index, ERROR, "no correct answer"))
+    elif correct not in ids:
+        issues.append(Issue(index, ERROR, f"correct answer id {correct!r} is not one of the answers"))
+    if len(answers) < 2:
+        issues.append(Issue(index, WARNING, f"only {len(answers)} answer(s)"))
+    return issues
+
+
+def referenced_images(index, question):
+    if isinstance(question, dict):
+        if isinstance(question.get("question_image"), str) and question["question_image"]:
+            yield question["question_image"], index
+        answers = question.get("answers")
+        if isinstance(answers, list):
+            images = [answer.get("image") for answer in answers if isinstance(answer, dict)]
+        else:
+            images = question.get("answers_images")
+        if isinstance(images, list):
+            for name in images:
+                if isinstance(name, str) and name:
+                    yield name, index
+
+
+def _probe_reader(reader):
+    if not reader.canRead() or not reader.size().isValid():
+        return f"unreadable ({reader.errorString()})"
+    return None
+
+
+def probe_image(path):
+    # Stat plus a header-only decode probe; returns an error string or None
+    if not os.path.isfile(path):
+        return "missing"
+    return _probe_reader(QImageReader(path))
+
+
+def probe_image_data(data):
+    # The same header probe over an image held in memory, e.g. inside a pack
+    if data is None:
+        return "missing from the pack"
+    buffer = QBuffer()
+    buffer.setData(QByteArray(bytes(data)))
+    return _probe_reader(QImageReader(buffer))
+
+
+def validate(questions, probe, workers=None):
+    # `questions` yields question dicts in order; `probe(name)` checks one image.
+    # Each image is probed in the pool as soon as the question pass first
+    # meets it, so probing overlaps with checking the rest of the questions.
+    issues = []
+    users = {}
+    probes = {}
+    count = 0
+    with ThreadPoolExecutor(max_workers=workers or min(32, (os.cpu_count() or 1) * 4)) as pool:
+        for index, question in enumerate(questions):
+            issues.extend(check_question(index, question))
+            for name, user in referenced_images(index, question):
+                if name not in users:
+                    users[name] = []
+                    probes[name] = pool.submit(probe, name)
+                users[name].append(user)
+            count = index + 1
+        for name, future in probes.items():
+            problem = future.result()
+            if problem:
+                for index in users[name]:
+                    issues.append(Issue(index, ERROR, f"image {name!r} is {problem}"))
+    if count == 0:
+        issues.append(Issue(None, ERROR, "test has no questions"))
+    issues.sort(key=lambda issue: (issue.index is not None, issue.index or 0))
+    return issues
+
+
+def validate_path(path, workers=None):
+    if is_pack(path):
+        pack = TestPack(path)
+        try:
+            return validate(iter(pack), lambda name: probe_image_data(pack.image_data(name)), workers)
+        finally:
+            pack.close()
+    imgs_folder = os.path.join(path, "imgs")
+    return validate(iter_test_file(os.path.join(path, "test.json")),
+                    lambda name: probe_image(os.path.join(imgs_folder, name)), workers)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("usage: validator.py <test folder or .tpk>")
+        sys.exit(2)
+    try:
+        found = validate_path(sys.argv[1])
+    except ValueError as e:
+        print(f"test: error: {e}")
+        sys.exit(1)
+    for issue in found:
+        print(issue)
+    errors = sum(1 for issue in found if issue.severity == ERROR)
+    print(f"{errors} errors, {len(found) - errors} warnings")
+    sys.exit(1 if errors else 0)